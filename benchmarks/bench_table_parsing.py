@@ -0,0 +1,76 @@
+"""
+Micro-benchmark for parse_structured_table on synthetic tables.
+
+    python benchmarks/bench_table_parsing.py --rows 10000 50000 100000 --cols 8
+    TABLE_STRING_DTYPE=pyarrow python benchmarks/bench_table_parsing.py
+
+Compares the current implementation with the previous DataFrame.apply-based
+one (kept below as `legacy_parse`), checks both produce the same cells, and
+also times TableHandle construction + content hash.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.table_handle import TableHandle  # noqa: E402
+from utils.table_utils import parse_structured_table  # noqa: E402
+
+
+def legacy_parse(table_dict: dict) -> pd.DataFrame:
+    df = pd.DataFrame(table_dict.get("rows", []), columns=table_dict.get("header", []))
+    df.columns = [c.replace('\n', ' ').strip() for c in df.columns]
+    return df.apply(lambda x: x.astype(str).str.replace('\n', ' ').str.strip())
+
+
+def synthetic_table(n_rows: int, n_cols: int, seed: int = 0) -> dict:
+    """WTQ/financial-looking string cells: names with stray whitespace/newlines, counts, money, percents."""
+    rng = random.Random(seed)
+    makers = [
+        lambda: f" Team {rng.randint(1, 5000)}\n",
+        lambda: str(rng.randint(0, 100)),
+        lambda: f"${rng.randint(1000, 9_999_999):,}",
+        lambda: f"({rng.randint(1, 99_999):,})",
+        lambda: f"{rng.uniform(0, 100):.1f}%",
+        lambda: f"{rng.randint(0, 3)}:{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+        lambda: rng.choice(["Gold", "Silver", "Bronze", " n/a "]),
+        lambda: f"{rng.randint(1990, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+    ]
+    header = [f"Col\n{j}" for j in range(n_cols)]
+    rows = [[makers[j % len(makers)]() for j in range(n_cols)] for _ in range(n_rows)]
+    return {"header": header, "rows": rows}
+
+
+def timed(fn, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parse_structured_table.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8}{'cols':>6}{'legacy s':>11}{'current s':>11}{'speedup':>9}{'handle+hash s':>15}  same")
+    for n in args.rows:
+        table = synthetic_table(n, args.cols)
+        t_old, old = timed(lambda: legacy_parse(table), args.repeat)
+        t_new, new = timed(lambda: parse_structured_table(table), args.repeat)
+        t_handle, _ = timed(lambda: TableHandle(parse_structured_table(table)).content_hash, args.repeat)
+        same = old.astype(str).values.tolist() == new.astype(str).values.tolist() and list(old.columns) == list(new.columns)
+        print(f"{n:>8}{args.cols:>6}{t_old:>11.3f}{t_new:>11.3f}{t_old / t_new:>8.1f}x{t_handle:>15.3f}  {same}")
+
+
+if __name__ == "__main__":
+    main()
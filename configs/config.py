@@ -3,9 +3,97 @@ import os
 
 class Config:
     API_KEY = os.getenv("DEEPSEEK_API_KEY", "xxx")
-    BASE_URL = "https://api.deepseek.com"
+    # Point at mock_llm_server.py (e.g. http://127.0.0.1:8000) for offline load tests.
+    BASE_URL = os.getenv("LLM_BASE_URL", "https://api.deepseek.com")
     MODEL_NAME = "deepseek-chat"
     TEMPERATURE = 0.0  
     
-    Z3_TIMEOUT = 5000 
+    Z3_TIMEOUT = 5000  # ms, applied to every solver a generated program creates
+    # Hard wall-clock limit for a whole solve_logic() run on the sandbox pool
+    Z3_WALL_TIMEOUT_S = 15.0
+    # One persistent Z3 context per trace: facts asserted once, each inference checked
+    # with push/pop and only the new step formalized (src/verifiers/z3_auditor.py)
+    Z3_INCREMENTAL = os.getenv("Z3_INCREMENTAL", "0") == "1"
+    # Numeric columns pre-encoded as Z3 numerals, read by generated code as col('Points')[3]
+    # (utils/z3_table.py); they are then left out of the Z3 prompt's table context
+    Z3_TABLE_ENCODING = os.getenv("Z3_TABLE_ENCODING", "1") == "1"
+    # What autoformalize_to_z3 asks for: "python" (a solve_logic() program, exec'd) or "smtlib"
+    # (an SMT-LIB2 script loaded with z3.parse_smt2_string, never exec'd)
+    Z3_FORMAT = os.getenv("Z3_FORMAT", "python")
+    # Verdict per canonical SMT-LIB formula hash (utils/z3_formula_cache.py). Empty path = in-memory only.
+    Z3_FORMULA_CACHE_ENABLED = os.getenv("Z3_FORMULA_CACHE_ENABLED", "1") == "1"
+    Z3_FORMULA_CACHE_MAX_ENTRIES = 50000
+    Z3_FORMULA_CACHE_PATH = os.getenv("Z3_FORMULA_CACHE_PATH", "cache/z3_formulas.sqlite")
 
+    # LLM response cache (utils/llm_cache.py)
+    # off / readwrite / replay (replay = serve recorded responses only, never call the API)
+    LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "readwrite")
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "cache/llm_responses.sqlite")
+    LLM_CACHE_MAX_MB = 2048
+    LLM_CACHE_MAX_AGE_DAYS = 30
+
+    # Async HTTP pool shared by all AsyncLLMEngine requests
+    HTTP_MAX_CONNECTIONS = 512
+    HTTP_MAX_KEEPALIVE = 128
+    HTTP_KEEPALIVE_EXPIRY_S = 60.0
+    LLM_REQUEST_TIMEOUT_S = 60.0
+
+    # Adaptive (AIMD) concurrency shared by all LLM call sites (utils/rate_control.py)
+    RATE_INITIAL_CONCURRENCY = 8
+    RATE_MAX_CONCURRENCY = 256
+    LLM_MAX_RETRIES = 5
+    LLM_BASE_BACKOFF_S = 2.0
+
+    # Token-budget admission (0 = unlimited). Checked before the concurrency slot.
+    LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "0"))
+    LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "0"))
+    LLM_EXPECTED_COMPLETION_TOKENS = 512
+
+    # Per-call instrumentation (utils/llm_metrics.py); USD per 1M tokens, cache hits are free.
+    LLM_PRICE_INPUT_PER_1M = 0.27
+    LLM_PRICE_OUTPUT_PER_1M = 1.10
+
+    # Relevance-pruned table serialization for prompts (utils/table_retrieval.py).
+    # Tables whose full rendering fits the budget are sent unchanged.
+    PROMPT_TABLE_PRUNING = os.getenv("PROMPT_TABLE_PRUNING", "1") == "1"
+    PROMPT_TABLE_TOKEN_BUDGET = 1500
+
+    # Verify all steps of a trace concurrently (TrustTablePipeline.arun) in main.py
+    PIPELINE_ASYNC = os.getenv("PIPELINE_ASYNC", "1") == "1"
+
+    # One LLM call formalizes every step of a trace (LLMEngine.formalize_trace);
+    # steps missing from its answer fall back to per-step generation.
+    FUSED_FORMALIZATION = os.getenv("FUSED_FORMALIZATION", "0") == "1"
+
+    # decompose_cot also emits (row_key, column, value, op) triples for lookup facts,
+    # checked deterministically by src/verifiers/triple_checker.py before any codegen.
+    DECOMPOSE_TRIPLES = os.getenv("DECOMPOSE_TRIPLES", "1") == "1"
+
+    # Decide single-value lookup claims from the normalized cell index (src/verifiers/lookup_matcher.py)
+    GROUNDING_FAST_PATH = os.getenv("GROUNDING_FAST_PATH", "1") == "1"
+
+    # Decide superlative / rank / aggregate inference steps on the numeric columns (src/verifiers/aggregate_checker.py)
+    AGGREGATE_FAST_PATH = os.getenv("AGGREGATE_FAST_PATH", "1") == "1"
+
+    # Decide inference steps that are symbolic arithmetic ("19 > 10", "660,391 / 332,316 = 1.99") and
+    # cross-check Z3 verdicts against it (src/verifiers/arithmetic_checker.py)
+    ARITHMETIC_FAST_PATH = os.getenv("ARITHMETIC_FAST_PATH", "1") == "1"
+
+    # Cell dtype of parsed tables: "object" (default) or "pyarrow" (string[pyarrow], needs pyarrow)
+    TABLE_STRING_DTYPE = os.getenv("TABLE_STRING_DTYPE", "object")
+
+    # Generated program + bytecode + verdict per (table hash, normalized step, verifier version)
+    # (utils/verification_cache.py). Empty path = in-memory only.
+    VERIFY_CACHE_ENABLED = os.getenv("VERIFY_CACHE_ENABLED", "1") == "1"
+    VERIFY_CACHE_MAX_ENTRIES = 50000
+    VERIFY_CACHE_PATH = os.getenv("VERIFY_CACHE_PATH", "")
+
+    # Sandboxed forkserver pool for generated pandas programs (utils/exec_pool.py).
+    # Falls back to in-process exec where forkserver/resource are unavailable (Windows).
+    SANDBOX_ENABLED = os.getenv("SANDBOX_ENABLED", "1") == "1"
+    SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", str(os.cpu_count() or 4)))
+    SANDBOX_TIMEOUT_S = 10.0
+    # Budget for a worker to attach a table and build find_rows/tv before the program runs
+    SANDBOX_PREPARE_TIMEOUT_S = 120.0
+    SANDBOX_MEMORY_MB = 4096
+    SANDBOX_MAX_JOBS_PER_WORKER = 200
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import os
 import numpy as np
@@ -8,10 +9,16 @@ from typing import Dict, List, Optional
 
 from src.pipeline import TrustTablePipeline
 from src.schema import CoTTrace, ReasoningStep
-from src.llm_engine import LLMEngine
+from configs.config import Config
+from src.llm_engine import get_async_llm_engine, get_llm_engine
 from src.refiner import BlindIterativeRefiner
+from src.verifiers.base import get_decision_stats
+from utils.exec_pool import get_exec_pool
+from utils.verification_cache import get_verification_cache
+from utils.z3_exec import get_z3_stats
+from utils.llm_metrics import get_llm_metrics, llm_call_context
 from utils.logger import setup_logger
-from utils.table_utils import parse_structured_table
+from utils.table_handle import TableHandle
 
 
 @dataclass
@@ -112,9 +119,17 @@ def run_experiment():
         logger.error(f"Dataset not found at {data_path}")
         return
 
-    llm_engine = LLMEngine()
+    llm_engine = get_llm_engine()
     stats = EvalStats()
 
+    # One loop for the whole run so the async engine's HTTP pool is reused across traces.
+    loop = asyncio.new_event_loop() if Config.PIPELINE_ASYNC else None
+
+    def verify_trace(pipeline: TrustTablePipeline, trace: CoTTrace):
+        if loop is None:
+            return pipeline.run(trace)
+        return loop.run_until_complete(pipeline.arun(trace))
+
     logger.info(">>> STARTING EVALUATION LOOP <<<")
     
     for case_idx, data in enumerate(dataset):
@@ -123,13 +138,13 @@ def run_experiment():
         
 
         try:
-            df = parse_structured_table(data['table_content'])
+            table = TableHandle.from_dict(data['table_content'])
         except Exception as e:
             logger.error(f"Table parsing error for {case_id}: {e}")
             continue
 
-        pipeline = TrustTablePipeline(df)
-        refiner = BlindIterativeRefiner(df, llm_engine, refinement_enabled=True)
+        refiner = BlindIterativeRefiner(table, llm_engine, refinement_enabled=True)
+        pipeline = refiner.pipeline
         
         samples = data.get('generated_samples', {})
         
@@ -170,14 +185,15 @@ def run_experiment():
             # ==========================================================
             # PHASE 1: INITIAL VERIFICATION
             # ==========================================================
-            steps = llm_engine.decompose_cot(cot_text)
-            trace = CoTTrace(
-                question=data['original_question'],
-                steps=[ReasoningStep(i+1, s['content'], s['type']) for i, s in enumerate(steps)],
-                final_answer=gold_answer 
-            )
-
-            is_valid, error_report = pipeline.run(trace)
+            with llm_call_context(sample_id=f"{case_id}/{sample_key}", stage="verify"):
+                steps = llm_engine.decompose_cot(cot_text)
+                trace = CoTTrace(
+                    question=data['original_question'],
+                    steps=[ReasoningStep(i+1, s['content'], s['type'], triples=s.get('triples')) for i, s in enumerate(steps)],
+                    final_answer=gold_answer 
+                )
+
+                is_valid, error_report = verify_trace(pipeline, trace)
             
 
             if is_valid:
@@ -197,20 +213,21 @@ def run_experiment():
                 logger.info("🔧 Triggering Refinement...")
                 
 
-                repaired_cot = refiner._refine_cot(data['original_question'], cot_text, error_report)
+                with llm_call_context(sample_id=f"{case_id}/{sample_key}", stage="refine"):
+                    repaired_cot = refiner._refine_cot(data['original_question'], cot_text, error_report)
                 
 
-                new_steps = llm_engine.decompose_cot(repaired_cot)
+                    new_steps = llm_engine.decompose_cot(repaired_cot)
 
-                refined_answer = refiner._extract_answer(repaired_cot)
+                    refined_answer = refiner._extract_answer(repaired_cot)
                 
-                new_trace = CoTTrace(
-                    question=data['original_question'],
-                    steps=[ReasoningStep(i+1, s['content'], s['type']) for i, s in enumerate(new_steps)],
-                    final_answer=refined_answer
-                )
+                    new_trace = CoTTrace(
+                        question=data['original_question'],
+                        steps=[ReasoningStep(i+1, s['content'], s['type'], triples=s.get('triples')) for i, s in enumerate(new_steps)],
+                        final_answer=refined_answer
+                    )
                 
-                repaired_valid, _ = pipeline.run(new_trace)
+                    repaired_valid, _ = verify_trace(pipeline, new_trace)
                 
 
                 if repaired_valid:
@@ -224,7 +241,29 @@ def run_experiment():
                     logger.info("❌ Refinement Failed: Still Invalid.")
 
 
+    if loop is not None:
+        async def close_async_engine():
+            await get_async_llm_engine().aclose()
+        loop.run_until_complete(close_async_engine())
+        loop.close()
+
     stats.print_latex_report()
+    get_llm_metrics().print_report()
+    decisions = get_decision_stats().summary()
+    logger.info(f"Verdict paths: {decisions['paths']}")
+    logger.info(f"Resolved without an LLM call: {decisions['without_llm']}/{decisions['decided']} "
+                f"({decisions['without_llm_fraction']:.1%})")
+    if llm_engine.cache is not None:
+        logger.info(f"LLM cache: {llm_engine.cache.stats()}")
+    if get_verification_cache() is not None:
+        logger.info(f"Verification cache: {get_verification_cache().stats()}")
+    if get_z3_stats().summary()["audits"]:
+        logger.info(f"Z3 audits: {get_z3_stats().summary()}")
+    if get_exec_pool(create=False) is not None:
+        logger.info(f"Sandbox pool: {get_exec_pool(create=False).stats()}")
+    logger.info(f"Rate control: {llm_engine.rate_controller.stats()}")
+    if llm_engine.token_budget is not None:
+        logger.info(f"Token budget: {llm_engine.token_budget.stats()}")
 
 if __name__ == "__main__":
     run_experiment()
\ No newline at end of file
@@ -0,0 +1,268 @@
+"""
+Offline OpenAI-compatible stand-in for the chat-completions API used by LLMEngine.
+
+Serves scripted / recorded / synthesized completions with configurable latency,
+injected 429/500 errors and token accounting, so main.py and the CoT/PoT
+baselines can be benchmarked end-to-end without network access:
+
+    python mock_llm_server.py --port 8000 --latency lognormal:0.0,0.5 --error-429 0.02
+    LLM_BASE_URL=http://127.0.0.1:8000 LLM_CACHE_MODE=off python main.py
+
+GET /stats returns request/token/error counters, POST /reset clears them.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from utils.llm_cache import LLMResponseCache
+from utils.logger import setup_logger
+from utils.rate_control import estimate_tokens
+
+logger = setup_logger("MockLLMServer")
+
+# Request fields that are not part of LLMResponseCache keys.
+_NON_KEY_FIELDS = {"model", "messages", "temperature", "response_format", "stream", "timeout"}
+
+
+class LatencyModel:
+    """
+    Parses "fixed:S", "uniform:LO,HI", "lognormal:MU,SIGMA" or "exp:MEAN" (seconds),
+    plus an optional per-output-token cost to mimic decoding time.
+    """
+
+    def __init__(self, spec: str = "fixed:0", per_token_ms: float = 0.0, rng: Optional[random.Random] = None):
+        kind, _, args = spec.partition(":")
+        self.kind = kind
+        self.args = [float(a) for a in args.split(",") if a]
+        self.per_token_s = per_token_ms / 1000.0
+        self.rng = rng or random.Random()
+        if kind not in ("fixed", "uniform", "lognormal", "exp"):
+            raise ValueError(f"Unknown latency distribution '{spec}'")
+
+    def sample(self, completion_tokens: int = 0) -> float:
+        if self.kind == "fixed":
+            base = self.args[0] if self.args else 0.0
+        elif self.kind == "uniform":
+            base = self.rng.uniform(self.args[0], self.args[1])
+        elif self.kind == "lognormal":
+            base = self.rng.lognormvariate(self.args[0], self.args[1])
+        else:
+            base = self.rng.expovariate(1.0 / self.args[0])
+        return max(0.0, base) + completion_tokens * self.per_token_s
+
+
+class ResponseSource:
+    """Picks the completion text: scripted rule > recorded cache entry > synthesized default."""
+
+    def __init__(self, script_path: Optional[str] = None, replay_db: Optional[str] = None):
+        self.rules = []
+        if script_path:
+            with open(script_path, "r", encoding="utf-8") as f:
+                for rule in json.load(f).get("rules", []):
+                    self.rules.append((re.compile(rule["match"], re.DOTALL), rule["response"]))
+        self.recorded = LLMResponseCache(replay_db, mode="readwrite") if replay_db else None
+
+    def respond(self, body: dict) -> str:
+        messages = body.get("messages", [])
+        text = "\n".join(str(m.get("content", "")) for m in messages)
+
+        for pattern, response in self.rules:
+            if pattern.search(text):
+                return response if isinstance(response, str) else json.dumps(response)
+
+        if self.recorded is not None:
+            params = {k: v for k, v in body.items() if k not in _NON_KEY_FIELDS}
+            key = LLMResponseCache.make_key(
+                body.get("model"), messages, body.get("temperature"), body.get("response_format"), **params
+            )
+            hit = self.recorded.get(key)
+            if hit is not None:
+                return hit["content"]
+
+        return self._synthesize(messages, body.get("response_format"))
+
+    @staticmethod
+    def _synthesize(messages: List[Dict], response_format: Optional[dict]) -> str:
+        """Well-formed, always-passing answers shaped like each prompt family expects."""
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        user = messages[-1].get("content", "") if messages else ""
+
+        if "Reasoning Parser" in system:
+            match = re.search(r'### Raw CoT Text\s*"(.*)"', user, re.DOTALL)
+            cot = match.group(1) if match else user
+            sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", cot) if s.strip()]
+            steps = [
+                {"content": s, "type": "inference" if re.search(r"\b(so|therefore|since|thus|hence)\b|[<>=]", s) else "fact"}
+                for s in sentences
+            ]
+            return json.dumps({"steps": steps})
+        if "verification program per step" in system:
+            programs = []
+            for step_id, kind in re.findall(r"^(\d+)\. \[(fact|inference)\]", user, re.MULTILINE):
+                code = ("def verify_fact(df):\n    return True" if kind == "fact"
+                        else "def solve_logic():\n    return True, None")
+                programs.append({"step_id": int(step_id), "code": code})
+            return json.dumps({"programs": programs})
+        if "SMT-LIB2 script" in system:
+            return "```smt2\n(declare-const x Int)\n(assert (= x 1))\n(assert (> x 0))\n```"
+        if "extend a Z3 context" in system:
+            return "```python\ndef premises():\n    return []\n\ndef conclusion():\n    return BoolVal(True)\n```"
+        if "verify_fact" in system:
+            return "```python\ndef verify_fact(df):\n    return True\n```"
+        if "verify_reasoning" in system:
+            return "```python\ndef verify_reasoning(df):\n    return True\n```"
+        if "solve_logic" in system + user:
+            return "```python\ndef solve_logic():\n    return True, None\n```"
+        if "JUDGMENT" in system:
+            return "The reasoning cites the table correctly.\nJUDGMENT: ACCEPT"
+        if response_format and response_format.get("type") == "json_object":
+            return "{}"
+        return "Step 1: Read the relevant row.\nAnswer: mock"
+
+
+class MockState:
+    def __init__(self, args):
+        self.rng = random.Random(args.seed)
+        self.latency = LatencyModel(args.latency, args.per_token_ms, self.rng)
+        self.source = ResponseSource(args.script, args.replay_db)
+        self.error_429 = args.error_429
+        self.error_500 = args.error_500
+        self.retry_after = args.retry_after
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {
+                "requests": 0, "completions": 0, "errors_429": 0, "errors_500": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "inflight": 0, "peak_inflight": 0,
+            }
+
+    def bump(self, **deltas):
+        with self.lock:
+            for k, v in deltas.items():
+                self.counters[k] += v
+            self.counters["peak_inflight"] = max(self.counters["peak_inflight"], self.counters["inflight"])
+
+    def roll(self) -> Optional[int]:
+        with self.lock:
+            r = self.rng.random()
+        if r < self.error_429:
+            return 429
+        if r < self.error_429 + self.error_500:
+            return 500
+        return None
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    state: MockState = None
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            with self.state.lock:
+                self._send_json(200, dict(self.state.counters))
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length else b"{}"
+
+        if self.path.rstrip("/").endswith("/reset"):
+            self.state.reset()
+            self._send_json(200, {"ok": True})
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unsupported path {self.path}"}})
+            return
+
+        body = json.loads(raw or b"{}")
+        self.state.bump(requests=1, inflight=1)
+        try:
+            error = self.state.roll()
+            if error == 429:
+                self.state.bump(errors_429=1)
+                self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error"}},
+                                headers={"Retry-After": str(self.state.retry_after)})
+                return
+            if error == 500:
+                time.sleep(self.state.latency.sample())
+                self.state.bump(errors_500=1)
+                self._send_json(500, {"error": {"message": "Internal error (mock)", "type": "server_error"}})
+                return
+
+            content = self.state.source.respond(body)
+            prompt_tokens = estimate_tokens(body.get("messages", []))
+            completion_tokens = estimate_tokens(content) - 4
+            time.sleep(self.state.latency.sample(completion_tokens))
+
+            self.state.bump(completions=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+            self._send_json(200, {
+                "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            })
+        finally:
+            self.state.bump(inflight=-1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline mock of the chat-completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:S | uniform:LO,HI | lognormal:MU,SIGMA | exp:MEAN")
+    parser.add_argument("--per-token-ms", type=float, default=0.0, help="extra latency per completion token")
+    parser.add_argument("--error-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--error-500", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--script", default=None, help='JSON file: {"rules": [{"match": regex, "response": text}]}')
+    parser.add_argument("--replay-db", default=None, help="LLM cache SQLite file to serve recorded responses from")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    MockHandler.state = MockState(args)
+    server = ThreadingHTTPServer((args.host, args.port), MockHandler)
+    server.daemon_threads = True
+    logger.info(f"Mock LLM server on http://{args.host}:{args.port} (latency={args.latency}, "
+                f"429={args.error_429:.0%}, 500={args.error_500:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,25 @@
 import json
 import os
+import sys
 import time
 import re
-import random 
 import pandas as pd
 from google import genai
 from google.genai import types
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.rate_control import AdaptiveConcurrencyController, call_with_retries
+
 API_KEY = "xxx" 
 client = genai.Client(api_key=API_KEY)
 
 MODEL_ID =  "gpt-5-thinking"
 
-MAX_WORKERS = 1  
+# Upper bound on threads only; the controller adapts how many calls are in flight.
+MAX_WORKERS = 64
+CONTROLLER = AdaptiveConcurrencyController(name="ctq_fin", max_limit=MAX_WORKERS)
 
 def json_table_to_markdown(table_data):
     try:
@@ -114,11 +119,10 @@ def generate_qa(table_md, caption, claim, label):
     """
 
     max_retries = 5
-    base_delay = 5  
 
-    for attempt in range(max_retries):
-        try:
-            response = client.models.generate_content(
+    try:
+        response = call_with_retries(
+            lambda: client.models.generate_content(
                 model=MODEL_ID,
                 contents=user_prompt,
                 config=types.GenerateContentConfig(
@@ -126,34 +130,14 @@ def generate_qa(table_md, caption, claim, label):
                     temperature=0.1, 
                     response_mime_type="application/json"
                 )
-            )
-            return json.loads(clean_json_text(response.text))
-        
-        except Exception as e:
-            error_msg = str(e)
-            retry_keywords = [
-                "429",              
-                "500", "503",       
-                "SSL", "EOF",      
-                "disconnected",     
-                "closed connection" 
-            ]
-
-            is_retriable = any(k in error_msg for k in retry_keywords)
-
-            if is_retriable and attempt < max_retries - 1:
-
-                sleep_time = (base_delay * (2 ** attempt)) + random.uniform(0.5, 2.0)
-                tqdm.write(f"⚠️ 警告: 网络或限流 ({error_msg[:30]}...). 重试 {attempt+1}/{max_retries}, 等待 {sleep_time:.1f}s")
-                time.sleep(sleep_time)
-            elif not is_retriable:
-                tqdm.write(f"❌ API 错误 (不可重试): {error_msg}")
-                return None
-            else:
-                tqdm.write(f"❌ 最终失败 (达到最大重试次数): {error_msg}")
-                return None
-    
-    return None
+            ),
+            CONTROLLER,
+            max_retries=max_retries - 1,
+        )
+        return json.loads(clean_json_text(response.text))
+    except Exception as e:
+        tqdm.write(f"❌ 最终失败: {str(e)}")
+        return None
 
 def process_single_item(args):
     idx, item = args
@@ -216,6 +200,7 @@ def process_dataset_multithreaded(input_data_path):
             except Exception as e:
                 tqdm.write(f"Worker Exception: {e}")
 
+    tqdm.write(f"Rate control: {CONTROLLER.stats()}")
     results_buffer.sort(key=lambda x: x[0])
     return [res[1] for res in results_buffer]
 
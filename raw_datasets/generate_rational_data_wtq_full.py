@@ -1,13 +1,15 @@
 import json
 import re
 import os
+import sys
 import asyncio
-import random
 from typing import Dict, Any
 from tqdm.asyncio import tqdm_asyncio
 
 from openai import AsyncOpenAI
-import openai
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.rate_control import AdaptiveConcurrencyController, acall_with_retries
 
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "YOUR_KEY_HERE")
@@ -17,16 +19,11 @@ MODEL_ID = "gpt-5-thinking"
 INPUT_FILE = "./raw_datasets/wtq/test.json"
 OUTPUT_FILE = "./processed_data/wtq_qa.json"
 
-CONCURRENCY_LIMIT = 1          
-API_REQUEST_CONCURRENCY = 1    
-SLEEP_DELAY = 30              
-ENABLE_JITTER = True         
-
+# Request concurrency adapts to the provider's 429s / Retry-After (utils/rate_control.py).
 API_TIMEOUT_S = 90.0
 MAX_RETRIES = 5
-BASE_BACKOFF_S = 2.0
 
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
 
 
 
@@ -143,8 +140,8 @@ TYPE4_FORMAT = {
 
 
 class WTQFullGenerator:
-    def __init__(self, request_sem: asyncio.Semaphore):
-        self.request_sem = request_sem
+    def __init__(self, controller: AdaptiveConcurrencyController):
+        self.controller = controller
 
     async def _call_api(
         self,
@@ -158,59 +155,34 @@ class WTQFullGenerator:
         GPT-5 Thinking -> Responses API
         effort: minimal / low / medium / high
         """
-        for attempt in range(MAX_RETRIES):
-            try:
-                async with self.request_sem:
-                    resp = await asyncio.wait_for(
-                        client.responses.create(
-                            model=MODEL_ID,
-                            instructions=system_prompt,
-                            input=user_prompt,
-                            temperature=temperature,
-                            reasoning={"effort": effort},
-                            text={"format": fmt},
-                            store=False,
-                        ),
-                        timeout=API_TIMEOUT_S,
-                    )
-
-                txt = (resp.output_text or "").strip()
-                if not txt:
-                    return {"error": "EMPTY_OUTPUT"}
-
-                try:
-                    return json.loads(txt)
-                except Exception:
-                    return extract_json_from_text(txt)
-
-            except asyncio.TimeoutError:
-                return {"error": "TIMEOUT"}
-
-            except Exception as e:
-                status_code = getattr(e, "status_code", None)
-                retriable = (
-                    status_code in (429, 500, 503)
-                    or isinstance(
-                        e,
-                        (
-                            openai.RateLimitError,
-                            openai.APIConnectionError,
-                            openai.APITimeoutError,
-                            openai.InternalServerError,
-                        ),
-                    )
-                )
-
-                if retriable and attempt < MAX_RETRIES - 1:
-                    backoff = BASE_BACKOFF_S * (2 ** attempt)
-                    if ENABLE_JITTER:
-                        backoff *= random.uniform(0.8, 1.2)
-                    await asyncio.sleep(backoff)
-                    continue
-
-                return {"error": str(e)}
-
-        return {"error": "MAX_RETRIES_EXCEEDED"}
+        try:
+            resp = await acall_with_retries(
+                lambda: client.responses.create(
+                    model=MODEL_ID,
+                    instructions=system_prompt,
+                    input=user_prompt,
+                    temperature=temperature,
+                    reasoning={"effort": effort},
+                    text={"format": fmt},
+                    store=False,
+                ),
+                self.controller,
+                max_retries=MAX_RETRIES - 1,
+                timeout=API_TIMEOUT_S,
+            )
+        except asyncio.TimeoutError:
+            return {"error": "TIMEOUT"}
+        except Exception as e:
+            return {"error": str(e)}
+
+        txt = (resp.output_text or "").strip()
+        if not txt:
+            return {"error": "EMPTY_OUTPUT"}
+
+        try:
+            return json.loads(txt)
+        except Exception:
+            return extract_json_from_text(txt)
 
     async def generate_type_1_correct(self, table_str: str, question: str):
         system_prompt = (
@@ -322,62 +294,55 @@ Output JSON format:
 
         return await self._call_api(system_prompt, user_prompt, fmt=TYPE4_FORMAT, effort="medium", temperature=0.6)
 
-async def process_item(item_sem, generator: WTQFullGenerator, item: Dict[str, Any]):
-    async with item_sem:
-        try:
-            q_id = item.get("id", "unknown")
-            question = item.get("question", "")
-
-            answers = item.get("answers", [])
-            if isinstance(answers, list) and len(answers) > 0:
-                gold_answer = str(" ".join(map(str, answers)))
-            else:
-                gold_answer = str(answers) if answers else "Unknown"
-
-            table_data = item.get("table", {})
-            if not isinstance(table_data, dict):
-                return None
-
-            table_md = table_to_markdown(table_data)
-
-            
-            t1, t2_g, t2_a, t2_l, t3, t4 = await asyncio.gather(
-                generator.generate_type_1_correct(table_md, question),
-                generator.generate_type_2_flawed(table_md, question, gold_answer, "grounding"),
-                generator.generate_type_2_flawed(table_md, question, gold_answer, "arithmetic"),
-                generator.generate_type_2_flawed(table_md, question, gold_answer, "logic"),
-                generator.generate_type_3_wrong(table_md, question, gold_answer),
-                generator.generate_type_4_calc_error(table_md, question, gold_answer),
-            )
+async def process_item(generator: WTQFullGenerator, item: Dict[str, Any]):
+    try:
+        q_id = item.get("id", "unknown")
+        question = item.get("question", "")
 
-            result = {
-                "id": q_id,
-                "original_question": question,
-                "gold_answer": gold_answer,
-                "table_content": table_data,
-                "table_md": table_md,
-                "generated_samples": {
-                    "type1_correct": t1,
-                    "type2_grounding_error": t2_g,
-                    "type2_arithmetic_error": t2_a,
-                    "type2_logic_error": t2_l,
-                    "type3_fully_wrong": t3,
-                    "type4_calc_error": t4,
-                },
-            }
-
-            if SLEEP_DELAY > 0:
-                actual_sleep = float(SLEEP_DELAY)
-                if ENABLE_JITTER:
-                    actual_sleep *= random.uniform(0.8, 1.2)
-                await asyncio.sleep(actual_sleep)
-
-            return result
+        answers = item.get("answers", [])
+        if isinstance(answers, list) and len(answers) > 0:
+            gold_answer = str(" ".join(map(str, answers)))
+        else:
+            gold_answer = str(answers) if answers else "Unknown"
 
-        except Exception as e:
-            print(f"Error processing ID {item.get('id')}: {e}")
+        table_data = item.get("table", {})
+        if not isinstance(table_data, dict):
             return None
 
+        table_md = table_to_markdown(table_data)
+
+        
+        t1, t2_g, t2_a, t2_l, t3, t4 = await asyncio.gather(
+            generator.generate_type_1_correct(table_md, question),
+            generator.generate_type_2_flawed(table_md, question, gold_answer, "grounding"),
+            generator.generate_type_2_flawed(table_md, question, gold_answer, "arithmetic"),
+            generator.generate_type_2_flawed(table_md, question, gold_answer, "logic"),
+            generator.generate_type_3_wrong(table_md, question, gold_answer),
+            generator.generate_type_4_calc_error(table_md, question, gold_answer),
+        )
+
+        result = {
+            "id": q_id,
+            "original_question": question,
+            "gold_answer": gold_answer,
+            "table_content": table_data,
+            "table_md": table_md,
+            "generated_samples": {
+                "type1_correct": t1,
+                "type2_grounding_error": t2_g,
+                "type2_arithmetic_error": t2_a,
+                "type2_logic_error": t2_l,
+                "type3_fully_wrong": t3,
+                "type4_calc_error": t4,
+            },
+        }
+
+        return result
+
+    except Exception as e:
+        print(f"Error processing ID {item.get('id')}: {e}")
+        return None
+
 
 async def main():
     os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
@@ -390,18 +355,11 @@ async def main():
     with open(INPUT_FILE, "r", encoding="utf-8") as f:
         data = json.load(f)[171:211]
 
-    print(
-        f"Loaded {len(data)} items. "
-        f"item_concurrency={CONCURRENCY_LIMIT}, api_concurrency={API_REQUEST_CONCURRENCY}, "
-        f"sleep={SLEEP_DELAY}s..."
-    )
-
-    item_sem = asyncio.Semaphore(CONCURRENCY_LIMIT)
-    request_sem = asyncio.Semaphore(API_REQUEST_CONCURRENCY)
+    print(f"Loaded {len(data)} items. API concurrency is adaptive (AIMD on 429s).")
 
-    generator = WTQFullGenerator(request_sem=request_sem)
+    generator = WTQFullGenerator(controller=AdaptiveConcurrencyController(name="wtq_generator"))
 
-    tasks = [process_item(item_sem, generator, item) for item in data]
+    tasks = [process_item(generator, item) for item in data]
     results = []
 
     for fut in tqdm_asyncio.as_completed(tasks, desc="Generating All Types"):
@@ -413,6 +371,7 @@ async def main():
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
 
+    print(f"Rate control: {generator.controller.stats()}")
     print("Done!")
 
 
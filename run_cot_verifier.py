@@ -1,16 +1,17 @@
 import json
 import os
 import asyncio
-import functools
 from tqdm.asyncio import tqdm_asyncio
-from src.llm_engine import LLMEngine
+from src.llm_engine import get_async_llm_engine
+from utils.llm_cache import CacheMissError
+from utils.llm_metrics import get_llm_metrics, llm_call_context
 from utils.logger import setup_logger
 
 logger = setup_logger("CoT_Verifier_FineTuned")
 
 class StandardCoTVerifier:
     def __init__(self):
-        self.llm = LLMEngine()
+        self.llm = get_async_llm_engine()
         self.model_name = self.llm.model 
         self.temperature = 0.0
 
@@ -81,24 +82,17 @@ Analyze the candidate solution step-by-step. Is it fully correct?
 
             sys_p, user_p = self.construct_verification_prompt(table_str, question, reasoning, answer)
             
-            api_call_func = functools.partial(
-                self.llm.client.chat.completions.create,
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": sys_p},
-                    {"role": "user", "content": user_p} 
-                ],
-                temperature=self.temperature,
-                timeout=60.0 
-            )
-
-
-            response = await asyncio.wait_for(
-                asyncio.to_thread(api_call_func),
-                timeout=70.0 
-            )
+            with llm_call_context(sample_id=f"{original_item.get('id')}/{specific_subtype}", stage="baseline"):
+                raw_content = await self.llm.chat(
+                    messages=[
+                        {"role": "system", "content": sys_p},
+                        {"role": "user", "content": user_p} 
+                    ],
+                    temperature=self.temperature,
+                    timeout=60.0,
+                    call_site="cot_judge"
+                )
             
-            raw_content = response.choices[0].message.content
 
             decision = "UNKNOWN"
             if "JUDGMENT: ACCEPT" in raw_content:
@@ -121,6 +115,8 @@ Analyze the candidate solution step-by-step. Is it fully correct?
         except asyncio.TimeoutError:
             logger.warning(f"TIMEOUT: Verification timed out for {original_item.get('id')} - {specific_subtype}")
             return None
+        except CacheMissError:
+            raise
         except Exception as e:
             logger.error(f"Verification failed for {original_item.get('id')} - {specific_subtype}: {e}")
             return None
@@ -171,13 +167,8 @@ async def main():
     
     results = []
 
-    sem = asyncio.Semaphore(20) 
-    
-    async def sem_task(t):
-        async with sem:
-            return await t
-
-    async_tasks = [asyncio.create_task(sem_task(t)) for t in tasks]
+    # Request concurrency is governed by the engine's adaptive rate controller.
+    async_tasks = [asyncio.create_task(t) for t in tasks]
     
     if not async_tasks:
         print("No tasks created.")
@@ -192,6 +183,13 @@ async def main():
     print(f"Saving {len(results)} results to {OUTPUT_FILE}...")
     with open(OUTPUT_FILE, 'w') as f:
         json.dump(results, f, indent=2)
+    if verifier.llm.cache is not None:
+        print(f"LLM cache: {verifier.llm.cache.stats()}")
+    print(f"Rate control: {verifier.llm.rate_controller.stats()}")
+    get_llm_metrics().print_report()
+    if verifier.llm.token_budget is not None:
+        print(f"Token budget: {verifier.llm.token_budget.stats()}")
+    await verifier.llm.aclose()
     print("Done.")
 
 if __name__ == "__main__":
@@ -1,12 +1,15 @@
 import json
 import os
 import asyncio
-import functools
 import pandas as pd
 import io
 from tqdm.asyncio import tqdm_asyncio
-from src.llm_engine import LLMEngine
+from src.llm_engine import get_async_llm_engine
+from utils.llm_cache import CacheMissError
+from utils.llm_metrics import get_llm_metrics, llm_call_context
 from utils.logger import setup_logger
+from utils.exec_pool import execute_program
+from utils.table_handle import TableHandle
 
 import pandas as pd
 import numpy as np
@@ -15,7 +18,7 @@ logger = setup_logger("Code_Verifier")
 
 class CodeBasedVerifier:
     def __init__(self):
-        self.llm = LLMEngine()
+        self.llm = get_async_llm_engine()
 
         self.model_name = self.llm.model 
         self.temperature = 0.0
@@ -37,6 +40,8 @@ Your goal is to verify a "Reasoning Trace" by converting it into an executable P
 ### ROBUSTNESS RULES
 - The dataframe `df` contains strings. You MUST convert columns to numeric types (e.g., `pd.to_numeric`) before doing math.
 - Handle formatting (e.g., remove ',' or '$') before conversion.
+- `tv` is available without import: a pre-parsed view of `df` with `tv.num[col]` (floats, with ',', '$', '(1,234)', '%' and units
+  already handled), `tv.duration[col]`, `tv.date[col]` and `tv.text[col]` (lowercased, stripped). Prefer it for math and matching.
 - Use strict assertions.
 
 ### Output Format
@@ -73,35 +78,24 @@ Generate the Python verification code. """
             else:
 
                 return "ERROR_DATA_FORMAT", "Missing structured table content"
+        except Exception as e:
+            return "REJECT", f"Execution Error: {str(e)}"
 
 
-            code_str = code_str.replace("```python", "").replace("```", "").strip()
-            
-
-            local_scope = {}
-            global_scope = {"pd": pd, "np": np}
-            
+        code_str = code_str.replace("```python", "").replace("```", "").strip()
 
-            exec(code_str, global_scope, local_scope)
-            
+        # Runs in a sandboxed worker (timeout + memory cap), see utils/exec_pool.py
+        outcome = execute_program(code_str, "verify_reasoning", TableHandle(df), helpers=("tv",))
 
-            if "verify_reasoning" not in local_scope:
-                return "ERROR_NO_FUNCTION", "Function 'verify_reasoning' not found in generated code"
-            
-            verify_func = local_scope["verify_reasoning"]
-            
-
-            result = verify_func(df)
-            
-            if result is True:
+        if outcome.status == "no_entry":
+            return "ERROR_NO_FUNCTION", "Function 'verify_reasoning' not found in generated code"
+        if outcome.status == "ok":
+            if outcome.is_true:
                 return "ACCEPT", "Verification passed execution."
-            else:
-                return "REJECT", "Verification function returned False."
-
-        except AssertionError as e:
-            return "REJECT", f"Assertion Failed: {str(e)}"
-        except Exception as e:
-            return "REJECT", f"Execution Error: {str(e)}"
+            return "REJECT", "Verification function returned False."
+        if outcome.error_type == "AssertionError":
+            return "REJECT", f"Assertion Failed: {outcome.error}"
+        return "REJECT", f"Execution Error: {outcome.error}"
 
     async def verify_one_sample(self, original_item, sample_type, specific_subtype, sample_data):
         """
@@ -138,26 +132,22 @@ Generate the Python verification code. """
 
             sys_p, user_p = self.construct_code_gen_prompt(table_str, question, reasoning, answer)
             
-            api_call_func = functools.partial(
-                self.llm.client.chat.completions.create,
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": sys_p},
-                    {"role": "user", "content": user_p}
-                ],
-                temperature=self.temperature,
-                timeout=60.0 
-            )
-
-            response = await asyncio.wait_for(
-                asyncio.to_thread(api_call_func),
-                timeout=70.0 
-            )
+            with llm_call_context(sample_id=f"{original_item.get('id')}/{specific_subtype}", stage="baseline"):
+                generated_code = await self.llm.chat(
+                    messages=[
+                        {"role": "system", "content": sys_p},
+                        {"role": "user", "content": user_p}
+                    ],
+                    temperature=self.temperature,
+                    timeout=60.0,
+                    call_site="pot_codegen"
+                )
             
-            generated_code = response.choices[0].message.content
 
 
-            decision, rationale = self.execute_verification_code(generated_code, table_content)
+            decision, rationale = await asyncio.to_thread(
+                self.execute_verification_code, generated_code, table_content
+            )
             
             final_decision = "ACCEPT" if decision == "ACCEPT" else "REJECT"
 
@@ -172,6 +162,8 @@ Generate the Python verification code. """
         except asyncio.TimeoutError:
             logger.warning(f"TIMEOUT: Verification timed out for {original_item.get('id')}")
             return None
+        except CacheMissError:
+            raise
         except Exception as e:
             logger.error(f"Verification process failed: {e}")
             return None
@@ -225,13 +217,8 @@ async def main():
 
     results = []
 
-    sem = asyncio.Semaphore(10) 
-
-    async def sem_task(t):
-        async with sem:
-            return await t
-
-    async_tasks = [asyncio.create_task(sem_task(t)) for t in tasks]
+    # Request concurrency is governed by the engine's adaptive rate controller.
+    async_tasks = [asyncio.create_task(t) for t in tasks]
 
     if not async_tasks:
         print("No tasks created.")
@@ -245,6 +232,13 @@ async def main():
     print(f"Saving {len(results)} results to {OUTPUT_FILE}...")
     with open(OUTPUT_FILE, 'w') as f:
         json.dump(results, f, indent=2)
+    if verifier.llm.cache is not None:
+        print(f"LLM cache: {verifier.llm.cache.stats()}")
+    print(f"Rate control: {verifier.llm.rate_controller.stats()}")
+    get_llm_metrics().print_report()
+    if verifier.llm.token_budget is not None:
+        print(f"Token budget: {verifier.llm.token_budget.stats()}")
+    await verifier.llm.aclose()
     print("Done.")
 
 if __name__ == "__main__":
@@ -1,18 +1,141 @@
+import asyncio
 import json
 import re
-from openai import OpenAI
+import threading
+import time
+import weakref
+import httpx
+from openai import OpenAI, AsyncOpenAI
 from configs.config import Config
+from utils.llm_cache import CacheMissError, get_llm_cache
+from utils.llm_metrics import get_llm_metrics
+from utils.rate_control import (
+    get_rate_controller, get_token_budget, estimate_tokens, call_with_retries, acall_with_retries
+)
 from utils.logger import setup_logger
-from typing import List, Dict
+from typing import List, Dict, Optional
 logger = setup_logger("LLMEngine")
 
+# Returned when code generation fails; verifiers never cache verdicts of these.
+# CacheMissError (replay mode, unrecorded request) is re-raised instead: a replay
+# run must not turn a missing recording into a fallback verdict.
+PANDAS_FALLBACK_CODE = "def verify_fact(df): return False"
+Z3_FALLBACK_CODE = "def solve_logic(): raise Exception('LLM Generation Failed')"
+Z3_STEP_FALLBACK_CODE = "def conclusion(): raise Exception('LLM Generation Failed')"
+Z3_SMT_FALLBACK_CODE = "; LLM Generation Failed"
+FALLBACK_CODES = (PANDAS_FALLBACK_CODE, Z3_FALLBACK_CODE, Z3_STEP_FALLBACK_CODE, Z3_SMT_FALLBACK_CODE)
+
+# Part of the verification-cache key: bump when a prompt changes what programs look like.
+PROMPT_VERSION = "2"
+
+def _numeric_columns_section(numeric_columns: str) -> str:
+    """Z3 prompt section for Config.Z3_TABLE_ENCODING; empty when the table has no numeric columns."""
+    if not numeric_columns:
+        return ""
+    return f"""
+### Numeric Columns (pre-encoded, not shown above)
+{numeric_columns}
+`col(name)[row]` is the exact Z3 value of a cell (`row` = the 'row' position in the Table Context).
+`col(name)` also supports `len()`, iteration over its cells, `.rows()`, `.max()`, `.min()` and `.sum()`.
+Read table numbers through `col()`; never copy them into the code.
+"""
+
+
 class LLMEngine:
     def __init__(self):
-        self.client = OpenAI(api_key=Config.API_KEY, base_url=Config.BASE_URL)
+        # Retries are handled by the shared rate controller, not inside the SDK,
+        # so every 429 is observed and Retry-After is honoured globally.
+        self.client = OpenAI(api_key=Config.API_KEY, base_url=Config.BASE_URL, max_retries=0)
         self.model = Config.MODEL_NAME
+        self.cache = get_llm_cache()
+        self.rate_controller = get_rate_controller(Config.BASE_URL)
+        self.token_budget = get_token_budget(Config.BASE_URL)
+        self.metrics = get_llm_metrics()
+
+    def chat(self, messages: List[Dict], temperature: float = Config.TEMPERATURE,
+             response_format: Optional[dict] = None, timeout: Optional[float] = None,
+             call_site: str = "chat", **params) -> str:
+        """
+        Single entry point for chat completions; returns the message content.
+        Responses are served from / recorded into the on-disk cache when enabled.
+        `timeout` and `call_site` (metrics tag) are not part of the cache key.
+        """
+        started = time.perf_counter()
+        key, cached = self._cache_lookup(messages, temperature, response_format, params)
+        if cached is not None:
+            self._record_call(call_site, started, cached=cached)
+            return cached["content"]
+
+        request = self._build_request(messages, temperature, response_format, timeout, params)
+        timing = {"attempts": 0, "ttfb": None}
+
+        def send():
+            timing["attempts"] += 1
+            sent = time.perf_counter()
+            with self.client.chat.completions.with_streaming_response.create(**request) as raw:
+                timing["ttfb"] = time.perf_counter() - sent
+                return raw.parse()
+
+        try:
+            response = call_with_retries(
+                send, self.rate_controller,
+                budget=self.token_budget, tokens=self._estimate_cost(messages, params),
+            )
+        except Exception as e:
+            self._record_call(call_site, started, timing=timing, error=e)
+            raise
+        self._record_call(call_site, started, timing=timing, response=response)
+        return self._cache_store(key, response)
+
+    def _cache_lookup(self, messages, temperature, response_format, params):
+        if self.cache is None:
+            return None, None
+        key = self.cache.make_key(self.model, messages, temperature, response_format, **params)
+        return key, self.cache.get(key)
+
+    def _record_call(self, call_site, started, timing=None, response=None, cached=None, error=None):
+        usage = (cached or {}).get("usage") or {}
+        if response is not None and getattr(response, "usage", None) is not None:
+            usage = {"prompt_tokens": response.usage.prompt_tokens,
+                     "completion_tokens": response.usage.completion_tokens}
+        attempts = timing["attempts"] if timing else 0
+        self.metrics.record(
+            call_site,
+            prompt_tokens=usage.get("prompt_tokens") or 0,
+            completion_tokens=usage.get("completion_tokens") or 0,
+            ttfb_s=timing["ttfb"] if timing else None,
+            latency_s=time.perf_counter() - started,
+            retries=max(0, attempts - 1),
+            cache_hit=cached is not None,
+            error=type(error).__name__ if error is not None else None,
+        )
+
+    def _build_request(self, messages, temperature, response_format, timeout, params) -> dict:
+        request = dict(model=self.model, messages=messages, temperature=temperature, **params)
+        if response_format is not None:
+            request["response_format"] = response_format
+        if timeout is not None:
+            request["timeout"] = timeout
+        return request
+
+    def _estimate_cost(self, messages, params) -> int:
+        if self.token_budget is None:
+            return 0
+        completion = params.get("max_tokens") or Config.LLM_EXPECTED_COMPLETION_TOKENS
+        return estimate_tokens(messages, expected_completion=completion)
+
+    def _cache_store(self, key, response) -> str:
+        content = response.choices[0].message.content
+        if self.cache is not None:
+            usage = response.usage.model_dump() if getattr(response, "usage", None) else None
+            self.cache.put(key, self.model, content, usage)
+        return content
+
+    def _autoformalize_request(self, premise_text: str, conclusion_text: str, table_context: str = "",
+                               numeric_columns: str = "") -> dict:
+        if Config.Z3_FORMAT == "smtlib":
+            return self._autoformalize_smt_request(premise_text, conclusion_text, table_context)
 
-    def autoformalize_to_z3(self, premise_text: str, conclusion_text: str, table_context: str = "") -> str:
-        
         system_prompt = """You are an expert in Formal Verification.
 Your task is to verify if a Conclusion follows from the Premise, GIVEN the Table Data context.
 
@@ -34,7 +157,7 @@ Your task is to verify if a Conclusion follows from the Premise, GIVEN the Table
         user_prompt = f"""
 ### Table Context (Ground Truth)
 {table_context}
-
+{_numeric_columns_section(numeric_columns)}
 ### Premise
 "{premise_text}"
 
@@ -63,25 +186,135 @@ def solve_logic():
         return False, s.model() # Invalid
     return True, None # Valid
 """
+        return dict(
+            call_site="autoformalize_to_z3",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.1 
+        )
+
+    def _autoformalize_smt_request(self, premise_text: str, conclusion_text: str, table_context: str = "") -> dict:
+        """Config.Z3_FORMAT == "smtlib": the audit as an SMT-LIB2 script, loaded with z3.parse_smt2_string."""
+        system_prompt = """You are an expert in Formal Verification.
+Your task is to verify if a Conclusion follows from the Premise, GIVEN the Table Data context.
+
+### Write an SMT-LIB2 script
+1. `declare-const` every quantity (`Int`, `Real` for decimals, ratios and percentages, `Bool`).
+2. One `(assert ...)` per premise. Table Context values the conclusion needs are axioms: assert them too.
+3. The LAST `(assert ...)` is the Conclusion itself. Do NOT negate it: it is checked by contradiction for you.
+4. No `check-sat`, `get-model` or Python: only declarations, `define-fun` and assertions.
+"""
+        user_prompt = f"""
+### Table Context (Ground Truth)
+{table_context}
+
+### Premise
+"{premise_text}"
+
+### Conclusion
+"{conclusion_text}"
+
+### Example: "A has 19 Total and B has 10 Total, so A has more"
+```smt2
+(declare-const A_Total Int)
+(declare-const B_Total Int)
+(assert (= A_Total 19))
+(assert (= B_Total 10))
+(assert (> A_Total B_Total))
+```
+"""
+        return dict(
+            call_site="autoformalize_to_z3",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.1
+        )
+
+    def autoformalize_to_z3(self, premise_text: str, conclusion_text: str, table_context: str = "",
+                            numeric_columns: str = "") -> str:
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1 
-            )
-            
-            raw_content = response.choices[0].message.content
+            raw_content = self.chat(**self._autoformalize_request(premise_text, conclusion_text, table_context,
+                                                                  numeric_columns))
             return self._clean_code(raw_content)
 
+        except CacheMissError:
+            raise
         except Exception as e:
             logger.error(f"LLM Generation Failed: {e}")
-            return "def solve_logic(): raise Exception('LLM Generation Failed')"
+            return Z3_SMT_FALLBACK_CODE if Config.Z3_FORMAT == "smtlib" else Z3_FALLBACK_CODE
+
+    def _formalize_step_request(self, new_facts: List[str], conclusion_text: str, symbols: List[str],
+                                table_context: str = "", numeric_columns: str = "") -> dict:
+        """One inference step against a trace's persistent Z3 context (Config.Z3_INCREMENTAL)."""
+        system_prompt = """You are an expert in Formal Verification.
+You extend a Z3 context that is built up one reasoning step at a time. Facts already in the context are listed
+as Declared Symbols; they stay asserted, so do NOT restate them.
+
+### Write two functions
+1. `premises()` -> a list of Z3 constraints encoding ONLY the New Facts (return [] if there are none).
+   Table Context values the conclusion needs are axioms: encode them here too.
+2. `conclusion()` -> ONE Z3 Bool expression for the Conclusion.
+   Do not create a Solver: the conclusion is checked against every asserted fact by contradiction.
+   A step that only defines a rule ("A win gives 3 points") returns `BoolVal(True)`.
+
+### Rules
+- A symbol is identified by name and sort: `Int('Brazil_Total')` here IS the declared `Brazil_Total: Int`. Reuse declared names.
+- In scope: `Int, Ints, Real, Reals, Bool, Bools, IntVal, RealVal, BoolVal, And, Or, Not, Implies, If, Distinct`.
+- Use `Real` for decimals, ratios and percentages.
+"""
+        facts = "\n".join(f"- {f}" for f in new_facts) if new_facts else "(none)"
+        declared = "\n".join(symbols) if symbols else "(none)"
+        user_prompt = f"""
+### Table Context (Ground Truth)
+{table_context}
+{_numeric_columns_section(numeric_columns)}
+### Declared Symbols
+{declared}
+
+### New Facts
+{facts}
+
+### Conclusion
+"{conclusion_text}"
+
+### Example
+```python
+def premises():
+    A_Total, B_Total = Ints('A_Total B_Total')
+    return [A_Total == 19, B_Total == 10]
+
+def conclusion():
+    A_Total, B_Total = Ints('A_Total B_Total')
+    return A_Total > B_Total
+```
+"""
+        return dict(
+            call_site="formalize_step",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.1
+        )
+
+    def formalize_step(self, new_facts: List[str], conclusion_text: str, symbols: List[str],
+                       table_context: str = "", numeric_columns: str = "") -> str:
+        try:
+            raw_content = self.chat(**self._formalize_step_request(new_facts, conclusion_text, symbols, table_context,
+                                                                   numeric_columns))
+            return self._clean_code(raw_content)
+        except CacheMissError:
+            raise
+        except Exception as e:
+            logger.error(f"LLM Generation Failed: {e}")
+            return Z3_STEP_FALLBACK_CODE
         
         
-    def autoformalize_to_z3_1(self, premise_text: str, conclusion_text: str) -> str:
+    def _autoformalize_request_1(self, premise_text: str, conclusion_text: str) -> dict:
         
         system_prompt = """You are an expert in Formal Verification and Z3 Theorem Prover.
 Your task is to translate Natural Language Reasoning into executable Python Z3 code to verify its logical validity.
@@ -149,25 +382,104 @@ def solve_logic():
         return False, s.model() # Invalid
     return True, None # Valid
 ```"""
+        return dict(
+            call_site="autoformalize_to_z3",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.1 
+        )
+
+    def autoformalize_to_z3_1(self, premise_text: str, conclusion_text: str) -> str:
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1 
-            )
-            
-            raw_content = response.choices[0].message.content
+            raw_content = self.chat(**self._autoformalize_request_1(premise_text, conclusion_text))
             return self._clean_code(raw_content)
 
+        except CacheMissError:
+            raise
         except Exception as e:
             logger.error(f"LLM Generation Failed: {e}")
-            return "def solve_logic(): raise Exception('LLM Generation Failed')"
+            return Z3_FALLBACK_CODE
+    def _formalize_trace_request(self, steps: List[Dict], columns: list, sample_data: str,
+                                 table_context: str = "", column_types: str = "") -> dict:
+        """`steps` are {"step_id", "content", "type"} dicts of one decomposed trace."""
+        system_prompt = """You are a Formal Verification assistant for TableQA reasoning traces.
+You receive a whole reasoning trace, already split into numbered steps, and write ONE verification program per step.
+
+### Step types
+1. **fact** -> a Python function `def verify_fact(df): -> bool` using Pandas.
+   - `df` is the full table as a DataFrame of strings; use the exact column names from the schema.
+   - ALWAYS use `.astype(str).str.strip()` for comparisons; check filtered frames are non-empty before `.values[0]`.
+   - `find_rows(mention, column=None, k=5)` returns row positions (for `df.iloc`) best matching a mention, tolerant to case/spacing/typos.
+   - `tv` is a pre-parsed view of `df`: `tv.num[col]` (floats; '$1,234', '(12)', '45%', '3 mg' already parsed), `tv.duration[col]`,
+     `tv.date[col]`, `tv.text[col]` (lowercased, stripped). Prefer it over `pd.to_numeric` / `str.replace` on `df`.
+   - Return True if the table supports the claim, False if it contradicts it or the entity is not found.
+   - Statements of intent ("We need to check column X") are not falsifiable: return True.
+2. **inference** -> a Python function `def solve_logic(): -> (bool, model)` using Z3 (`Solver`, `Int`, `Real`, `And`, `Not`, `Implies`, `If`, `sat`, ... are in scope).
+   - The premises are the fact steps that come before it; the Table Context values are hard constraints (axioms).
+   - For "highest / lowest / rank" conclusions compare against the values in the Table Context.
+   - Prove by contradiction: add `Not(conclusion)`; `sat` means invalid -> `return False, s.model()`, otherwise `return True, None`.
+   - A step that only defines a rule ("A win gives 3 points") is an axiom: `return True, None`.
+
+### Output Format
+Return a JSON object:
+{"programs": [{"step_id": 1, "code": "def verify_fact(df):\\n    ..."}, {"step_id": 2, "code": "def solve_logic():\\n    ..."}]}
+One entry per step, code as a plain string (no markdown fences).
+"""
+        step_lines = "\n".join(f'{s["step_id"]}. [{s["type"]}] "{s["content"]}"' for s in steps)
+        types_line = f"- Column Types (tv): {column_types}\n" if column_types else ""
+        user_prompt = f"""
+### Table Schema
+- Columns: {columns}
+- Sample Data (First rows): {sample_data}
+{types_line}
+### Table Context (Ground Truth)
+{table_context}
+
+### Reasoning Trace
+{step_lines}
+
+### Task
+Write the verification program for every step. Return JSON.
+"""
+        return dict(
+            call_site="formalize_trace",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.0
+        )
+
+    def _parse_programs(self, raw_content: str) -> Dict[int, str]:
+        programs = {}
+        for item in json.loads(raw_content).get("programs", []):
+            try:
+                programs[int(item["step_id"])] = self._clean_code(str(item["code"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return programs
+
+    def formalize_trace(self, steps: List[Dict], columns: list, sample_data: str, table_context: str = "",
+                        column_types: str = "") -> Dict[int, str]:
+        """
+        All verify_fact / solve_logic programs of a trace in one call, keyed by step_id.
+        Returns {} on failure; steps missing from the result are formalized one by one.
+        """
+        try:
+            raw_content = self.chat(**self._formalize_trace_request(steps, columns, sample_data, table_context, column_types))
+            return self._parse_programs(raw_content)
+        except CacheMissError:
+            raise
+        except Exception as e:
+            logger.error(f"Trace Formalization Failed: {e}")
+            return {}
+
     def _clean_code(self, text: str) -> str:
 
-        pattern = r"```(?:python)?\s*(.*?)```"
+        pattern = r"```(?:python|smt2|smtlib2?|smt|lisp)?\s*(.*?)```"
         match = re.search(pattern, text, re.DOTALL)
         if match:
             return match.group(1).strip()
@@ -175,7 +487,7 @@ def solve_logic():
         return text.strip()
     
 
-    def decompose_cot(self, cot_text: str) -> List[Dict]:
+    def _decompose_request(self, cot_text: str, with_triples: bool = False) -> dict:
         
         system_prompt = """You are a Reasoning Parser for TableQA tasks.
 Your goal is to break down a raw Chain-of-Thought (CoT) paragraph into atomic, executable steps.
@@ -193,6 +505,17 @@ Example:
     {"content": "Since 19 is greater than 10, Brazil wins.", "type": "inference"}
   ]
 }
+"""
+        if with_triples:
+            system_prompt += """
+### Grounding Triples (fact steps only)
+If a fact step is a plain table lookup, add a "triples" list to it. Each triple names
+the row by a cell value that identifies it, the column, and the claimed value:
+{"content": "Brazil has 19 total medals.", "type": "fact",
+ "triples": [{"row_key": "Brazil", "row_column": "Nation", "column": "Total", "value": "19", "op": "=="}]}
+- "row_column" is the column holding "row_key" (optional); "column" must be an exact column name.
+- "op" is one of "==", "!=", ">", "<", ">=", "<=", "contains".
+- Omit "triples" when the claim is not a simple lookup (aggregates, rankings, counts, intent).
 """
 
         user_prompt = f"""
@@ -203,25 +526,32 @@ Example:
 Decompose this text into atomic steps. Return JSON.
 """
 
+        return dict(
+            call_site="decompose_cot",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            response_format={"type": "json_object"}, 
+            temperature=0.0 
+        )
+
+    def decompose_cot(self, cot_text: str, with_triples: Optional[bool] = None) -> List[Dict]:
+        if with_triples is None:
+            with_triples = Config.DECOMPOSE_TRIPLES
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"}, 
-                temperature=0.0 
-            )
+            raw_content = self.chat(**self._decompose_request(cot_text, with_triples))
             
-            result = json.loads(response.choices[0].message.content)
+            result = json.loads(raw_content)
             return result.get("steps", [])
 
+        except CacheMissError:
+            raise
         except Exception as e:
             logger.error(f"CoT Decomposition Failed: {e}")
             return [{"content": cot_text, "type": "inference"}]
         
-    def generate_pandas_check(self, claim: str, columns: list, sample_data: str) -> str:
+    def _pandas_check_request(self, claim: str, columns: list, sample_data: str, column_types: str = "") -> dict:
         system_prompt = """You are a Python Pandas Expert for TableQA verification.
 Your goal is to write a Python function `verify_fact(df)` that checks if a natural language claim is supported by the given DataFrame.
 
@@ -231,6 +561,14 @@ Your goal is to write a Python function `verify_fact(df)` that checks if a natur
    - Example: `df[df['Yacht'].str.contains('Ausmaid', na=False)]`
 2. **Partial Match**: If a specific time '3:06:02:29' is mentioned, try to match the most unique part (like the yacht name) first, then verify the time value in that row.
 3. **Column Names**: Use the exact column names provided in the Schema.
+4. **Row Lookup Helper**: `find_rows(mention, column=None, k=5)` is available without import. It returns the row
+   positions (use with `df.iloc`) whose cells best match `mention`, tolerant to case, spacing and small typos.
+   Prefer it over scanning with `str.contains`: `rows = df.iloc[find_rows('Ausmaid', 'Yacht', k=1)]`
+5. **Typed View**: `tv` is available without import and shares `df`'s index. Numbers, durations and dates are already parsed:
+   - `tv.num[col]`: floats ('1,234', '$5', '(1,234)' -> -1234, '45%' -> 45.0, '12.5 mg' -> 12.5), NaN where not numeric.
+   - `tv.duration[col]`: Timedelta ('3:06:02:29' = 3 days 06:02:29), `tv.date[col]`: datetime64.
+   - `tv.text[col]`: lowercased, whitespace-collapsed strings (every column).
+   Use these instead of `pd.to_numeric` / `str.replace` / `str.strip` on `df`, e.g. `tv.num.loc[rows.index, 'Total']`.
 
 ### Requirements
 1. **Function Signature**: `def verify_fact(df): -> bool`
@@ -248,33 +586,39 @@ Your goal is to write a Python function `verify_fact(df)` that checks if a natur
 4. **Output**: Return ONLY the code block.
 """
 
+        types_line = f"- Column Types (tv): {column_types}\n" if column_types else ""
         user_prompt = f"""
 ### Table Schema
 - Columns: {columns}
 - Sample Data (First row): {sample_data}
-
+{types_line}
 ### Claim to Verify
 "{claim}"
 
 ### Task
 Write the `verify_fact(df)` function.
 """
+        return dict(
+            call_site="generate_pandas_check",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.0
+        )
+
+    def generate_pandas_check(self, claim: str, columns: list, sample_data: str, column_types: str = "") -> str:
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.0
-            )
-            return self._clean_code(response.choices[0].message.content)
+            raw_content = self.chat(**self._pandas_check_request(claim, columns, sample_data, column_types))
+            return self._clean_code(raw_content)
+        except CacheMissError:
+            raise
         except Exception as e:
             logger.error(f"Pandas Gen Failed: {e}")
-            return "def verify_fact(df): return False"
+            return PANDAS_FALLBACK_CODE
         
 
-    def refine_logic_proof(self, question: str, old_cot: str, error_report: dict) -> str:
+    def _refine_proof_request(self, question: str, old_cot: str, error_report: dict) -> dict:
         module = error_report.get("module", "")
         reason = error_report.get("reason", "")
         failed_step = error_report.get("step_content", "")
@@ -312,17 +656,198 @@ Rewrite the Reasoning Chain to be a "Strict Proof". If it's a comparison task, y
 ### Fortified Reasoning Chain:
 """
 
+        return dict(
+            call_site="refine_logic_proof",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.2,
+            top_p=0.1
+        )
+
+    def refine_logic_proof(self, question: str, old_cot: str, error_report: dict) -> str:
+        try:
+            raw_content = self.chat(**self._refine_proof_request(question, old_cot, error_report))
+            return raw_content.strip()
+        except CacheMissError:
+            raise
+        except Exception as e:
+            logger.error(f"Refinement Failed: {e}")
+            return old_cot
+
+
+class AsyncLLMEngine(LLMEngine):
+    """
+    asyncio counterpart of LLMEngine built on AsyncOpenAI.
+
+    Same prompts, cache and fallbacks, but every call is a coroutine running on
+    one keep-alive httpx pool, so thousands of requests can share a single event
+    loop. Cancelling the awaiting task (e.g. via asyncio.wait_for) aborts the
+    HTTP request instead of leaving a worker thread behind.
+    """
+
+    def __init__(self):
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=Config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY_S,
+            ),
+            timeout=httpx.Timeout(Config.LLM_REQUEST_TIMEOUT_S, connect=10.0),
+        )
+        self.client = AsyncOpenAI(
+            api_key=Config.API_KEY, base_url=Config.BASE_URL, http_client=self.http_client, max_retries=0
+        )
+        self.model = Config.MODEL_NAME
+        self.cache = get_llm_cache()
+        self.rate_controller = get_rate_controller(Config.BASE_URL)
+        self.token_budget = get_token_budget(Config.BASE_URL)
+        self.metrics = get_llm_metrics()
+
+    async def aclose(self):
+        await self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def chat(self, messages: List[Dict], temperature: float = Config.TEMPERATURE,
+                   response_format: Optional[dict] = None, timeout: Optional[float] = None,
+                   call_site: str = "chat", **params) -> str:
+        started = time.perf_counter()
+        key, cached = self._cache_lookup(messages, temperature, response_format, params)
+        if cached is not None:
+            self._record_call(call_site, started, cached=cached)
+            return cached["content"]
+
+        # `timeout` bounds each attempt once admitted by the rate controller,
+        # so time spent queueing for a slot is not counted against it.
+        request = self._build_request(messages, temperature, response_format, timeout, params)
+        timing = {"attempts": 0, "ttfb": None}
+
+        async def send():
+            timing["attempts"] += 1
+            sent = time.perf_counter()
+            async with self.client.chat.completions.with_streaming_response.create(**request) as raw:
+                timing["ttfb"] = time.perf_counter() - sent
+                return await raw.parse()
+
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.2,
-                top_p=0.1
+            response = await acall_with_retries(
+                send, self.rate_controller, timeout=timeout,
+                budget=self.token_budget, tokens=self._estimate_cost(messages, params),
             )
-            return response.choices[0].message.content.strip()
+        except Exception as e:
+            self._record_call(call_site, started, timing=timing, error=e)
+            raise
+        self._record_call(call_site, started, timing=timing, response=response)
+        return self._cache_store(key, response)
+
+    async def autoformalize_to_z3(self, premise_text: str, conclusion_text: str, table_context: str = "",
+                                  numeric_columns: str = "") -> str:
+        try:
+            raw_content = await self.chat(**self._autoformalize_request(premise_text, conclusion_text, table_context,
+                                                                        numeric_columns))
+            return self._clean_code(raw_content)
+        except CacheMissError:
+            raise
+        except Exception as e:
+            logger.error(f"LLM Generation Failed: {e}")
+            return Z3_SMT_FALLBACK_CODE if Config.Z3_FORMAT == "smtlib" else Z3_FALLBACK_CODE
+
+    async def formalize_step(self, new_facts: List[str], conclusion_text: str, symbols: List[str],
+                             table_context: str = "", numeric_columns: str = "") -> str:
+        try:
+            raw_content = await self.chat(**self._formalize_step_request(new_facts, conclusion_text, symbols,
+                                                                         table_context, numeric_columns))
+            return self._clean_code(raw_content)
+        except CacheMissError:
+            raise
+        except Exception as e:
+            logger.error(f"LLM Generation Failed: {e}")
+            return Z3_STEP_FALLBACK_CODE
+
+    async def autoformalize_to_z3_1(self, premise_text: str, conclusion_text: str) -> str:
+        try:
+            raw_content = await self.chat(**self._autoformalize_request_1(premise_text, conclusion_text))
+            return self._clean_code(raw_content)
+        except CacheMissError:
+            raise
+        except Exception as e:
+            logger.error(f"LLM Generation Failed: {e}")
+            return Z3_FALLBACK_CODE
+
+    async def decompose_cot(self, cot_text: str, with_triples: Optional[bool] = None) -> List[Dict]:
+        if with_triples is None:
+            with_triples = Config.DECOMPOSE_TRIPLES
+        try:
+            raw_content = await self.chat(**self._decompose_request(cot_text, with_triples))
+            result = json.loads(raw_content)
+            return result.get("steps", [])
+        except CacheMissError:
+            raise
+        except Exception as e:
+            logger.error(f"CoT Decomposition Failed: {e}")
+            return [{"content": cot_text, "type": "inference"}]
+
+    async def generate_pandas_check(self, claim: str, columns: list, sample_data: str, column_types: str = "") -> str:
+        try:
+            raw_content = await self.chat(**self._pandas_check_request(claim, columns, sample_data, column_types))
+            return self._clean_code(raw_content)
+        except CacheMissError:
+            raise
+        except Exception as e:
+            logger.error(f"Pandas Gen Failed: {e}")
+            return PANDAS_FALLBACK_CODE
+
+    async def formalize_trace(self, steps: List[Dict], columns: list, sample_data: str,
+                              table_context: str = "", column_types: str = "") -> Dict[int, str]:
+        try:
+            raw_content = await self.chat(**self._formalize_trace_request(steps, columns, sample_data, table_context, column_types))
+            return self._parse_programs(raw_content)
+        except CacheMissError:
+            raise
+        except Exception as e:
+            logger.error(f"Trace Formalization Failed: {e}")
+            return {}
+
+    async def refine_logic_proof(self, question: str, old_cot: str, error_report: dict) -> str:
+        try:
+            raw_content = await self.chat(**self._refine_proof_request(question, old_cot, error_report))
+            return raw_content.strip()
+        except CacheMissError:
+            raise
         except Exception as e:
             logger.error(f"Refinement Failed: {e}")
-            return old_cot
\ No newline at end of file
+            return old_cot
+
+
+_shared_engine: Optional[LLMEngine] = None
+_shared_lock = threading.Lock()
+_async_engines: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncLLMEngine]" = weakref.WeakKeyDictionary()
+
+
+def get_llm_engine() -> LLMEngine:
+    """Process-wide LLMEngine, so every pipeline/verifier/refiner shares one HTTP pool."""
+    global _shared_engine
+    with _shared_lock:
+        if _shared_engine is None:
+            _shared_engine = LLMEngine()
+        return _shared_engine
+
+
+def get_async_llm_engine() -> AsyncLLMEngine:
+    """
+    Shared AsyncLLMEngine for the running event loop (an httpx async pool cannot
+    be used across loops). Must be called from inside a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    with _shared_lock:
+        engine = _async_engines.get(loop)
+        if engine is None:
+            engine = AsyncLLMEngine()
+            _async_engines[loop] = engine
+        return engine
@@ -1,36 +1,190 @@
-from typing import Tuple, Optional, List
+import asyncio
+from typing import Dict, Tuple, Optional, List, Union
 import pandas as pd
+from configs.config import Config
 from src.schema import CoTTrace, VerificationResult, ReasoningStep
+from src.verifiers.base import get_decision_stats
 from src.verifiers.fact_checker import FactChecker
-from src.verifiers.z3_auditor import Z3Auditor
+from src.verifiers.z3_auditor import TraceSession, Z3Auditor
+from src.llm_engine import AsyncLLMEngine, LLMEngine
 from utils.logger import setup_logger
+from utils.table_handle import TableHandle
 
 logger = setup_logger("TrustTablePipeline")
 
 class TrustTablePipeline:
-    def __init__(self, table_df: pd.DataFrame):
-        self.table = table_df
-        self.fact_checker = FactChecker(table_df)
-        self.z3_auditor = Z3Auditor(table_df)
+    def __init__(self, table: Union[TableHandle, pd.DataFrame], llm: Optional[LLMEngine] = None,
+                 async_llm: Optional[AsyncLLMEngine] = None):
+        self.handle = TableHandle.wrap(table)
+        self.table = self.handle.df
+        self.fact_checker = FactChecker(self.handle, llm, async_llm)
+        self.z3_auditor = Z3Auditor(self.handle, llm, async_llm)
 
-def run(self, trace: CoTTrace) -> Tuple[bool, Optional[dict]]:
+    def run(self, trace: CoTTrace) -> Tuple[bool, Optional[dict]]:
         logger.info(f"Starting verification for Q: {trace.question}")
+        decided = self._fast_results(trace)
+        programs = self._formalize(trace, decided) if Config.FUSED_FORMALIZATION else {}
+        session = self.z3_auditor.begin_trace() if Config.Z3_INCREMENTAL else None
         verified_facts = []
         for step in trace.steps:
-            if step.step_type == "fact":
-                res = self.fact_checker.verify(step, context=verified_facts)
-            else:
-                res = self.z3_auditor.verify(step, context=verified_facts)
+            res = decided.get(step.step_id)
+            if res is None:
+                res = self._verify_step(step, verified_facts, programs, session)
 
+            get_decision_stats().record(res)
             if not res.is_valid:
-                return False, {
-                    "step_index": step.step_id,
-                    "module": res.component,  # FactChecker / Z3Auditor
-                    "reason": res.reason,
-                    "counter_example": getattr(res, "counter_example", None) 
-                }
+                return False, self._failure_report(step, res)
             verified_facts.append(step)
 
+        return self._check_consistency(trace)
+
+    async def arun(self, trace: CoTTrace) -> Tuple[bool, Optional[dict]]:
+        """
+        Same verdict and report as run(), with all steps verified concurrently.
+
+        Step i is checked against steps[:i], exactly the context run() would
+        have built had it reached step i. Verdicts are then consumed in step
+        order: the earliest failure wins, and checks after any failed step
+        are cancelled as soon as that failure is known.
+        """
+        logger.info(f"Starting async verification for Q: {trace.question}")
+        steps = trace.steps
+        decided = self._fast_results(trace)
+        programs = await self._aformalize(trace, decided) if Config.FUSED_FORMALIZATION else {}
+        session = self.z3_auditor.begin_trace() if Config.Z3_INCREMENTAL else None
+        tasks = []
+        previous_inference = None
+        for i, step in enumerate(steps):
+            # An incremental Z3 context is built in step order: each inference waits for the one before it.
+            after = previous_inference if session is not None and step.step_type == "inference" else None
+            tasks.append(asyncio.create_task(self._averify_step(step, steps[:i], programs, decided, session, after)))
+            if step.step_type == "inference":
+                previous_inference = tasks[-1]
+
+        def prune_after(j):
+            def callback(task):
+                # A failure at j makes every later verdict irrelevant, even before earlier steps finish.
+                if not task.cancelled() and task.exception() is None and not task.result().is_valid:
+                    for later in tasks[j + 1:]:
+                        later.cancel()
+            return callback
+
+        for j, task in enumerate(tasks):
+            task.add_done_callback(prune_after(j))
+
+        try:
+            for step, task in zip(steps, tasks):
+                res = await task
+                get_decision_stats().record(res)
+                if not res.is_valid:
+                    return False, self._failure_report(step, res)
+        finally:
+            pending = [t for t in tasks if not t.done()]
+            for t in pending:
+                t.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        return self._check_consistency(trace)
+
+    def _verify_step(self, step: ReasoningStep, context: List[ReasoningStep],
+                     programs: Dict[int, str], session: Optional[TraceSession] = None) -> VerificationResult:
+        code = self._program_for(step, programs)
+        if code is not None:
+            return self._verifier_for(step).check_and_store(step, context, code)
+        if step.step_type == "fact":
+            return self.fact_checker.verify(step, context=context)
+        return self.z3_auditor.verify(step, context=context, session=session)
+
+    async def _averify_step(self, step: ReasoningStep, context: List[ReasoningStep],
+                            programs: Dict[int, str], decided: Dict[int, VerificationResult],
+                            session: Optional[TraceSession] = None,
+                            after: Optional[asyncio.Task] = None) -> VerificationResult:
+        if step.step_id in decided:
+            return decided[step.step_id]
+        code = self._program_for(step, programs)
+        if code is not None:
+            return await asyncio.to_thread(self._verifier_for(step).check_and_store, step, context, code)
+        if step.step_type == "fact":
+            return await self.fact_checker.averify(step, context=context)
+        if after is not None:
+            await asyncio.wait([after])
+        return await self.z3_auditor.averify(step, context=context, session=session)
+
+    def _fast_results(self, trace: CoTTrace) -> Dict[int, VerificationResult]:
+        """Verdicts available without an LLM: deterministic grounding, then the verification cache."""
+        decided = {}
+        for i, step in enumerate(trace.steps):
+            context = trace.steps[:i]
+            res = None
+            if step.step_type == "fact":
+                res = self.fact_checker.fast_path(step) or \
+                    self.fact_checker.cached_result(step, context, count_miss=False)
+            elif step.step_type == "inference":
+                res = self.z3_auditor.fast_path(step) or \
+                    self.z3_auditor.cached_result(step, context, count_miss=False)
+            if res is not None:
+                decided[step.step_id] = res
+        return decided
+
+    # ---------- fused formalization (one LLM call per trace) ----------
+
+    def _formalize_inputs(self, trace: CoTTrace, decided: Dict[int, VerificationResult]) -> dict:
+        steps = [{"step_id": s.step_id, "content": s.content, "type": s.step_type}
+                 for s in trace.steps
+                 if s.step_type in ("fact", "inference") and s.step_id not in decided]
+        query = "\n".join(s.content for s in trace.steps)
+        return dict(
+            steps=steps,
+            columns=self.handle.columns,
+            sample_data=self.handle.sample_rows(3),
+            table_context=self.handle.relevance.serialize(query, fmt="csv"),
+            column_types=self.handle.typed_view.describe(),
+        )
+
+    def _formalize(self, trace: CoTTrace, decided: Dict[int, VerificationResult]) -> Dict[int, str]:
+        inputs = self._formalize_inputs(trace, decided)
+        if not inputs["steps"]:
+            return {}
+        programs = self.fact_checker.llm.formalize_trace(**inputs)
+        logger.info(f"Fused formalization: {len(programs)}/{len(trace.steps)} programs")
+        return programs
+
+    async def _aformalize(self, trace: CoTTrace, decided: Dict[int, VerificationResult]) -> Dict[int, str]:
+        inputs = self._formalize_inputs(trace, decided)
+        if not inputs["steps"]:
+            return {}
+        programs = await self.fact_checker.async_llm.formalize_trace(**inputs)
+        logger.info(f"Fused formalization: {len(programs)}/{len(trace.steps)} programs")
+        return programs
+
+    @staticmethod
+    def _program_for(step: ReasoningStep, programs: Dict[int, str]) -> Optional[str]:
+        """The fused program for a step, if it has the entry point its verifier expects."""
+        code = programs.get(step.step_id)
+        if code is None:
+            return None
+        if step.step_type == "fact" and "def verify_fact" in code:
+            return code
+        if step.step_type == "inference" and "def solve_logic" in code:
+            return code
+        return None
+
+    def _verifier_for(self, step: ReasoningStep):
+        return self.fact_checker if step.step_type == "fact" else self.z3_auditor
+
+    @staticmethod
+    def _failure_report(step: ReasoningStep, res: VerificationResult) -> dict:
+        return {
+            "step_index": step.step_id,
+            "module": res.component,  # FactChecker / Z3Auditor
+            "reason": res.reason,
+            "verdict": res.verdict,  # "unknown": undecided (timeout / solver unknown), not refuted
+            "counter_example": getattr(res, "counter_example", None) 
+        }
+
+    @staticmethod
+    def _check_consistency(trace: CoTTrace) -> Tuple[bool, Optional[dict]]:
         declared_answer = str(trace.final_answer).lower().strip()
         last_step_content = str(trace.steps[-1].content).lower().strip()
 
@@ -41,4 +195,4 @@ def run(self, trace: CoTTrace) -> Tuple[bool, Optional[dict]]:
                 "reason": f"Execution Inconsistency: Derived '{last_step_content}' != Answer '{declared_answer}'"
              }
 
-        return True, None
\ No newline at end of file
+        return True, None
@@ -1,18 +1,20 @@
-from typing import Optional, List
+from typing import Optional, List, Union
 import pandas as pd
 from src.schema import CoTTrace
 from src.pipeline import TrustTablePipeline
 from src.llm_engine import LLMEngine
 from utils.logger import setup_logger
+from utils.table_handle import TableHandle
 
 logger = setup_logger("BlindRefiner")
 
 class BlindIterativeRefiner:
-    def __init__(self, table_df: pd.DataFrame, llm: LLMEngine, refinement_enabled: bool = True):
+    def __init__(self, table: Union[TableHandle, pd.DataFrame], llm: LLMEngine, refinement_enabled: bool = True):
 
-        self.table_df = table_df
+        self.handle = TableHandle.wrap(table)
+        self.table_df = self.handle.df
         self.llm = llm
-        self.pipeline = TrustTablePipeline(table_df)
+        self.pipeline = TrustTablePipeline(self.handle, llm)
         self.refinement_enabled = refinement_enabled 
 
     def solve(self, question: str, max_retries: int = 3, refinement_enabled: Optional[bool] = None) -> dict:
@@ -98,7 +100,7 @@ class BlindIterativeRefiner:
 A previous reasoning chain contained a HALLUCINATION (Data Grounding Error).
 Your goal is to rewrite the reasoning to strictly adhere to the table content.
 """
-        table_snippet = self.table_df.to_string() 
+        table_snippet = self.handle.relevance.serialize(f"{question}\n{bad_step}\n{old_cot}", fmt="string")
 
         user_prompt = f"""
 ### Table Data
@@ -122,25 +124,25 @@ Rewrite the Chain-of-Thought.
 
 ### Corrected Chain-of-Thought:
 """
-        response = self.llm.client.chat.completions.create(
-            model=self.llm.model,
+        response = self.llm.chat(
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=0.2
+            temperature=0.2,
+            call_site="refine_grounding"
         )
-        return response.choices[0].message.content.strip()
+        return response.strip()
 
     def _generate_initial_cot(self, question: str) -> str:
-        table_str = self.table_df.to_string()
+        table_str = self.handle.relevance.serialize(question, fmt="string")
         prompt = f"Table:\n{table_str}\n\nQuestion: {question}\n\nAnswer step-by-step:"
-        response = self.llm.client.chat.completions.create(
-            model=self.llm.model,
+        response = self.llm.chat(
             messages=[{"role": "user", "content": prompt}],
-            temperature=0.3
+            temperature=0.3,
+            call_site="initial_cot"
         )
-        return response.choices[0].message.content.strip()
+        return response.strip()
 
     def _extract_answer(self, cot: str) -> str:
 
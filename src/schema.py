@@ -9,6 +9,9 @@ class ReasoningStep:
     step_type: str = "inference"  # 'fact' or 'inference'
     
     formalized_code: Optional[str] = None 
+    # Optional grounding triples from decompose_cot:
+    # [{"row_key": "Brazil", "column": "Total", "value": "19", "op": "=="}]
+    triples: Optional[List[dict]] = None
 
 @dataclass
 class VerificationResult:
@@ -16,6 +19,15 @@ class VerificationResult:
     component: str  # "FactChecker" or "LogicAuditor"
     reason: str
     counter_example: Optional[Any] = None
+    # Which path produced the verdict, e.g. "triples", "pandas_codegen", "z3_codegen"
+    decided_by: Optional[str] = None
+    # "valid" / "invalid", or "unknown" when no verdict could be reached (solver
+    # `unknown`, timeout, killed worker). Unknown results are never cached.
+    verdict: Optional[str] = None
+
+    def __post_init__(self):
+        if self.verdict is None:
+            self.verdict = "valid" if self.is_valid else "invalid"
 
 @dataclass
 class CoTTrace:
@@ -0,0 +1,192 @@
+# src/verifiers/aggregate_checker.py
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.schema import VerificationResult
+from utils.cell_index import CellIndex, claim_words, is_number_word
+from utils.logger import setup_logger
+from utils.table_utils import normalize_cell
+from utils.typed_view import TypedTableView
+
+logger = setup_logger("AggregateChecker")
+
+_MAX = re.compile(r"\b(highest|largest|most|greatest|biggest|maximum|max)\b")
+_MIN = re.compile(r"\b(lowest|smallest|least|fewest|minimum|min)\b")
+_ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+             "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10}
+_ORDINAL = r"(\d+)(?:st|nd|rd|th)|(" + "|".join(_ORDINALS) + r")"
+_RANK = re.compile(
+    r"\b(?:rank(?:s|ed)?|placed?)\s+(?:#|no\.?\s*)?(?:(\d+)(?:st|nd|rd|th)?|(" + "|".join(_ORDINALS) + r"))\b"
+    r"|\b(?:" + _ORDINAL + r")[\s-]+(?=highest|largest|most|greatest|biggest|lowest|smallest|least|fewest)"
+)
+_MORE = re.compile(r"\b(more|higher|greater|larger|bigger)\s+(?:\w+\s+){0,3}?than\b")
+_LESS = re.compile(r"\b(less|fewer|lower|smaller)\s+(?:\w+\s+){0,3}?than\b")
+_DIFF = re.compile(r"\bdifference\b")
+_RATIO = re.compile(r"\b(ratio|times)\b")
+_SUM = re.compile(r"\b(sum|total|combined|together|altogether)\b")
+_MEAN = re.compile(r"\b(average|mean)\b")
+# Negated or hedged claims are left to formalization.
+_SKIP = re.compile(r"\b(not|no|never|neither|nor|without|about|around|approximately|nearly|almost|roughly|"
+                   r"over|under|at least|at most|median|percent|percentage|increase|decrease|change)\b|n't")
+# Rows that summarize the others; column-wide aggregates would count them twice.
+_SUMMARY_LABELS = {"total", "totals", "sum", "overall", "all", "average", "mean"}
+
+
+def _claimed(word: str) -> Tuple[float, float]:
+    """Claimed number and the tolerance its written precision implies ('1.99' -> +-0.005)."""
+    value = float(normalize_cell(word))
+    digits = word.strip("()$€£¥%").replace(",", "")
+    decimals = len(digits.split(".", 1)[1]) if "." in digits else 0
+    return value, 0.5 * 10 ** -decimals + 1e-9 * abs(value)
+
+
+def _fmt(x: float) -> str:
+    return normalize_cell(round(float(x), 6))
+
+
+class AggregateChecker:
+    """
+    Fast path for superlative / rank / aggregate inference steps over the
+    table's parsed numeric columns (tv.num), e.g. "Brazil has the highest
+    Gold", "Chile ranked 3rd in Total", "Brazil has 14 more Gold than
+    Chile", "the ratio of A's Revenue to B's is 1.99", "the total of A and
+    B is 25", "the average Points is 12.5".
+
+    A claim is decided only when it names exactly one numeric column (or
+    the table has one), every entity resolves to a single row, and the
+    operation matches one known pattern. Claimed numbers match within the
+    precision they are written with. Everything else returns None and goes
+    to formalization.
+    """
+
+    def __init__(self, index: CellIndex, typed_view: TypedTableView):
+        self.index = index
+        self.numeric = {str(c): typed_view.num[c].to_numpy(dtype=float) for c in typed_view.num.columns}
+        labels = index.normalized[[c for c in index.columns if c not in self.numeric]]
+        # Rows that are not summary rows; column-wide aggregates only look at these.
+        self.body = ~labels.isin(_SUMMARY_LABELS).any(axis=1).to_numpy() if len(labels.columns) else \
+            np.ones(len(index.table), dtype=bool)
+
+    def check(self, claim: str) -> Optional[VerificationResult]:
+        text = str(claim).lower()
+        if not self.numeric or _SKIP.search(text):
+            return None
+
+        rank = None
+        rank_match = _RANK.search(text)
+        if rank_match:
+            n, word, n2, word2 = rank_match.groups()
+            rank = int(n or n2) if (n or n2) else _ORDINALS[word or word2]
+            text = text[:rank_match.start()] + " " + text[rank_match.end():]
+
+        parsed = self._parse(text)
+        if parsed is None:
+            return None
+        column, entities, numbers, free = parsed
+        values = self.numeric[column]
+
+        ascending = bool(_MIN.search(free))
+        if rank is not None or _MAX.search(free) or ascending:
+            if _MORE.search(free) or _LESS.search(free) or len(entities) != 1 or len(numbers) > 1:
+                return None
+            return self._rank(column, values, entities[0], rank or 1, ascending, numbers)
+        if _DIFF.search(free) or _MORE.search(free) or _LESS.search(free):
+            if len(entities) != 2 or len(numbers) > 1:
+                return None
+            return self._difference(column, values, entities, numbers, less=bool(_LESS.search(free)),
+                                    absolute=bool(_DIFF.search(free)))
+        if _RATIO.search(free):
+            if len(entities) != 2 or len(numbers) != 1:
+                return None
+            a, b = (values[r] for r in entities)
+            if b == 0:
+                return None
+            return self._compare(column, a / b, numbers[0], f"{_fmt(a)} / {_fmt(b)}")
+        if _SUM.search(free) or _MEAN.search(free):
+            if len(numbers) != 1 or len(entities) == 1:
+                return None
+            rows = entities if entities else list(np.flatnonzero(self.body & ~np.isnan(values)))
+            picked = values[rows]
+            actual = picked.mean() if _MEAN.search(free) else picked.sum()
+            what = "mean" if _MEAN.search(free) else "sum"
+            return self._compare(column, actual, numbers[0], f"{what} over {len(rows)} rows")
+        return None
+
+    # ---------- parsing ----------
+
+    def _parse(self, text: str) -> Optional[Tuple[str, List[int], List[str], str]]:
+        """(numeric column, entity row positions, claimed number words, words not naming the table)."""
+        words = claim_words(text)
+        taken = [False] * len(words)
+        headers = self.index.header_mentions(words, taken)
+        numbers = []
+        for i, w in enumerate(words):
+            if not taken[i] and is_number_word(w):
+                numbers.append(w)
+                taken[i] = True
+        mentions = self.index.cell_mentions(words, taken)
+        free = " ".join(w for w, t in zip(words, taken) if not t)
+
+        columns = {h for h in headers if h in self.numeric}
+        if len(columns) > 1:
+            return None
+        if not columns:
+            if len(self.numeric) != 1:
+                return None
+            columns = set(self.numeric)
+        column = columns.pop()
+
+        entities = []
+        for _, positions in mentions:
+            rows = {r for r, c in positions if c not in self.numeric}
+            if len(rows) != 1:
+                return None
+            row = rows.pop()
+            if np.isnan(self.numeric[column][row]):
+                return None
+            entities.append(row)
+        return column, entities, numbers, free
+
+    # ---------- operations ----------
+
+    def _rank(self, column: str, values: np.ndarray, row: int, claimed_rank: int, ascending: bool,
+              numbers: List[str]) -> VerificationResult:
+        v = values[row]
+        pool = values[self.body & ~np.isnan(values)]
+        better = pool < v if ascending else pool > v
+        actual_rank = int(better.sum()) + 1
+        order = "lowest" if ascending else "highest"
+        if numbers:
+            claimed, tol = _claimed(numbers[0])
+            if abs(v - claimed) > tol:
+                return self._result(False, column, f"{column} at row {row} is {_fmt(v)}, not {numbers[0]}")
+        if actual_rank == claimed_rank:
+            return self._result(True, column, f"row {row} ranks {actual_rank} by {order} {column}")
+        leader = pool.min() if ascending else pool.max()
+        return self._result(False, column, f"row {row} ({_fmt(v)}) ranks {actual_rank} by {order} {column}, "
+                                           f"not {claimed_rank}; the {order} is {_fmt(leader)}")
+
+    def _difference(self, column: str, values: np.ndarray, entities: List[int], numbers: List[str],
+                    less: bool, absolute: bool) -> VerificationResult:
+        a, b = values[entities[0]], values[entities[1]]
+        if not numbers:
+            # Plain comparison: "A has more Gold than B".
+            holds = a < b if less else a > b
+            return self._result(bool(holds), column, f"{_fmt(a)} vs {_fmt(b)}")
+        diff = abs(a - b) if absolute else (b - a if less else a - b)
+        return self._compare(column, diff, numbers[0], f"{_fmt(a)} - {_fmt(b)}")
+
+    def _compare(self, column: str, actual: float, word: str, how: str) -> VerificationResult:
+        claimed, tol = _claimed(word)
+        ok = abs(actual - claimed) <= tol
+        return self._result(ok, column, f"{how} = {_fmt(actual)}, claimed {word}")
+
+    @staticmethod
+    def _result(ok: bool, column: str, detail: str) -> VerificationResult:
+        if ok:
+            return VerificationResult(True, "Z3Auditor", f"Checked against column '{column}': {detail}.",
+                                      decided_by="aggregate")
+        return VerificationResult(False, "Z3Auditor", "Logic Error: the table contradicts the claimed aggregate.",
+                                  counter_example=f"{column}: {detail}", decided_by="aggregate")
@@ -0,0 +1,175 @@
+# src/verifiers/arithmetic_checker.py
+import ast
+import operator
+import re
+from dataclasses import dataclass, field
+from fractions import Fraction
+from typing import List, Optional
+
+from src.schema import VerificationResult
+from utils.logger import setup_logger
+
+logger = setup_logger("ArithmeticChecker")
+
+_NUM = r"[$€£¥]?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?%?"
+_ATOM = r"[(\s]*[-−]?\s*" + _NUM + r"[)\s]*"
+_OP = r"(?:<=|>=|==|!=|[<>=≤≥≠+\-−*/×÷])"
+# An arithmetic chain written with symbols: "660,391 / 332,316 = 1.99", "19 > 10", "(3 + 4) * 2 = 14".
+# It never starts or ends inside a time ("3:06:02:29"), ratio ("3:1") or power ("2^3").
+_SEGMENT = re.compile(r"(?<![\w.,:^])" + _ATOM + r"(?:" + _OP + _ATOM + r")+(?!\w|[.,:^]\d)")
+# Chains that only look like arithmetic: "2010-2012" (a range), "10-2" (a record), "(1,234)" (a negative).
+_AMBIGUOUS = re.compile(r"\d[-−]\d|\(\s*" + _NUM + r"\s*\)")
+_NUMBER = re.compile(r"(?<![\w.,])" + _NUM + r"(?!\w|[.,]\d)")
+_COMPARISON = re.compile(r"<|>|=|≤|≥|≠")
+# Negated or hedged steps, and operands spelled in words, are never decided here.
+_SKIP = re.compile(r"\b(not|no|never|neither|nor|about|around|approximately|nearly|almost|roughly|"
+                   r"over|under|at least|at most)\b|n't|≈|~")
+# A chain that continues in words ("half of 20 = 10", "3 x 4 = 12") is only a fragment.
+_CONNECTIVES = {"of", "and", "by", "times", "x", "plus", "minus", "than", "over", "from", "to", "per", "into",
+                "divided", "multiplied", "between", "with", "less", "more"}
+
+_ARITH = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+_COMPARE = {ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge}
+
+
+@dataclass
+class ArithmeticCheck:
+    """Outcome of the symbolic comparisons found in a step."""
+    holds: bool
+    complete: bool  # the step is nothing but the checked comparisons and punctuation
+    checked: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    delimited: bool = True  # every failed comparison is set off from the surrounding words by whitespace
+
+
+def _to_python(segment: str) -> str:
+    expr = segment.replace("−", "-").replace("×", "*").replace("÷", "/")
+    expr = expr.replace("≤", "<=").replace("≥", ">=").replace("≠", "!=")
+    expr = re.sub(r"(?<![<>=!])=(?!=)", "==", expr)
+    expr = re.sub(r"(?<=\d),(?=\d{3})", "", expr)
+    return re.sub(r"[$€£¥%]", "", expr).strip()
+
+
+def _delimited(text: str, start: int, end: int) -> bool:
+    """Whitespace (or the text's edges) on both sides; sentence punctuation may end it."""
+    before = start == 0 or text[start - 1].isspace() or text[start].isspace()
+    after = text[end - 1].isspace() or re.match(r"[.,;!?]*(?:\s|$)", text[end:]) is not None
+    return before and after
+
+
+def _decimals(literal: str) -> int:
+    return len(literal.split(".", 1)[1]) if "." in literal else 0
+
+
+class ArithmeticChecker:
+    """
+    Fast path for inference steps that are arithmetic written with symbols
+    ("19 > 10.", "$660,391 / $332,316 = 1.99"). No table
+    access and no exec: each chain is parsed with `ast` and only numbers,
+    + - * / and comparisons are evaluated, exactly, with Fractions.
+
+    Equality with a literal is rounding-aware: "= 1.99" holds for anything
+    that rounds to 1.99. Chains that only look like arithmetic (times,
+    ratios, powers, year ranges, win-loss records, accounting negatives)
+    are left alone. A step is decided only when nothing but
+    punctuation lies outside its checked comparisons: "19 > 10, so Brazil
+    wins" draws a conclusion the arithmetic alone does not establish. For
+    such steps evaluate() still reports failed comparisons, which Z3Auditor
+    uses to refute Z3 verdicts when they are unambiguous (`complete`, or
+    every failed one `delimited`).
+    """
+
+    def evaluate(self, claim: str) -> Optional[ArithmeticCheck]:
+        """The step's symbolic comparisons, or None if it has none that can be read safely."""
+        text = str(claim)
+        if _SKIP.search(text.lower()):
+            return None
+
+        check = ArithmeticCheck(holds=True, complete=True)
+        spans = []
+        for m in _SEGMENT.finditer(text):
+            segment = m.group().strip()
+            if not _COMPARISON.search(segment) or _AMBIGUOUS.search(segment):
+                continue
+            before = text[:m.start()].split()
+            after = text[m.end():].split()
+            if (before and before[-1].lower() in _CONNECTIVES) or (after and after[0].lower() in _CONNECTIVES):
+                return None
+            numbers = _NUMBER.findall(segment)
+            if any(n.endswith("%") for n in numbers) and not all(n.endswith("%") for n in numbers):
+                return None  # "50% = 0.5": percent and plain numbers on different scales
+            holds = self._evaluate_chain(_to_python(segment))
+            if holds is None:
+                return None
+            spans.append(m.span())
+            check.checked.append(segment)
+            if not holds:
+                check.holds = False
+                check.failed.append(segment)
+                check.delimited = check.delimited and _delimited(text, *m.span())
+        if not check.checked:
+            return None
+        rest = text
+        for start, end in reversed(spans):
+            rest = rest[:start] + rest[end:]
+        check.complete = not re.search(r"\w", rest)
+        return check
+
+    def check(self, claim: str) -> Optional[VerificationResult]:
+        """Verdict for a step that is nothing but symbolic arithmetic, else None."""
+        check = self.evaluate(claim)
+        if check is None or not check.complete:
+            return None
+        if check.holds:
+            return VerificationResult(True, "Z3Auditor", f"Arithmetic holds: {'; '.join(check.checked)}.",
+                                      decided_by="arithmetic")
+        return VerificationResult(False, "Z3Auditor", "Logic Error: the step's arithmetic does not hold.",
+                                  counter_example="; ".join(check.failed), decided_by="arithmetic")
+
+    # ---------- evaluation ----------
+
+    def _evaluate_chain(self, expr: str) -> Optional[bool]:
+        """Truth of a comparison chain, or None if it is not plain arithmetic."""
+        try:
+            tree = ast.parse(expr, mode="eval").body
+            if not isinstance(tree, ast.Compare):
+                return None
+            operands = [tree.left] + tree.comparators
+            values = [self._value(node) for node in operands]
+        except (SyntaxError, ValueError, ZeroDivisionError):
+            return None
+        for op, (left, a), (right, b) in zip(tree.ops, zip(operands, values), zip(operands[1:], values[1:])):
+            if isinstance(op, (ast.Eq, ast.NotEq)):
+                equal = abs(a - b) <= self._tolerance(expr, left, right)
+                if equal != isinstance(op, ast.Eq):
+                    return False
+            elif type(op) in _COMPARE:
+                if not _COMPARE[type(op)](a, b):
+                    return False
+            else:
+                return None
+        return True
+
+    def _value(self, node: ast.AST) -> Fraction:
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return Fraction(str(node.value))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            value = self._value(node.operand)
+            return -value if isinstance(node.op, ast.USub) else value
+        if isinstance(node, ast.BinOp) and type(node.op) in _ARITH:
+            return _ARITH[type(node.op)](self._value(node.left), self._value(node.right))
+        raise ValueError(f"unsupported expression: {ast.dump(node)}")
+
+    @staticmethod
+    def _tolerance(expr: str, left: ast.AST, right: ast.AST) -> Fraction:
+        """Half a unit in the last written place of a literal compared with a computed value; exact otherwise."""
+        literals = [n for n in (left, right) if ArithmeticChecker._is_literal(n)]
+        if len(literals) != 1:
+            return Fraction(0)
+        return Fraction(1, 2 * 10 ** _decimals(ast.get_source_segment(expr, literals[0])))
+
+    @staticmethod
+    def _is_literal(node: ast.AST) -> bool:
+        if isinstance(node, ast.UnaryOp):
+            node = node.operand
+        return isinstance(node, ast.Constant)
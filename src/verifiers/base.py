@@ -1,12 +1,127 @@
+import asyncio
+import threading
 from abc import ABC, abstractmethod
-from typing import List
+from collections import Counter
+from types import CodeType
+from typing import Callable, Dict, List, Optional, Union
 import pandas as pd
+from configs.config import Config
 from src.schema import ReasoningStep, VerificationResult
+from src.llm_engine import FALLBACK_CODES, PROMPT_VERSION, AsyncLLMEngine, LLMEngine, get_async_llm_engine, get_llm_engine
+from utils.table_handle import TableHandle
+from utils.verification_cache import get_verification_cache
+
+
+def compile_program(code: str, name: str = "<generated>") -> Optional[CodeType]:
+    """Bytecode for a generated program, or None if it does not even parse."""
+    try:
+        return compile(code, name, "exec")
+    except (SyntaxError, ValueError):
+        return None
+
 
 class BaseVerifier(ABC):
-    def __init__(self, table: pd.DataFrame):
-        self.table = table
+    # Part of the verification-cache key: bump when prompts or execution semantics change.
+    VERSION = "2"
+
+    def __init__(self, table: Union[TableHandle, pd.DataFrame], llm: Optional[LLMEngine] = None,
+                 async_llm: Optional[AsyncLLMEngine] = None):
+        self.handle = TableHandle.wrap(table)
+        self.table = self.handle.df
+        # Injected engine, or the process-wide one; never a fresh client per verifier.
+        self.llm = llm if llm is not None else get_llm_engine()
+        self._async_llm = async_llm
+
+    @property
+    def async_llm(self) -> AsyncLLMEngine:
+        """Injected async engine, or the shared one for the running event loop."""
+        return self._async_llm if self._async_llm is not None else get_async_llm_engine()
 
     @abstractmethod
     def verify(self, step: ReasoningStep, context: List[ReasoningStep]) -> VerificationResult:
-        pass
\ No newline at end of file
+        pass
+
+    async def averify(self, step: ReasoningStep, context: List[ReasoningStep]) -> VerificationResult:
+        """Async verify; the default runs the blocking verify in a worker thread."""
+        return await asyncio.to_thread(self.verify, step, context)
+
+    @abstractmethod
+    def check_code(self, code: str, compiled: Optional[CodeType] = None) -> VerificationResult:
+        pass
+
+    # ---------- verification cache ----------
+
+    def _premise(self, context: List[ReasoningStep]) -> str:
+        """Context that changes the verdict besides the step itself (none by default)."""
+        return ""
+
+    def _cache_mode(self) -> str:
+        """Prompt version, typed-view columns and settings that change the program a step gets; part of the cache key."""
+        return (f"prompts={PROMPT_VERSION};fused={int(Config.FUSED_FORMALIZATION)};"
+                f"types={self.handle.typed_view.describe()}")
+
+    def _cache_key(self, step: ReasoningStep, context: List[ReasoningStep]) -> Optional[str]:
+        cache = get_verification_cache()
+        if cache is None:
+            return None
+        return cache.make_key(self.handle.content_hash, type(self).__name__, self.VERSION,
+                              step.step_type, step.content, self._premise(context), self._cache_mode())
+
+    def cached_result(self, step: ReasoningStep, context: List[ReasoningStep],
+                      count_miss: bool = True) -> Optional[VerificationResult]:
+        key = self._cache_key(step, context)
+        entry = get_verification_cache().get(key, count_miss) if key is not None else None
+        if entry is None:
+            return None
+        return VerificationResult(**{**entry.result, "decided_by": "cache"})
+
+    def check_and_store(self, step: ReasoningStep, context: List[ReasoningStep], code: str,
+                        check: Optional[Callable[[str, Optional[CodeType]], VerificationResult]] = None
+                        ) -> VerificationResult:
+        """check_code (or `check`) on freshly generated code, recording program, bytecode and verdict."""
+        compiled = compile_program(code, f"<{type(self).__name__}:{step.step_id}>")
+        res = (check or self.check_code)(code, compiled)
+        key = self._cache_key(step, context)
+        if key is not None and self._storable(code, compiled) and code not in FALLBACK_CODES \
+                and res.verdict != "unknown":
+            get_verification_cache().put(key, code, compiled, res)
+        return res
+
+    def _storable(self, code: str, compiled: Optional[CodeType]) -> bool:
+        """Whether a verdict on `code` may be cached: only for programs that parse."""
+        return compiled is not None
+
+
+class DecisionStats:
+    """Process-wide count of which path decided each verdict."""
+
+    # Paths that needed an LLM round trip to produce the verdict.
+    LLM_PATHS = {"pandas_codegen", "z3_codegen"}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Counter = Counter()
+
+    def record(self, result: VerificationResult):
+        with self._lock:
+            self.counts[(result.component, result.decided_by or "unknown")] += 1
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self.counts)
+        decided = {k: v for k, v in counts.items() if k[1] != "skip"}
+        total = sum(decided.values())
+        without_llm = sum(v for (_, path), v in decided.items() if path not in self.LLM_PATHS)
+        return {
+            "paths": {f"{comp}/{path}": v for (comp, path), v in sorted(counts.items())},
+            "decided": total,
+            "without_llm": without_llm,
+            "without_llm_fraction": without_llm / total if total else 0.0,
+        }
+
+
+_decision_stats = DecisionStats()
+
+
+def get_decision_stats() -> DecisionStats:
+    return _decision_stats
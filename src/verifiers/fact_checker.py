@@ -1,43 +1,95 @@
+import asyncio
+from types import CodeType
+from typing import Optional, Union
 import pandas as pd
+from configs.config import Config
 from src.verifiers.base import BaseVerifier
+from src.verifiers.lookup_matcher import LookupMatcher
+from src.verifiers.triple_checker import TripleChecker
 from src.schema import ReasoningStep, VerificationResult
-from src.llm_engine import LLMEngine
+from src.llm_engine import AsyncLLMEngine, LLMEngine
+from utils.exec_pool import HELPERS, execute_program
 from utils.logger import setup_logger
+from utils.table_handle import TableHandle
 
 logger = setup_logger("FactChecker")
 
 class FactChecker(BaseVerifier):
-    def __init__(self, table: pd.DataFrame):
-        super().__init__(table)
-        self.llm = LLMEngine()
+    def __init__(self, table: Union[TableHandle, pd.DataFrame], llm: Optional[LLMEngine] = None,
+                 async_llm: Optional[AsyncLLMEngine] = None):
+        super().__init__(table, llm, async_llm)
+        self._triple_checker: Optional[TripleChecker] = None
+        self._lookup_matcher: Optional[LookupMatcher] = None
+
+    @property
+    def triple_checker(self) -> TripleChecker:
+        if self._triple_checker is None:
+            self._triple_checker = TripleChecker(self.handle.cell_index, self.handle.trigram_index)
+        return self._triple_checker
+
+    @property
+    def lookup_matcher(self) -> LookupMatcher:
+        if self._lookup_matcher is None:
+            self._lookup_matcher = LookupMatcher(self.handle.cell_index)
+        return self._lookup_matcher
+
+    def fast_path(self, step: ReasoningStep) -> Optional[VerificationResult]:
+        """Verdict without an LLM call, or None if the claim needs code generation."""
+        try:
+            return self._fast_verdict(step)
+        except Exception as e:
+            # Only an optimization: on any failure the step goes to code generation.
+            logger.warning(f"Fast path failed on step {step.step_id}, falling back: {e}")
+            return None
+
+    def _fast_verdict(self, step: ReasoningStep) -> Optional[VerificationResult]:
+        if step.triples:
+            res = self.triple_checker.check(step.triples, step.content)
+            if res is not None:
+                return res
+        if Config.GROUNDING_FAST_PATH:
+            return self.lookup_matcher.match(step.content)
+        return None
 
     def verify(self, step: ReasoningStep, context: list) -> VerificationResult:
         content = step.content
         logger.info(f"Fact Checking: \"{content}\"")
 
-        columns = self.table.columns.tolist()
-        sample_row = self.table.head(3).to_dict(orient='records')
+        fast = self.fast_path(step) or self.cached_result(step, context)
+        if fast is not None:
+            return fast
+
+        columns = self.handle.columns
+        sample_row = self.handle.sample_rows(3)
         
-        code = self.llm.generate_pandas_check(content, columns, str(sample_row))
+        code = self.llm.generate_pandas_check(content, columns, sample_row, self.handle.typed_view.describe())
         # logger.debug(f"Generated Pandas Code:\n{code}")
+        return self.check_and_store(step, context, code)
 
-        try:
-            exec_globals = {'pd': pd}
-            exec_locals = {}
-            
-            exec(code, exec_globals, exec_locals)
-            
-            if 'verify_fact' not in exec_locals:
-                return VerificationResult(False, "FactChecker", "LLM failed to generate 'verify_fact' function.")
-            
-            verify_func = exec_locals['verify_fact']
-            is_fact_true = verify_func(self.table)
-            
-            if is_fact_true:
-                return VerificationResult(True, "FactChecker", "Data Grounding Successful.")
-            else:
-                return VerificationResult(False, "FactChecker", "Data Mismatch: Table data contradicts the claim.")
-                
-        except Exception as e:
-            logger.warning(f"Pandas Execution Error: {e}")
-            return VerificationResult(False, "FactChecker", f"Grounding Error (Execution Failed): {str(e)}")
\ No newline at end of file
+    async def averify(self, step: ReasoningStep, context: list) -> VerificationResult:
+        logger.info(f"Fact Checking (async): \"{step.content}\"")
+        fast = self.fast_path(step) or self.cached_result(step, context)
+        if fast is not None:
+            return fast
+        code = await self.async_llm.generate_pandas_check(
+            step.content, self.handle.columns, self.handle.sample_rows(3), self.handle.typed_view.describe()
+        )
+        return await asyncio.to_thread(self.check_and_store, step, context, code)
+
+    def check_code(self, code: str, compiled: Optional[CodeType] = None) -> VerificationResult:
+        """Runs a generated `verify_fact(df)` program against the table (sandboxed, see utils/exec_pool)."""
+        outcome = execute_program(code, "verify_fact", self.handle, HELPERS, compiled=compiled)
+
+        if outcome.status == "no_entry":
+            return VerificationResult(False, "FactChecker", "LLM failed to generate 'verify_fact' function.",
+                                      decided_by="pandas_codegen")
+        if outcome.status != "ok":
+            logger.warning(f"Pandas Execution Error ({outcome.status}): {outcome.error}")
+            return VerificationResult(False, "FactChecker", f"Grounding Error (Execution Failed): {outcome.error}",
+                                      decided_by="pandas_codegen",
+                                      verdict="unknown" if outcome.undecided else None)
+
+        if outcome.truthy:
+            return VerificationResult(True, "FactChecker", "Data Grounding Successful.", decided_by="pandas_codegen")
+        return VerificationResult(False, "FactChecker", "Data Mismatch: Table data contradicts the claim.",
+                                  decided_by="pandas_codegen")
@@ -0,0 +1,90 @@
+# src/verifiers/lookup_matcher.py
+import re
+from typing import List, Optional, Set
+
+from src.schema import VerificationResult
+from utils.cell_index import CellIndex, claim_words, is_number_word
+from utils.logger import setup_logger
+from utils.table_utils import normalize_cell
+
+logger = setup_logger("LookupMatcher")
+
+# Claims with negation, comparison, aggregation or hedging are never decided here.
+_UNDECIDABLE = re.compile(
+    r"\b(not|no|never|none|neither|nor|without|than|least|most|more|less|fewer|greater|higher|lower|"
+    r"over|under|above|below|about|around|approximately|nearly|almost|roughly|between|"
+    r"highest|lowest|largest|smallest|maximum|minimum|max|min|sum|average|mean|median|count|"
+    r"all|every|each|only|both|either|any|rank|ranked|first|last|difference|ratio|"
+    r"increase|decrease|change|percent|times)\b|n't"
+)
+_ROW_REF = re.compile(r"\brow\s+(?:number\s+|#)?(\d+)\b", re.IGNORECASE)
+
+
+class LookupMatcher:
+    """
+    Fast path for single-value lookup claims ("the Team in row 23 is Carlin",
+    "Total current assets is $660,391") using a CellIndex.
+
+    A claim is decided only when it names exactly one target column (or the
+    table has a single value column), exactly one row (by a unique entity
+    cell or by an explicit row number),
+    and exactly one claimed value. Everything else returns None and goes to
+    code generation. "row N" is 1-based, the way reasoning text counts rows.
+    """
+
+    def __init__(self, index: CellIndex):
+        self.index = index
+
+    def match(self, claim: str) -> Optional[VerificationResult]:
+        text = str(claim)
+        if _UNDECIDABLE.search(text.lower()):
+            return None
+
+        row_refs = _ROW_REF.findall(text)
+        words = claim_words(_ROW_REF.sub(" ", text))
+        taken = [False] * len(words)
+        headers = self.index.header_mentions(words, taken)
+        mentions = self.index.cell_mentions(words, taken)
+        numbers = [normalize_cell(w) for w, t in zip(words, taken) if not t and is_number_word(w)]
+
+        if len(row_refs) > 1 or len(set(headers)) > 1:
+            return None
+        column = headers[0] if headers else None
+
+        rows: Set[int]
+        if row_refs:
+            n = int(row_refs[0])
+            rows = {n - 1} if 0 < n <= len(self.index.table) else set()
+            entities = []
+            values = [key for key, _ in mentions] + numbers
+        else:
+            # Numbers are always claimed values; text cells outside the target column name the row.
+            entities, values = [], list(numbers)
+            for key, pos in mentions:
+                if is_number_word(key) or (column is not None and any(c == column for _, c in pos)):
+                    values.append(key)
+                else:
+                    entities.append((key, pos))
+            if len(entities) != 1:
+                return None
+            rows = {r for r, _ in entities[0][1]}
+            if column is None:
+                column = self._implicit_column({c for _, c in entities[0][1]})
+
+        if column is None or column in self.index.repeated or len(values) != 1 or len(rows) != 1:
+            return None
+
+        claimed = values[0]
+        col_pos = self.index.columns.index(column)
+        if any(self.index.cell(r, column) == claimed for r in rows):
+            return VerificationResult(True, "FactChecker", "Data Grounding Successful.", decided_by="cell_index")
+        return VerificationResult(
+            False, "FactChecker", "Data Mismatch: Table data contradicts the claim.",
+            counter_example="; ".join(f"{column} at row {r + 1} is '{self.index.table.iat[r, col_pos]}'" for r in sorted(rows)),
+            decided_by="cell_index"
+        )
+
+    def _implicit_column(self, entity_columns: Set[str]) -> Optional[str]:
+        """With no column named, only a table with one non-entity column is unambiguous."""
+        rest = [c for c in self.index.columns if c not in entity_columns]
+        return rest[0] if len(rest) == 1 else None
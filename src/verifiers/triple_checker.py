@@ -0,0 +1,152 @@
+# src/verifiers/triple_checker.py
+import re
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from src.schema import VerificationResult
+from utils.cell_index import CellIndex, claim_words, is_number_word
+from utils.logger import setup_logger
+from utils.table_utils import normalize_cell
+from utils.trigram_index import TrigramIndex
+
+logger = setup_logger("TripleChecker")
+
+_NUMERIC_OPS = {
+    ">": lambda a, b: a > b,
+    "<": lambda a, b: a < b,
+    ">=": lambda a, b: a >= b,
+    "<=": lambda a, b: a <= b,
+}
+
+# Claims that lookups cannot entail however many triples hold: superlatives,
+# aggregates, ranks, negation and hedging.
+_NOT_A_LOOKUP = re.compile(
+    r"\b(not|no|never|none|neither|nor|without|most|least|highest|lowest|largest|smallest|greatest|fewest|"
+    r"maximum|minimum|max|min|sum|average|mean|median|count|all|every|each|only|rank|ranked|first|last|"
+    r"difference|ratio|increase|decrease|change|percent|times|about|around|approximately|nearly|almost|roughly)\b"
+    r"|n't"
+)
+
+
+def _to_float(text: str) -> Optional[float]:
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+class TripleChecker:
+    """
+    Deterministic check of grounding triples (row_key, column, value, op)
+    emitted by decompose_cot.
+
+    check() returns None whenever a triple does not resolve to exactly what it
+    names (unknown column, unknown row, rows that disagree, unsupported op), so
+    the caller falls back to LLM code generation instead of guessing. The
+    triples must also be grounded in the claim: every row key and value
+    appears in its text, and every entity or number the claim names is
+    covered by a triple; claims beyond plain lookups never qualify. A row key
+    with no exact cell match may still resolve through the trigram index, but
+    only to a single, clearly best near-exact row.
+    """
+
+    FUZZY_MIN_SCORE = 0.8
+    FUZZY_MARGIN = 0.15
+
+    def __init__(self, index: CellIndex, fuzzy: Optional[TrigramIndex] = None):
+        self.index = index
+        self.fuzzy = fuzzy
+        self.table = index.table
+        self.columns = index.columns
+        self._norm_columns = {normalize_cell(c): c for c in self.columns}
+        self._norm = index.normalized.set_axis(self.table.index)
+
+    def _resolve_column(self, name) -> Optional[str]:
+        """The column `name` refers to; None if unknown or a repeated header."""
+        if name is None:
+            return None
+        column = str(name) if str(name) in self.columns else self._norm_columns.get(normalize_cell(name))
+        return None if column in self.index.repeated else column
+
+    def _resolve_rows(self, row_key, key_column: Optional[str]) -> List[int]:
+        positions = sorted({r for r, c in self.index.lookup(row_key) if key_column is None or c == key_column})
+        if not positions and self.fuzzy is not None:
+            hits = self.fuzzy.search(str(row_key), key_column, k=2, min_score=self.FUZZY_MIN_SCORE)
+            if len(hits) == 1 or (len(hits) == 2 and hits[0][1] - hits[1][1] >= self.FUZZY_MARGIN):
+                positions = [hits[0][0]]
+        return [self.table.index[p] for p in positions]
+
+    @staticmethod
+    def _compare(actual: str, op: str, expected: str) -> Optional[bool]:
+        if op in ("==", "="):
+            return actual == expected
+        if op == "!=":
+            return actual != expected
+        if op == "contains":
+            return expected in actual
+        if op in _NUMERIC_OPS:
+            a, b = _to_float(actual), _to_float(expected)
+            if a is None or b is None:
+                return None
+            return _NUMERIC_OPS[op](a, b)
+        return None
+
+    def check_triple(self, triple: Dict) -> Optional[Tuple[bool, str]]:
+        """(holds, actual value description) or None if undecidable."""
+        column = self._resolve_column(triple.get("column"))
+        if column is None or "row_key" not in triple or "value" not in triple:
+            return None
+        key_column = self._resolve_column(triple.get("row_column")) if triple.get("row_column") else None
+        rows = self._resolve_rows(triple["row_key"], key_column)
+        if not rows:
+            return None
+
+        op = str(triple.get("op", "==")).strip()
+        expected = normalize_cell(triple["value"])
+        actual = [self._norm.at[r, column] for r in rows]
+        verdicts = {self._compare(a, op, expected) for a in actual}
+        if len(verdicts) != 1 or None in verdicts:
+            return None
+        raw = self.table.loc[rows[0], column]
+        return verdicts.pop(), f"{column} of '{triple['row_key']}' is '{raw}'"
+
+    def _grounded(self, triples: List[Dict], claim: str) -> bool:
+        """The triples say what the claim says: no more (row keys / values absent from it), no less."""
+        if _NOT_A_LOOKUP.search(str(claim).lower()):
+            return False
+        words = claim_words(claim)
+        text = " " + " ".join(normalize_cell(w) for w in words) + " "
+        named = set()
+        for triple in triples:
+            for field in ("row_key", "value"):
+                key = normalize_cell(triple[field])
+                if not key or f" {key} " not in text:
+                    return False
+                named.add(key)
+        taken = [False] * len(words)
+        self.index.header_mentions(words, taken)
+        mentioned = [key for key, _ in self.index.cell_mentions(words, taken)]
+        mentioned += [normalize_cell(w) for w, t in zip(words, taken) if not t and is_number_word(w)]
+        return all(m in named for m in mentioned)
+
+    def check(self, triples: List[Dict], claim: str) -> Optional[VerificationResult]:
+        if not triples:
+            return None
+        if not all(isinstance(t, dict) and "row_key" in t and "value" in t for t in triples):
+            return None
+        if not self._grounded(triples, claim):
+            logger.debug(f"Triples not grounded in the claim, falling back: {claim}")
+            return None
+        for triple in triples:
+            outcome = self.check_triple(triple)
+            if outcome is None:
+                logger.debug(f"Triple undecidable, falling back: {triple}")
+                return None
+            holds, actual = outcome
+            if not holds:
+                return VerificationResult(
+                    False, "FactChecker", "Data Mismatch: Table data contradicts the claim.",
+                    counter_example=actual, decided_by="triples"
+                )
+        return VerificationResult(True, "FactChecker", "Data Grounding Successful.", decided_by="triples")
@@ -1,77 +1,230 @@
+import asyncio
+import threading
+import uuid
+from types import CodeType
+from typing import List, Optional, Set, Tuple
 import z3
+from configs.config import Config
+from src.verifiers.aggregate_checker import AggregateChecker
+from src.verifiers.arithmetic_checker import ArithmeticChecker
 from src.verifiers.base import BaseVerifier
 from src.schema import ReasoningStep, VerificationResult
-from src.llm_engine import LLMEngine
+from src.llm_engine import AsyncLLMEngine, LLMEngine
+from utils.exec_pool import ExecOutcome, execute_smt_program, execute_z3_program, execute_z3_step
 from utils.logger import setup_logger
+from utils.z3_exec import looks_like_smtlib
 
 logger = setup_logger("Z3Auditor")
 
-class Z3Auditor(BaseVerifier):
-    def __init__(self, table):
-        super().__init__(table)
-        self.llm = LLMEngine()
+class TraceSession:
+    """
+    Bookkeeping for one trace's incremental Z3 context (Config.Z3_INCREMENTAL).
+
+    The solver itself lives with whichever process runs the checks (see
+    utils/exec_pool.execute_z3_step); this side keeps what is needed to
+    rebuild it and to prompt for the next step: the step programs whose
+    premises() are asserted, which facts they cover, and the declared symbols.
+    """
+
+    def __init__(self):
+        # Hex, so the sandbox pool can route on it like a table hash.
+        self.trace_id = uuid.uuid4().hex
+        self.persistent: List[Tuple[str, str]] = []
+        self.formalized: Set[int] = set()
+        self.symbols: List[str] = []
 
+    def new_facts(self, context: List[ReasoningStep]) -> List[ReasoningStep]:
+        return [s for s in context if s.step_type == "fact" and s.step_id not in self.formalized]
 
 
-    def verify(self, step: ReasoningStep, context: list) -> VerificationResult:
+class Z3Auditor(BaseVerifier):
+    def __init__(self, table, llm: Optional[LLMEngine] = None, async_llm: Optional[AsyncLLMEngine] = None):
+        super().__init__(table, llm, async_llm)
+        self._aggregate_checker: Optional[AggregateChecker] = None
+        self.arithmetic_checker = ArithmeticChecker()
+        # The last SMT-LIB script check_code parsed successfully on this thread; read by _storable.
+        self._smt_parsed = threading.local()
+
+    @property
+    def aggregate_checker(self) -> AggregateChecker:
+        if self._aggregate_checker is None:
+            self._aggregate_checker = AggregateChecker(self.handle.cell_index, self.handle.typed_view)
+        return self._aggregate_checker
+
+    def fast_path(self, step: ReasoningStep) -> Optional[VerificationResult]:
+        """Verdict without an LLM call, or None if the step needs formalization."""
         if step.step_type != "inference":
-            return VerificationResult(True, "Z3Auditor", "Skipping.")
+            return None
+        try:
+            return self._fast_verdict(step)
+        except Exception as e:
+            # Only an optimization (the aggregate checker needs the table's indexes):
+            # on any failure the step goes to formalization.
+            logger.warning(f"Fast path failed on step {step.step_id}, falling back: {e}")
+            return None
+
+    def _fast_verdict(self, step: ReasoningStep) -> Optional[VerificationResult]:
+        if Config.ARITHMETIC_FAST_PATH:
+            res = self.arithmetic_checker.check(step.content)
+            if res is not None:
+                return res
+        if Config.AGGREGATE_FAST_PATH:
+            return self.aggregate_checker.check(step.content)
+        return None
 
+    def cached_result(self, step: ReasoningStep, context: list, count_miss: bool = True) -> Optional[VerificationResult]:
+        res = super().cached_result(step, context, count_miss)
+        return self._cross_check(step, res) if res is not None else None
+
+    def check_and_store(self, step: ReasoningStep, context: list, code: str, check=None) -> VerificationResult:
+        return self._cross_check(step, super().check_and_store(step, context, code, check))
+
+    def _cross_check(self, step: ReasoningStep, res: VerificationResult) -> VerificationResult:
+        """A Z3 "sound" verdict does not stand if the step's own arithmetic is false."""
+        if not Config.ARITHMETIC_FAST_PATH or res.verdict == "unknown":
+            return res
+        arithmetic = self.arithmetic_checker.evaluate(step.content)
+        if arithmetic is None:
+            return res
+        if res.is_valid and not arithmetic.holds and (arithmetic.complete or arithmetic.delimited):
+            logger.warning(f"Z3 accepted step {step.step_id} but its arithmetic fails: {arithmetic.failed}")
+            return VerificationResult(False, "Z3Auditor", "Logic Error: the step's arithmetic does not hold "
+                                      "(the Z3 program accepted it).", counter_example="; ".join(arithmetic.failed),
+                                      decided_by=res.decided_by)
+        if not res.is_valid and arithmetic.holds and arithmetic.complete:
+            logger.warning(f"Z3 rejected step {step.step_id} although its arithmetic holds: {arithmetic.checked}")
+        return res
+
+    def begin_trace(self) -> TraceSession:
+        return TraceSession()
+
+    def _cache_mode(self) -> str:
+        return (f"{super()._cache_mode()};format={Config.Z3_FORMAT};incremental={int(Config.Z3_INCREMENTAL)};"
+                f"table_encoding={int(Config.Z3_TABLE_ENCODING)}")
+
+    def _premise(self, context: list) -> str:
         verified_facts = [s.content for s in context if s.step_type == "fact"]
-        premise_text = "\n".join(verified_facts) if verified_facts else "No factual context"
+        return "\n".join(verified_facts) if verified_facts else "No factual context"
+
+    def _table_inputs(self, query: str, encoded: bool = True) -> Tuple[str, str]:
+        """
+        Table context and, with Z3_TABLE_ENCODING, the numeric columns served by `col()` instead.
+        Falls back to the plain pipe-CSV context when the encoding cannot be built.
+        """
+        if encoded and Config.Z3_TABLE_ENCODING:
+            try:
+                encoding = self.handle.z3_encoding
+                if encoding.columns:
+                    table_str = self.handle.relevance.serialize(
+                        query, fmt="csv", row_numbers=True, exclude_columns=list(self.handle.typed_view.num.columns))
+                    return table_str, encoding.describe()
+            except Exception as e:
+                logger.warning(f"Z3 table encoding unavailable, using the plain table context: {e}")
+        return self.handle.relevance.serialize(query, fmt="csv"), ""
+
+    def _prompt_inputs(self, step: ReasoningStep, context: list) -> Tuple[str, str, str, str]:
+        premise_text = self._premise(context)
         conclusion_text = step.content
         
-        table_str = self.table.to_csv(sep="|", index=False)
+        # SMT-LIB scripts have no `col()`: they get every column in the table context.
+        table_str, numeric_columns = self._table_inputs(premise_text + "\n" + conclusion_text,
+                                                        encoded=Config.Z3_FORMAT != "smtlib")
+
+        logger.info(f"Auditing with Table Context ({len(self.table)} rows)...")
+        return premise_text, conclusion_text, table_str, numeric_columns
 
-        logger.info(f"Auditing with FULL Table Context ({len(self.table)} rows)...")
+    def _step_inputs(self, step: ReasoningStep, context: list, session: TraceSession) -> Tuple[list, str, list, str, str]:
+        new_facts = [s.content for s in session.new_facts(context)]
+        table_str, numeric_columns = self._table_inputs("\n".join(new_facts + [step.content]))
+        logger.info(f"Auditing incrementally ({len(new_facts)} new facts, {len(session.symbols)} symbols)...")
+        return new_facts, step.content, session.symbols, table_str, numeric_columns
 
-        z3_code = self.llm.autoformalize_to_z3(premise_text, conclusion_text, table_str)
+    def verify(self, step: ReasoningStep, context: list, session: Optional[TraceSession] = None) -> VerificationResult:
+        if step.step_type != "inference":
+            return VerificationResult(True, "Z3Auditor", "Skipping.", decided_by="skip")
+
+        fast = self.fast_path(step) or self.cached_result(step, context)
+        if fast is not None:
+            return fast
+
+        if session is not None:
+            code = self.llm.formalize_step(*self._step_inputs(step, context, session))
+            return self.check_and_store(step, context, code, self._step_check(step, context, session))
+
+        z3_code = self.llm.autoformalize_to_z3(*self._prompt_inputs(step, context))
+        return self.check_and_store(step, context, z3_code)
+
+    async def averify(self, step: ReasoningStep, context: list,
+                      session: Optional[TraceSession] = None) -> VerificationResult:
+        if step.step_type != "inference":
+            return VerificationResult(True, "Z3Auditor", "Skipping.", decided_by="skip")
+
+        fast = self.fast_path(step) or self.cached_result(step, context)
+        if fast is not None:
+            return fast
+
+        if session is not None:
+            code = await self.async_llm.formalize_step(*self._step_inputs(step, context, session))
+            return await asyncio.to_thread(self.check_and_store, step, context, code,
+                                           self._step_check(step, context, session))
+
+        z3_code = await self.async_llm.autoformalize_to_z3(*self._prompt_inputs(step, context))
+        return await asyncio.to_thread(self.check_and_store, step, context, z3_code)
+
+    def check_code(self, z3_code: str, compiled: Optional[CodeType] = None) -> VerificationResult:
+        """Runs a generated `solve_logic()` program (or SMT-LIB2 script) and maps its verdict."""
         logger.debug(f"Generated Z3 Code:\n{z3_code}")
+        if looks_like_smtlib(z3_code):
+            outcome = execute_smt_program(z3_code)
+            self._smt_parsed.code = z3_code if outcome.error_type != "SMTLIBError" else None
+            return self._result(outcome)
+        return self._result(execute_z3_program(z3_code, self.handle, compiled))
 
-        try:
-            exec_globals = {
-                "Distinct": z3.Distinct, 
-                
-                "Const": z3.Const,        
-                "Function": z3.Function,  
-                "z3": z3,
-                "Solver": z3.Solver,
-                "Int": z3.Int,
-                "Ints": z3.Ints,
-                "String": z3.String,
-                "Real": z3.Real,   
-                "Bool": z3.Bool,   
-                "Not": z3.Not,
-                "StringVal": z3.StringVal,
-                "And": z3.And,    
-                "Or": z3.Or,      
-                "Implies": z3.Implies, 
-                "If": z3.If,       
-                "sat": z3.sat,
-                "unsat": z3.unsat
-            }
-            exec_locals = {}
-            
-            exec(z3_code, exec_globals, exec_locals)
-            
-            if "solve_logic" not in exec_locals:
-                raise ValueError("LLM did not generate 'solve_logic' function.")
-            
-            is_valid, model = exec_locals["solve_logic"]()
-            
-            if is_valid:
-                return VerificationResult(True, "Z3Auditor", "Logic is mathematically sound.")
-            else:
-                return VerificationResult(
-                    False, 
-                    "Z3Auditor", 
-                    "Logic Error: Counter-example found (Spurious Correlation detected).",
-                    counter_example=str(model)
-                )
+    def _storable(self, code: str, compiled: Optional[CodeType]) -> bool:
+        if compiled is not None:
+            return True
+        # check_and_store has just run check_code on this thread: reuse its parse rather than parsing again.
+        return looks_like_smtlib(code) and getattr(self._smt_parsed, "code", None) == code
+
+    def _step_check(self, step: ReasoningStep, context: list, session: TraceSession):
+        """check_and_store callback: one premises()/conclusion() program against the trace context."""
+        new_facts = session.new_facts(context)
+
+        def check(code: str, compiled: Optional[CodeType] = None) -> VerificationResult:
+            logger.debug(f"Generated Z3 Step:\n{code}")
+            key = f"step{step.step_id}"
+            outcome = execute_z3_step(session.trace_id, self.handle, key, code, session.persistent)
+            if outcome.premises_applied:
+                session.persistent.append((key, code))
+                session.formalized.update(s.step_id for s in new_facts)
+            if outcome.symbols is not None:
+                session.symbols = outcome.symbols
+            return self._result(outcome)
+
+        return check
+
+    @staticmethod
+    def _result(outcome: ExecOutcome) -> VerificationResult:
+        if outcome.undecided:
+            logger.warning(f"Z3 undecided ({outcome.status}): {outcome.error}")
+            reason = f"solver returned unknown ({outcome.error})" if outcome.status == "unknown" else outcome.error
+            return VerificationResult(False, "Z3Auditor", f"Undecided: {reason}.",
+                                      decided_by="z3_codegen", verdict="unknown")
+        if outcome.status != "ok":
+            logger.error(f"Z3 Execution Failed: {outcome.error}")
+            return VerificationResult(False, "Z3Auditor", f"Symbolic Execution Error: {outcome.error}",
+                                      decided_by="z3_codegen")
+
+        if outcome.truthy:
+            return VerificationResult(True, "Z3Auditor", "Logic is mathematically sound.", decided_by="z3_codegen")
+        return VerificationResult(
+            False,
+            "Z3Auditor",
+            "Logic Error: Counter-example found (Spurious Correlation detected).",
+            counter_example=outcome.model,
+            decided_by="z3_codegen"
+        )
 
-        except Exception as e:
-            logger.error(f"Z3 Execution Failed: {e}")
-            return VerificationResult(False, "Z3Auditor", f"Symbolic Execution Error: {e}")
     def verify11(self, step: ReasoningStep, context: list) -> VerificationResult:
 
         if step.step_type != "inference":
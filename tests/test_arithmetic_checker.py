@@ -0,0 +1,36 @@
+import pytest
+
+from src.verifiers.arithmetic_checker import ArithmeticChecker
+
+checker = ArithmeticChecker()
+
+
+@pytest.mark.parametrize("claim, verdict", [
+    ("19 > 10.", "valid"),
+    ("10 > 19", "invalid"),
+    ("$660,391 / $332,316 = 1.99", "valid"),
+    ("(3 + 4) * 2 = 14", "valid"),
+    ("19 > 10, so Brazil loses", None),  # the conclusion is not arithmetic
+])
+def test_check(claim, verdict):
+    res = checker.check(claim)
+    assert (res.verdict if res else None) == verdict
+
+
+@pytest.mark.parametrize("claim", [
+    "3:06:02:29 = 3 days",          # time
+    "2^3 = 8",                      # power
+    "ratio 3:1 = 3",                # ratio
+    "2010-2012 = 3 seasons",        # year range
+    "the record 10-2 = 10 wins",    # win-loss record
+    "(1,234) + 1 = -1233",          # accounting negative
+])
+def test_not_arithmetic(claim):
+    assert checker.evaluate(claim) is None
+
+
+def test_refutes_only_delimited_failures():
+    spaced = checker.evaluate("19 - 10 = 8, so Brazil leads")
+    assert not spaced.holds and not spaced.complete and spaced.delimited
+    glued = checker.evaluate("Score/19 > 20 overall")
+    assert not glued.holds and not glued.delimited
@@ -0,0 +1,91 @@
+# utils/cell_index.py
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from utils.table_utils import normalize_cell
+
+_EDGE_PUNCT = ".,;:!?\"'“”‘’"
+
+
+def claim_words(text: str) -> List[str]:
+    """Whitespace tokens with sentence punctuation trimmed ("$660,391." -> "$660,391")."""
+    words = []
+    for w in str(text).split():
+        w = w.strip(_EDGE_PUNCT)
+        if w.endswith("'s"):
+            w = w[:-2]
+        if w:
+            words.append(w)
+    return words
+
+
+class CellIndex:
+    """
+    Inverted index from normalized cell value to its (row position, column)
+    occurrences, plus the normalized header names.
+
+    Lookups are dict hits, so matching every n-gram of a claim against the
+    table costs microseconds. Columns are read by position, so repeated
+    headers are indexed too; `repeated` lists them, since a header alone
+    does not say which of those columns a claim means.
+    """
+
+    def __init__(self, table: pd.DataFrame, max_ngram: Optional[int] = None):
+        self.table = table
+        self.columns = [str(c) for c in table.columns]
+        self.normalized = table.astype(str).apply(lambda col: col.map(normalize_cell))
+        self.normalized.columns = self.columns
+        self.repeated: Set[str] = {c for c, n in Counter(self.columns).items() if n > 1}
+
+        self.positions: Dict[str, List[Tuple[int, str]]] = defaultdict(list)
+        longest = 1
+        for j, col in enumerate(self.columns):
+            for row, value in enumerate(self.normalized.iloc[:, j].tolist()):
+                if value:
+                    self.positions[value].append((row, col))
+                    longest = max(longest, len(value.split()))
+        self.positions = dict(self.positions)
+        self.max_ngram = max_ngram or min(longest, 12)
+
+        self.headers: Dict[str, str] = {}
+        for col in self.columns:
+            self.headers.setdefault(normalize_cell(col), col)
+        self.max_header_ngram = max((len(h.split()) for h in self.headers), default=1)
+
+    def lookup(self, value) -> List[Tuple[int, str]]:
+        return self.positions.get(normalize_cell(value), [])
+
+    def cell(self, row: int, column: str) -> str:
+        """Normalized value at a row position (the first column of a repeated header)."""
+        return self.normalized.iat[row, self.columns.index(column)]
+
+    @staticmethod
+    def _spans(words: List[str], max_n: int, table: Dict[str, object], taken: List[bool]):
+        """Longest-first, non-overlapping n-gram spans of `words` whose normalized form is in `table`."""
+        found = []
+        for n in range(min(max_n, len(words)), 0, -1):
+            for i in range(len(words) - n + 1):
+                if any(taken[i:i + n]):
+                    continue
+                key = normalize_cell(" ".join(words[i:i + n]))
+                if key in table:
+                    found.append((i, n, key))
+                    for k in range(i, i + n):
+                        taken[k] = True
+        return sorted(found)
+
+    def header_mentions(self, words: List[str], taken: List[bool]) -> List[str]:
+        return [self.headers[key] for _, _, key in self._spans(words, self.max_header_ngram, self.headers, taken)]
+
+    def cell_mentions(self, words: List[str], taken: List[bool]) -> List[Tuple[str, List[Tuple[int, str]]]]:
+        return [(key, self.positions[key]) for _, _, key in self._spans(words, self.max_ngram, self.positions, taken)]
+
+
+_NUMBER = re.compile(r"^[-+($€£¥]*\d[\d,]*(\.\d+)?%?\)?$")
+
+
+def is_number_word(word: str) -> bool:
+    return bool(_NUMBER.match(word))
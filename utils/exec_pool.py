@@ -0,0 +1,483 @@
+# utils/exec_pool.py
+"""
+Sandboxed execution of LLM-generated programs: table checks
+(verify_fact / verify_reasoning) and Z3 audits (solve_logic, or SMT-LIB
+scripts, which need no table and run no Python).
+
+Programs run in pre-warmed worker processes (forkserver with pandas/numpy
+already imported), each table shared with them once through
+utils/shared_tables.py. Every job gets a hard wall-clock timeout and every worker
+an RLIMIT_AS cap; a worker that times out, dies or has served
+SANDBOX_MAX_JOBS_PER_WORKER jobs is replaced. Where forkserver or
+`resource` is unavailable (Windows) programs run in-process, as before.
+"""
+import atexit
+import multiprocessing as mp
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import CodeType
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from configs.config import Config
+from utils.logger import setup_logger
+from utils.shared_tables import AttachedTable, SharedTableStore
+from utils.table_handle import TableHandle
+from utils.z3_exec import IncrementalContext, SmtFormula, get_z3_stats, run_smt2, run_solve_logic, z3_lock
+from utils.z3_formula_cache import get_formula_cache
+
+logger = setup_logger("ExecPool")
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Names a program may ask for besides `pd` / `np`; resolved against the job's table.
+HELPERS = ("find_rows", "tv")
+
+
+@dataclass
+class ExecOutcome:
+    status: str                 # "ok" | "no_entry" | "error" | "timeout" | "crashed" | "missing_table" | "unknown"
+    truthy: bool = False        # bool(result)
+    is_true: bool = False       # result is True (run_pot_verifier's stricter acceptance)
+    error_type: Optional[str] = None
+    error: Optional[str] = None
+    elapsed_s: float = 0.0
+    model: Optional[str] = None  # Z3 counter-example, str()-ed
+    # Incremental Z3 steps: whether the step's premises() joined the trace context,
+    # and the context's symbols afterwards ("name: Sort").
+    premises_applied: bool = False
+    symbols: Optional[List[str]] = None
+
+    @property
+    def undecided(self) -> bool:
+        """No verdict for reasons outside the program's logic (limits, solver `unknown`)."""
+        return self.status in ("timeout", "crashed", "unknown")
+
+
+def _referenced_names(code: CodeType) -> set:
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            names |= _referenced_names(const)
+    return names
+
+
+def _program_globals(code: CodeType, handle: TableHandle, helpers: Tuple[str, ...]) -> dict:
+    # Only build the helpers the program actually uses; on a large table the
+    # trigram index and typed view cost far more than a typical check.
+    used = _referenced_names(code)
+    scope = {"pd": pd, "np": np}
+    if "find_rows" in helpers and "find_rows" in used:
+        scope["find_rows"] = handle.trigram_index.find_rows
+    if "tv" in helpers and "tv" in used:
+        scope["tv"] = handle.typed_view
+    return scope
+
+
+def run_program(code: Union[str, CodeType], entry: str, handle: TableHandle, helpers: Tuple[str, ...] = (),
+                on_ready: Optional[Callable[[], None]] = None) -> ExecOutcome:
+    """
+    exec `code`, call `entry(df)` and classify the outcome (no sandboxing).
+    `on_ready` fires once the program is compiled and its helpers are built,
+    right before any generated code runs.
+    """
+    started = time.perf_counter()
+    try:
+        if isinstance(code, str):
+            code = compile(code, f"<{entry}>", "exec")
+        scope = _program_globals(code, handle, helpers)
+        if on_ready is not None:
+            on_ready()
+            started = time.perf_counter()
+        exec_locals = {}
+        exec(code, scope, exec_locals)
+        if entry not in exec_locals:
+            return ExecOutcome("no_entry", elapsed_s=time.perf_counter() - started)
+        # Shallow copy: a program that adds or drops columns must not alter the cached table.
+        result = exec_locals[entry](handle.df.copy(deep=False))
+        return ExecOutcome("ok", truthy=bool(result), is_true=result is True,
+                           elapsed_s=time.perf_counter() - started)
+    except Exception as e:
+        return ExecOutcome("error", error_type=type(e).__name__, error=str(e) or type(e).__name__,
+                           elapsed_s=time.perf_counter() - started)
+
+
+def _z3_table_globals(code: CodeType, handle: TableHandle) -> dict:
+    """`col` (utils/z3_table.py) for programs that use it."""
+    if Config.Z3_TABLE_ENCODING and "col" in _referenced_names(code):
+        return {"col": handle.z3_encoding.col}
+    return {}
+
+
+def run_z3(code: Union[str, CodeType], handle: TableHandle, entry: str = "solve_logic",
+           on_ready: Optional[Callable[[], None]] = None) -> ExecOutcome:
+    """Generated Z3 program with Z3_TIMEOUT applied (see utils/z3_exec.py)."""
+    started = time.perf_counter()
+    try:
+        if isinstance(code, str):
+            code = compile(code, f"<{entry}>", "exec")
+        extra_globals = _z3_table_globals(code, handle)
+    except Exception as e:
+        return ExecOutcome("error", error_type=type(e).__name__, error=str(e))
+    if on_ready is not None:
+        on_ready()
+        started = time.perf_counter()
+    status, is_valid, model, error = run_solve_logic(code, entry, extra_globals=extra_globals)
+    return ExecOutcome(status, truthy=is_valid, is_true=is_valid, error=error, model=model,
+                       elapsed_s=time.perf_counter() - started)
+
+
+def run_smt(text: str, on_ready: Optional[Callable[[], None]] = None,
+            formula: Optional[SmtFormula] = None) -> ExecOutcome:
+    """SMT-LIB2 audit (Z3_FORMAT="smtlib"): parsed (unless `formula` is given) and solved, nothing exec'd."""
+    if on_ready is not None:
+        on_ready()
+    started = time.perf_counter()
+    status, is_valid, model, error = run_smt2(text, formula=formula)
+    return ExecOutcome(status, truthy=is_valid, is_true=is_valid, error=error, model=model,
+                       elapsed_s=time.perf_counter() - started)
+
+
+_TRACE_CONTEXTS = 32  # incremental Z3 contexts kept per process
+
+
+def run_z3_step(contexts: "OrderedDict[str, IncrementalContext]", trace_id: str, handle: TableHandle,
+                step_key: str, code: str, persistent: Tuple[Tuple[str, str], ...],
+                on_ready: Optional[Callable[[], None]] = None) -> ExecOutcome:
+    """Check one inference step against its trace's IncrementalContext (created or rebuilt as needed)."""
+    try:
+        extra_globals = {}
+        for program in [code] + [c for _, c in persistent]:
+            extra_globals.update(_z3_table_globals(compile(program, f"<{step_key}>", "exec"), handle))
+    except Exception as e:
+        return ExecOutcome("error", error_type=type(e).__name__, error=str(e))
+    context = contexts.get(trace_id)
+    if context is None:
+        context = contexts[trace_id] = IncrementalContext(Config.Z3_TIMEOUT)
+        while len(contexts) > _TRACE_CONTEXTS:
+            contexts.popitem(last=False)
+    else:
+        contexts.move_to_end(trace_id)
+    if on_ready is not None:
+        on_ready()
+    started = time.perf_counter()
+    status, is_valid, model, error, applied = context.check(step_key, code, persistent, extra_globals)
+    return ExecOutcome(status, truthy=is_valid, is_true=is_valid, error=error, model=model,
+                       premises_applied=applied, symbols=context.symbols(),
+                       elapsed_s=time.perf_counter() - started)
+
+
+# ---------------------------------------------------------------- worker side
+
+_WORKER_TABLES = 8  # attached tables (with their indexes) kept per worker
+# Sent once the table is attached and helpers are built: the job's timeout
+# covers generated code only, not a first-time index build on a big table.
+_READY = "ready"
+
+
+def _worker_main(conn, memory_mb: int):
+    if resource is not None and memory_mb:
+        limit = memory_mb * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError) as e:
+            logger.warning(f"Could not set RLIMIT_AS={memory_mb} MB: {e}")
+
+    tables: "OrderedDict[str, Tuple[AttachedTable, TableHandle]]" = OrderedDict()
+    contexts: "OrderedDict[str, IncrementalContext]" = OrderedDict()
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if job is None:
+            return
+        kind, route_key, table_hash, segment, payload = job
+        ready = lambda: conn.send(_READY)
+        if table_hash is None:  # SMT-LIB audits carry no table
+            handle = None
+        elif table_hash in tables:
+            tables.move_to_end(table_hash)
+            handle = tables[table_hash][1]
+        else:
+            try:
+                attached = AttachedTable(segment)
+            except FileNotFoundError:
+                conn.send(ExecOutcome("missing_table", error=f"shared table {segment} is gone"))
+                continue
+            handle = TableHandle(attached.df)
+            tables[table_hash] = (attached, handle)
+            while len(tables) > _WORKER_TABLES:
+                tables.popitem(last=False)[1][0].close()
+        try:
+            if kind == "smt":
+                outcome = run_smt(*payload, on_ready=ready)
+            elif kind == "z3":
+                code, entry = payload
+                outcome = run_z3(code, handle, entry, on_ready=ready)
+            elif kind == "z3_step":
+                outcome = run_z3_step(contexts, route_key, handle, *payload, on_ready=ready)
+            else:
+                code, entry, helpers = payload
+                outcome = run_program(code, entry, handle, helpers, on_ready=ready)
+        except MemoryError as e:
+            outcome = ExecOutcome("error", error_type="MemoryError", error=str(e) or "memory limit exceeded")
+        conn.send(outcome)
+
+
+# ---------------------------------------------------------------- main side
+
+class _Worker:
+    def __init__(self, ctx, memory_mb: int):
+        parent, child = ctx.Pipe(duplex=True)
+        self.proc = ctx.Process(target=_worker_main, args=(child, memory_mb), daemon=True)
+        self.proc.start()
+        child.close()
+        self.conn = parent
+        self.jobs = 0
+
+    def stop(self, kill: bool = False):
+        try:
+            if kill:
+                self.proc.kill()
+            else:
+                self.conn.send(None)
+        except (OSError, ValueError, BrokenPipeError):
+            pass
+        self.proc.join(timeout=1.0)
+        if self.proc.is_alive():
+            self.proc.kill()
+            self.proc.join(timeout=1.0)
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    Fixed set of forkserver worker slots with table-affine routing: a job for
+    table h always goes to slot int(h) % workers, so a table is attached (and
+    its trigram index / typed view built) by one worker only. Tables reach
+    workers through shared memory; a job sends just code + table hash.
+    run() is blocking and thread-safe; use asyncio.to_thread from coroutines.
+    """
+
+    def __init__(self, workers: int, timeout_s: float, memory_mb: int, max_jobs_per_worker: int,
+                 prepare_timeout_s: float = 120.0):
+        self.max_workers = max(1, workers)
+        self.timeout_s = timeout_s
+        self.prepare_timeout_s = prepare_timeout_s
+        self.memory_mb = memory_mb
+        self.max_jobs = max_jobs_per_worker
+
+        self._ctx = mp.get_context("forkserver")
+        self._ctx.set_forkserver_preload(["numpy", "pandas", "z3", "utils.exec_pool"])
+        self._slots: List[Optional[_Worker]] = [None] * self.max_workers
+        self._slot_locks = [threading.Lock() for _ in range(self.max_workers)]
+        self._closed = False
+        self.tables = SharedTableStore()
+
+        self._stats_lock = threading.Lock()
+        self.counts: Dict[str, int] = {"jobs": 0, "timeouts": 0, "crashes": 0, "recycled": 0}
+
+    def slot_for(self, route_key: str) -> int:
+        """route_key is a hex digest: a table content hash, or a trace id for incremental Z3."""
+        return int(route_key[:16], 16) % self.max_workers
+
+    def _retire(self, slot: int, kill: bool):
+        worker, self._slots[slot] = self._slots[slot], None
+        if worker is not None:
+            worker.stop(kill=kill)
+
+    def _bump(self, key: str):
+        with self._stats_lock:
+            self.counts[key] += 1
+
+    def run(self, code: str, entry: str, handle: TableHandle, helpers: Tuple[str, ...] = (),
+            timeout_s: Optional[float] = None, kind: str = "pandas") -> ExecOutcome:
+        """Run one job; kind "pandas" calls entry(df) on the table, "z3" calls entry() (see run_z3)."""
+        payload = (code, entry, tuple(helpers)) if kind == "pandas" else (code, entry)
+        return self.submit(kind, payload, handle.content_hash, handle, timeout_s)
+
+    def submit(self, kind: str, payload: tuple, route_key: str, handle: Optional[TableHandle],
+               timeout_s: Optional[float] = None) -> ExecOutcome:
+        """
+        Low-level job: routed to slot_for(route_key), run against `handle`'s
+        table (published once, attached by the worker under its content hash),
+        or against no table when `handle` is None.
+        """
+        timeout_s = timeout_s or self.timeout_s
+        table_hash = handle.content_hash if handle is not None else None
+        slot = self.slot_for(route_key)
+        started = time.perf_counter()
+        self._bump("jobs")
+        with self._slot_locks[slot]:
+            for attempt in range(2):
+                segment = self.tables.publish(table_hash, handle.df) if handle is not None else None
+                outcome = self._run_in_slot(slot, (kind, route_key, table_hash, segment, payload), timeout_s)
+                if outcome.status != "missing_table":
+                    break
+                # Evicted between publish and attach; publish it again.
+                self.tables.forget(table_hash)
+        outcome.elapsed_s = time.perf_counter() - started
+        return outcome
+
+    def _run_in_slot(self, slot: int, job: tuple, timeout_s: float) -> ExecOutcome:
+        worker = self._slots[slot]
+        if worker is None:
+            worker = self._slots[slot] = _Worker(self._ctx, self.memory_mb)
+        try:
+            worker.conn.send(job)
+            outcome = self._receive(slot, worker, self.prepare_timeout_s)
+            if outcome == _READY:
+                outcome = self._receive(slot, worker, timeout_s)
+        except (EOFError, OSError, BrokenPipeError) as e:
+            # Killed by the kernel (RLIMIT_AS / OOM) or crashed in native code.
+            self._bump("crashes")
+            self._retire(slot, kill=True)
+            return ExecOutcome("crashed", error_type=type(e).__name__,
+                               error="sandbox worker died (memory limit exceeded?)")
+        worker.jobs += 1
+        if worker.jobs >= self.max_jobs or self._closed:
+            self._bump("recycled")
+            self._retire(slot, kill=False)
+        return outcome
+
+    def _receive(self, slot: int, worker: _Worker, timeout_s: float):
+        if not worker.conn.poll(timeout_s):
+            self._bump("timeouts")
+            self._retire(slot, kill=True)
+            return ExecOutcome("timeout", error_type="TimeoutError", error=f"timed out after {timeout_s:.0f}s")
+        return worker.conn.recv()
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            counts = dict(self.counts)
+        counts["workers"] = sum(w is not None for w in self._slots)
+        return counts
+
+    def close(self):
+        self._closed = True
+        for slot, lock in enumerate(self._slot_locks):
+            with lock:
+                self._retire(slot, kill=False)
+        self.tables.close()
+
+
+def sandbox_available() -> bool:
+    return resource is not None and "forkserver" in mp.get_all_start_methods()
+
+
+_shared_pool: Optional[SandboxPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_exec_pool(create: bool = True) -> Optional[SandboxPool]:
+    """Process-wide sandbox pool built from Config; None when disabled or unsupported."""
+    global _shared_pool
+    if not Config.SANDBOX_ENABLED or not sandbox_available():
+        return None
+    with _shared_lock:
+        if _shared_pool is None and create:
+            _shared_pool = SandboxPool(
+                workers=Config.SANDBOX_WORKERS,
+                timeout_s=Config.SANDBOX_TIMEOUT_S,
+                memory_mb=Config.SANDBOX_MEMORY_MB,
+                max_jobs_per_worker=Config.SANDBOX_MAX_JOBS_PER_WORKER,
+                prepare_timeout_s=Config.SANDBOX_PREPARE_TIMEOUT_S,
+            )
+            atexit.register(_shared_pool.close)
+            logger.info(f"Sandbox pool: {Config.SANDBOX_WORKERS} workers, {Config.SANDBOX_TIMEOUT_S}s timeout, "
+                        f"{Config.SANDBOX_MEMORY_MB} MB address space")
+    return _shared_pool
+
+
+def execute_program(code: str, entry: str, handle: TableHandle, helpers: Tuple[str, ...] = (),
+                    compiled: Optional[CodeType] = None) -> ExecOutcome:
+    """Run a generated program in the sandbox pool, or in-process where sandboxing is unavailable."""
+    pool = get_exec_pool()
+    if pool is None:
+        return run_program(compiled if compiled is not None else code, entry, handle, helpers)
+    return pool.run(code, entry, handle, helpers)
+
+
+def execute_z3_program(code: str, handle: TableHandle, compiled: Optional[CodeType] = None,
+                       entry: str = "solve_logic") -> ExecOutcome:
+    """
+    Run a generated Z3 program on the sandbox pool (hard-killed after
+    Z3_WALL_TIMEOUT_S), or in-process under z3_lock. Routed by table hash
+    like table programs. Latency and outcome land in get_z3_stats().
+    """
+    pool = get_exec_pool()
+    if pool is None:
+        with z3_lock:
+            outcome = run_z3(compiled if compiled is not None else code, handle, entry)
+    else:
+        outcome = pool.run(code, entry, handle, timeout_s=Config.Z3_WALL_TIMEOUT_S, kind="z3")
+    get_z3_stats().record(outcome.status, outcome.elapsed_s)
+    return outcome
+
+
+def execute_smt_program(text: str) -> ExecOutcome:
+    """
+    Check an SMT-LIB2 audit. The script is parsed here first: a syntax error
+    needs no worker, and the canonical formula hash (SmtFormula.key) looks
+    up the formula cache, so a formula that was already decided is not
+    solved again. Misses are solved on the sandbox pool, routed by that
+    hash, or in-process under z3_lock on the formula parsed here.
+    """
+    started = time.perf_counter()
+    try:
+        with z3_lock:
+            formula = SmtFormula(text)
+            key = formula.key()
+    except ValueError as e:
+        outcome = ExecOutcome("error", error_type="SMTLIBError", error=str(e),
+                              elapsed_s=time.perf_counter() - started)
+        get_z3_stats().record(outcome.status, outcome.elapsed_s)
+        return outcome
+
+    cache = get_formula_cache()
+    hit = cache.get(key) if cache is not None else None
+    if hit is not None:
+        get_z3_stats().record_cache_hit()
+        is_valid, model = hit
+        return ExecOutcome("ok", truthy=is_valid, is_true=is_valid, model=model,
+                           elapsed_s=time.perf_counter() - started)
+
+    pool = get_exec_pool()
+    if pool is None:
+        with z3_lock:
+            outcome = run_smt(text, formula=formula)
+    else:
+        outcome = pool.submit("smt", (text,), key, None, timeout_s=Config.Z3_WALL_TIMEOUT_S)
+    get_z3_stats().record(outcome.status, outcome.elapsed_s)
+    if cache is not None and outcome.status == "ok":
+        cache.put(key, outcome.truthy, outcome.model)
+    return outcome
+
+
+_local_contexts: "OrderedDict[str, IncrementalContext]" = OrderedDict()
+
+
+def execute_z3_step(trace_id: str, handle: TableHandle, step_key: str, code: str,
+                    persistent: List[Tuple[str, str]]) -> ExecOutcome:
+    """
+    One incremental inference check (Z3_INCREMENTAL). Routed by trace id, so
+    every step of a trace reaches the worker holding its solver; a worker that
+    lost it (recycled, killed) rebuilds it from `persistent`.
+    """
+    pool = get_exec_pool()
+    payload = (step_key, code, tuple(persistent))
+    if pool is None:
+        with z3_lock:
+            outcome = run_z3_step(_local_contexts, trace_id, handle, *payload)
+    else:
+        outcome = pool.submit("z3_step", payload, trace_id, handle, timeout_s=Config.Z3_WALL_TIMEOUT_S)
+    get_z3_stats().record(outcome.status, outcome.elapsed_s)
+    return outcome
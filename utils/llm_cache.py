@@ -0,0 +1,182 @@
+# utils/llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from configs.config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger("LLMCache")
+
+
+class CacheMissError(RuntimeError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+class LLMResponseCache:
+    """
+    Content-addressed on-disk cache of chat completions (SQLite).
+
+    Modes:
+      - "readwrite": serve hits, record misses.
+      - "replay":    serve hits only, a miss raises CacheMissError (no API traffic).
+      - "off":       bypass (LLMEngine does not create a cache at all).
+    """
+
+    MODES = ("off", "readwrite", "replay")
+    # Eviction is checked every N writes, not on every put.
+    EVICT_EVERY = 256
+
+    def __init__(self, path: str, mode: str = "readwrite",
+                 max_mb: Optional[float] = None, max_age_days: Optional[float] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {self.MODES}")
+        self.path = path
+        self.mode = mode
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb else None
+        self.max_age_s = max_age_days * 86400 if max_age_days else None
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                   key TEXT PRIMARY KEY,
+                   model TEXT,
+                   content TEXT,
+                   usage TEXT,
+                   size INTEGER,
+                   created_at REAL,
+                   last_access REAL
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self._conn.commit()
+
+        if self.mode != "replay":
+            self.evict()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict], temperature: float,
+                 response_format: Optional[dict] = None, **params: Any) -> str:
+        """Stable hash of everything that can change the completion."""
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "response_format": response_format,
+            "params": params,
+        }
+        blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns {"content": str, "usage": dict|None} or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, usage FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                if self.mode == "replay":
+                    raise CacheMissError(f"Replay mode: no recorded response for key {key[:12]}")
+                return None
+
+            self.hits += 1
+            if self.mode != "replay":
+                self._conn.execute(
+                    "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+                self._conn.commit()
+        return {"content": row[0], "usage": json.loads(row[1]) if row[1] else None}
+
+    def put(self, key: str, model: str, content: str, usage: Optional[dict] = None):
+        if self.mode == "replay" or content is None:
+            return
+        now = time.time()
+        usage_json = json.dumps(usage) if usage else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, content, usage_json, len(content.encode("utf-8")), now, now),
+            )
+            self._conn.commit()
+            self.writes += 1
+            need_evict = self.writes % self.EVICT_EVERY == 0
+        if need_evict:
+            self.evict()
+
+    def evict(self):
+        """Drops entries older than max_age, then least-recently-used ones above max_bytes."""
+        with self._lock:
+            if self.max_age_s:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age_s,)
+                )
+            if self.max_bytes:
+                total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                if total > self.max_bytes:
+                    excess = total - self.max_bytes
+                    freed = 0
+                    victims = []
+                    for key, size in self._conn.execute(
+                        "SELECT key, size FROM responses ORDER BY last_access ASC"
+                    ):
+                        victims.append((key,))
+                        freed += size
+                        if freed >= excess:
+                            break
+                    self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+                    logger.info(f"Evicted {len(victims)} cached responses ({freed / 1e6:.1f} MB)")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_mb": size / 1e6,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache: Optional[LLMResponseCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Process-wide cache built from Config; None when caching is off."""
+    global _shared_cache
+    if Config.LLM_CACHE_MODE == "off":
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMResponseCache(
+                Config.LLM_CACHE_PATH,
+                mode=Config.LLM_CACHE_MODE,
+                max_mb=Config.LLM_CACHE_MAX_MB,
+                max_age_days=Config.LLM_CACHE_MAX_AGE_DAYS,
+            )
+            logger.info(f"LLM cache: {Config.LLM_CACHE_PATH} (mode={Config.LLM_CACHE_MODE})")
+    return _shared_cache
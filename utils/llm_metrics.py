@@ -0,0 +1,137 @@
+# utils/llm_metrics.py
+import json
+import math
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+from configs.config import Config
+
+# Tags (sample_id, stage, ...) attached to every LLM call made inside the context.
+# ContextVar so the tags follow asyncio tasks and asyncio.to_thread calls.
+_call_tags: ContextVar[Dict[str, str]] = ContextVar("llm_call_tags", default={})
+
+
+@contextmanager
+def llm_call_context(**tags):
+    """with llm_call_context(sample_id="nu-50/type1_correct", stage="verify"): ..."""
+    token = _call_tags.set({**_call_tags.get(), **{k: str(v) for k, v in tags.items()}})
+    try:
+        yield
+    finally:
+        _call_tags.reset(token)
+
+
+def current_call_tags() -> Dict[str, str]:
+    return _call_tags.get()
+
+
+@dataclass
+class LLMCallRecord:
+    call_site: str
+    sample_id: Optional[str]
+    stage: Optional[str]
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    ttfb_s: Optional[float] = None
+    latency_s: float = 0.0
+    retries: int = 0
+    cache_hit: bool = False
+    error: Optional[str] = None
+
+    @property
+    def cost_usd(self) -> float:
+        if self.cache_hit:
+            return 0.0
+        return (self.prompt_tokens * Config.LLM_PRICE_INPUT_PER_1M
+                + self.completion_tokens * Config.LLM_PRICE_OUTPUT_PER_1M) / 1e6
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class LLMMetrics:
+    """Thread-safe collector of per-call records with per-stage / per-call-site rollups."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records: List[LLMCallRecord] = []
+
+    def record(self, call_site: str, **fields) -> LLMCallRecord:
+        tags = current_call_tags()
+        rec = LLMCallRecord(call_site=call_site, sample_id=tags.get("sample_id"), stage=tags.get("stage"), **fields)
+        with self._lock:
+            self.records.append(rec)
+        return rec
+
+    def summary(self) -> Dict[tuple, dict]:
+        groups = defaultdict(list)
+        with self._lock:
+            records = list(self.records)
+        for rec in records:
+            groups[(rec.stage or "-", rec.call_site)].append(rec)
+
+        rows = {}
+        for key, recs in sorted(groups.items()):
+            live = [r for r in recs if not r.cache_hit and r.error is None]
+            latencies = [r.latency_s for r in live]
+            ttfbs = [r.ttfb_s for r in live if r.ttfb_s is not None]
+            rows[key] = {
+                "calls": len(recs),
+                "cache_hits": sum(r.cache_hit for r in recs),
+                "errors": sum(r.error is not None for r in recs),
+                "retries": sum(r.retries for r in recs),
+                "prompt_tokens": sum(r.prompt_tokens for r in recs),
+                "completion_tokens": sum(r.completion_tokens for r in recs),
+                "p50_s": percentile(latencies, 50),
+                "p95_s": percentile(latencies, 95),
+                "p99_s": percentile(latencies, 99),
+                "ttfb_p50_s": percentile(ttfbs, 50),
+                "wall_s": sum(latencies),
+                "cost_usd": sum(r.cost_usd for r in recs),
+            }
+        return rows
+
+    def print_report(self):
+        rows = self.summary()
+        print("\n" + "=" * 118)
+        print("💰 LLM CALL PROFILE (per stage / call site)")
+        print("=" * 118)
+        print(f"{'stage':<12}{'call site':<24}{'calls':>7}{'hits':>6}{'retry':>6}{'err':>5}"
+              f"{'in tok':>10}{'out tok':>9}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'ttfb50':>8}"
+              f"{'wall s':>9}{'cost $':>9}")
+        print("-" * 118)
+        total_cost = total_wall = 0.0
+        for (stage, site), r in rows.items():
+            total_cost += r["cost_usd"]
+            total_wall += r["wall_s"]
+            print(f"{stage:<12}{site:<24}{r['calls']:>7}{r['cache_hits']:>6}{r['retries']:>6}{r['errors']:>5}"
+                  f"{r['prompt_tokens']:>10}{r['completion_tokens']:>9}{r['p50_s']:>8.2f}{r['p95_s']:>8.2f}"
+                  f"{r['p99_s']:>8.2f}{r['ttfb_p50_s']:>8.2f}{r['wall_s']:>9.1f}{r['cost_usd']:>9.4f}")
+        print("-" * 118)
+        print(f"Total: {sum(r['calls'] for r in rows.values())} calls, "
+              f"{total_wall:.1f} s summed latency, ${total_cost:.4f}")
+        print("=" * 118)
+
+    def save_jsonl(self, path: str):
+        with self._lock:
+            records = list(self.records)
+        with open(path, "w", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps({**asdict(rec), "cost_usd": rec.cost_usd}, ensure_ascii=False) + "\n")
+
+
+_metrics = LLMMetrics()
+
+
+def get_llm_metrics() -> LLMMetrics:
+    return _metrics
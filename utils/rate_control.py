@@ -0,0 +1,524 @@
+# utils/rate_control.py
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, Optional
+
+from configs.config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger("RateControl")
+
+
+def is_rate_limit_error(e: BaseException) -> bool:
+    """Works for openai, google-genai and plain HTTP errors."""
+    for attr in ("status_code", "code", "status"):
+        if getattr(e, attr, None) == 429:
+            return True
+    name = type(e).__name__
+    return name == "RateLimitError" or "429" in str(e)[:200] or "RESOURCE_EXHAUSTED" in str(e)[:200]
+
+
+def is_retriable_error(e: BaseException) -> bool:
+    if is_rate_limit_error(e) or isinstance(e, (asyncio.TimeoutError, TimeoutError)):
+        return True
+    status = getattr(e, "status_code", None) or getattr(e, "code", None)
+    if status in (500, 502, 503, 504):
+        return True
+    text = str(e)[:200]
+    return type(e).__name__ in ("APIConnectionError", "APITimeoutError", "InternalServerError") or \
+        any(k in text for k in ("SSL", "EOF", "disconnected", "closed connection"))
+
+
+def retry_after_seconds(e: BaseException) -> Optional[float]:
+    """Reads Retry-After / retry-after-ms from the HTTP response attached to an SDK error."""
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+try:
+    import tiktoken
+    _ENCODER = tiktoken.get_encoding("cl100k_base")
+except Exception:  # optional dependency
+    _ENCODER = None
+
+
+def estimate_tokens(messages, expected_completion: int = 0) -> int:
+    """
+    Prompt-size estimate used for TPM admission, before the request is sent.
+    Uses tiktoken when installed; otherwise ~4 chars/token for ASCII and one
+    token per non-ASCII character (CJK-heavy prompts), which errs on the high side.
+    """
+    if isinstance(messages, str):
+        texts = [messages]
+    else:
+        texts = [str(m.get("content", "")) for m in messages]
+    total = 0
+    for text in texts:
+        if _ENCODER is not None:
+            total += len(_ENCODER.encode(text, disallowed_special=()))
+        else:
+            non_ascii = sum(1 for ch in text if ord(ch) > 127)
+            total += (len(text) - non_ascii) // 4 + non_ascii
+        total += 4  # per-message framing
+    return total + expected_completion
+
+
+def response_tokens(response) -> Optional[int]:
+    """Total billed tokens reported by an openai or google-genai response, if any."""
+    usage = getattr(response, "usage", None)
+    if usage is not None and getattr(usage, "total_tokens", None) is not None:
+        return usage.total_tokens
+    meta = getattr(response, "usage_metadata", None)
+    if meta is not None and getattr(meta, "total_token_count", None) is not None:
+        return meta.total_token_count
+    return None
+
+
+class _FifoGate:
+    """
+    FIFO admission queue usable from both threads and asyncio tasks.
+
+    Subclasses decide *whether* a request of a given cost fits right now
+    (`_wait_hint_locked`) and book it (`_take_locked`); this class handles
+    queueing, wake-ups and cancellation.
+    """
+
+    POLL_S = 1.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = deque()  # threading.Event or _AsyncWaiter
+
+    def _wait_hint_locked(self, cost: int) -> Optional[float]:
+        """None if `cost` fits now, else seconds until it may fit (0 = until woken)."""
+        raise NotImplementedError
+
+    def _take_locked(self, cost: int):
+        raise NotImplementedError
+
+    def _admit_locked(self, waiter, cost: int):
+        if self._waiters and self._waiters[0] is not waiter:
+            return False, None
+        if self._wait_hint_locked(cost) is not None:
+            return False, None
+        if self._waiters:
+            self._waiters.popleft()
+        ticket = self._take_locked(cost)
+        self._wake_locked()
+        return True, ticket
+
+    def _wake_locked(self):
+        # Only the head of the queue can be admitted; it wakes the next one in turn.
+        if self._waiters:
+            self._waiters[0].set()
+
+    def _wait_timeout(self, cost: int) -> float:
+        # Time-based limits (pauses, sliding windows) tell us when to re-check;
+        # otherwise we rely on wake-ups and the poll is only a safety net.
+        with self._lock:
+            hint = self._wait_hint_locked(cost)
+        return hint if hint else self.POLL_S
+
+    def _abandon_locked(self, waiter):
+        if waiter in self._waiters:
+            was_head = self._waiters[0] is waiter
+            self._waiters.remove(waiter)
+            if was_head:
+                self._wake_locked()
+
+    def _gate_acquire(self, cost: int):
+        with self._lock:
+            if not self._waiters:
+                ok, ticket = self._admit_locked(None, cost)
+                if ok:
+                    return ticket
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+        try:
+            while True:
+                waiter.wait(self._wait_timeout(cost))
+                waiter.clear()
+                with self._lock:
+                    ok, ticket = self._admit_locked(waiter, cost)
+                    if ok:
+                        return ticket
+        except BaseException:
+            with self._lock:
+                self._abandon_locked(waiter)
+            raise
+
+    async def _gate_aacquire(self, cost: int):
+        with self._lock:
+            if not self._waiters:
+                ok, ticket = self._admit_locked(None, cost)
+                if ok:
+                    return ticket
+            waiter = _AsyncWaiter(asyncio.get_running_loop())
+            self._waiters.append(waiter)
+        try:
+            while True:
+                await waiter.wait(self._wait_timeout(cost))
+                with self._lock:
+                    ok, ticket = self._admit_locked(waiter, cost)
+                    if ok:
+                        return ticket
+        except BaseException:
+            with self._lock:
+                self._abandon_locked(waiter)
+            raise
+
+
+class AdaptiveConcurrencyController(_FifoGate):
+    """
+    AIMD concurrency limit shared by every LLM call site in the process.
+
+    - Success: additive increase (about +1 slot per `limit` successful calls).
+    - 429: multiplicative decrease and a global pause honouring Retry-After.
+    - Latency well above the running baseline (or a timeout): gentle decrease.
+
+    Both threads (`slot()`) and asyncio tasks (`aslot()`) can wait on the same
+    controller; waiters are served FIFO.
+    """
+
+    def __init__(self, name: str = "default", initial: int = Config.RATE_INITIAL_CONCURRENCY,
+                 min_limit: int = 1, max_limit: int = Config.RATE_MAX_CONCURRENCY,
+                 decrease_factor: float = 0.5, latency_tolerance: float = 2.5):
+        super().__init__()
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+
+        self._limit = float(initial)
+        self._inflight = 0
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._latency_baseline: Optional[float] = None
+
+        self.successes = 0
+        self.rate_limited = 0
+        self.peak_limit = int(self._limit)
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    # ---------- admission ----------
+
+    def _wait_hint_locked(self, cost: int) -> Optional[float]:
+        pause = self._blocked_until - time.monotonic()
+        if pause > 0:
+            return pause
+        return 0.0 if self._inflight >= self.limit else None
+
+    def _take_locked(self, cost: int):
+        self._inflight += 1
+
+    def acquire(self):
+        self._gate_acquire(1)
+
+    async def aacquire(self):
+        await self._gate_aacquire(1)
+
+    def release(self):
+        with self._lock:
+            self._inflight -= 1
+            self._wake_locked()
+
+    # ---------- feedback ----------
+
+    def record_success(self, latency_s: float):
+        with self._lock:
+            self.successes += 1
+            if self._latency_baseline is None:
+                self._latency_baseline = latency_s
+            slow = latency_s > self.latency_tolerance * self._latency_baseline
+            self._latency_baseline = 0.95 * self._latency_baseline + 0.05 * latency_s
+            if slow:
+                self._decrease_locked(0.9)
+            else:
+                self._limit = min(self.max_limit, self._limit + 1.0 / max(self._limit, 1.0))
+                self.peak_limit = max(self.peak_limit, self.limit)
+            self._wake_locked()
+
+    def record_rate_limit(self, retry_after: Optional[float] = None):
+        with self._lock:
+            self.rate_limited += 1
+            self._decrease_locked(self.decrease_factor)
+            pause = retry_after if retry_after is not None else 1.0 + random.uniform(0, 1.0)
+            self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+        logger.warning(f"[{self.name}] 429 received: limit -> {self.limit}, pausing {pause:.1f}s")
+
+    def record_timeout(self):
+        with self._lock:
+            self._decrease_locked(0.75)
+
+    def _decrease_locked(self, factor: float):
+        # At most one decrease per observed round trip, so a burst of 429s from
+        # the same window does not collapse the limit to the floor.
+        now = time.monotonic()
+        window = self._latency_baseline or 1.0
+        if now - self._last_decrease < window:
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.min_limit), self._limit * factor)
+
+    # ---------- context managers ----------
+
+    def _record_outcome(self, error: Optional[BaseException], started: float):
+        if error is None:
+            self.record_success(time.monotonic() - started)
+        elif is_rate_limit_error(error):
+            self.record_rate_limit(retry_after_seconds(error))
+        elif isinstance(error, (asyncio.TimeoutError, TimeoutError)) or type(error).__name__ == "APITimeoutError":
+            self.record_timeout()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self._record_outcome(e, started)
+            raise
+        else:
+            self._record_outcome(None, started)
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        await self.aacquire()
+        started = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            self._record_outcome(e, started)
+            raise
+        else:
+            self._record_outcome(None, started)
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": self.limit,
+            "peak_limit": self.peak_limit,
+            "successes": self.successes,
+            "rate_limited": self.rate_limited,
+        }
+
+
+class TokenBudget(_FifoGate):
+    """
+    Requests-per-minute and tokens-per-minute admission over a sliding 60 s window.
+
+    Each call is charged its estimated prompt tokens plus an expected completion
+    size before it is sent, and the charge is corrected with the provider-reported
+    usage afterwards. Admission is FIFO, so a large-table prompt waiting for
+    budget is not starved by a stream of small ones, and small ones queue behind
+    it only as long as the window needs to drain. A single request larger than the
+    whole TPM budget is clamped to it so it can still run.
+    """
+
+    WINDOW_S = 60.0
+
+    def __init__(self, name: str = "default", rpm: int = 0, tpm: int = 0):
+        super().__init__()
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self._window = deque()  # [timestamp, tokens]
+        self._used_tokens = 0
+
+        self.admitted = 0
+        self.tokens_charged = 0
+        self.total_wait_s = 0.0
+
+    def _prune_locked(self, now: float):
+        while self._window and self._window[0][0] <= now - self.WINDOW_S:
+            self._used_tokens -= self._window.popleft()[1]
+
+    def _wait_hint_locked(self, cost: int) -> Optional[float]:
+        now = time.monotonic()
+        self._prune_locked(now)
+        wait = 0.0
+        if self.rpm and len(self._window) + 1 > self.rpm:
+            wait = max(wait, self._window[0][0] + self.WINDOW_S - now)
+        if self.tpm and self._used_tokens + cost > self.tpm:
+            freed = 0
+            for ts, tokens in self._window:
+                freed += tokens
+                if self._used_tokens - freed + cost <= self.tpm:
+                    wait = max(wait, ts + self.WINDOW_S - now)
+                    break
+        return wait if wait > 0 else None
+
+    def _take_locked(self, cost: int):
+        entry = [time.monotonic(), cost]
+        self._window.append(entry)
+        self._used_tokens += cost
+        self.admitted += 1
+        self.tokens_charged += cost
+        return entry
+
+    def _clamp(self, tokens: int) -> int:
+        return min(tokens, self.tpm) if self.tpm else tokens
+
+    def acquire(self, tokens: int):
+        started = time.monotonic()
+        ticket = self._gate_acquire(self._clamp(tokens))
+        self.total_wait_s += time.monotonic() - started
+        return ticket
+
+    async def aacquire(self, tokens: int):
+        started = time.monotonic()
+        ticket = await self._gate_aacquire(self._clamp(tokens))
+        self.total_wait_s += time.monotonic() - started
+        return ticket
+
+    def reconcile(self, ticket, actual_tokens: Optional[int]):
+        """Replaces the estimate booked for `ticket` with the real usage."""
+        if ticket is None or actual_tokens is None:
+            return
+        with self._lock:
+            delta = actual_tokens - ticket[1]
+            ticket[1] = actual_tokens
+            if ticket in self._window:
+                self._used_tokens += delta
+            self.tokens_charged += delta
+            if delta < 0:
+                self._wake_locked()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "admitted": self.admitted,
+            "tokens": self.tokens_charged,
+            "mean_wait_s": self.total_wait_s / self.admitted if self.admitted else 0.0,
+        }
+
+
+class _AsyncWaiter:
+    """Queue entry for a coroutine; set() may be called from any thread."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    def set(self):
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    async def wait(self, timeout: float):
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.event.clear()
+
+
+def _backoff(attempt: int) -> float:
+    return Config.LLM_BASE_BACKOFF_S * (2 ** attempt) * random.uniform(0.8, 1.2)
+
+
+def call_with_retries(fn: Callable, controller: AdaptiveConcurrencyController,
+                      max_retries: int = Config.LLM_MAX_RETRIES,
+                      budget: Optional[TokenBudget] = None, tokens: int = 0):
+    """
+    Runs fn() inside a controller slot, retrying transient failures. With a
+    `budget`, every attempt is first admitted against RPM/TPM for `tokens`.
+    """
+    for attempt in range(max_retries + 1):
+        ticket = budget.acquire(tokens) if budget is not None else None
+        try:
+            with controller.slot():
+                result = fn()
+            if budget is not None:
+                budget.reconcile(ticket, response_tokens(result))
+            return result
+        except Exception as e:
+            if attempt >= max_retries or not is_retriable_error(e):
+                raise
+            # 429s already paused the controller for Retry-After.
+            if not is_rate_limit_error(e):
+                time.sleep(_backoff(attempt))
+
+
+async def acall_with_retries(coro_fn: Callable, controller: AdaptiveConcurrencyController,
+                             max_retries: int = Config.LLM_MAX_RETRIES, timeout: Optional[float] = None,
+                             budget: Optional[TokenBudget] = None, tokens: int = 0):
+    """
+    Async variant of call_with_retries. `timeout` bounds each attempt once it holds
+    a slot, so time spent queueing behind the controller does not count.
+    """
+    for attempt in range(max_retries + 1):
+        ticket = await budget.aacquire(tokens) if budget is not None else None
+        try:
+            async with controller.aslot():
+                if timeout is None:
+                    result = await coro_fn()
+                else:
+                    result = await asyncio.wait_for(coro_fn(), timeout=timeout)
+            if budget is not None:
+                budget.reconcile(ticket, response_tokens(result))
+            return result
+        except Exception as e:
+            if attempt >= max_retries or not is_retriable_error(e):
+                raise
+            if not is_rate_limit_error(e):
+                await asyncio.sleep(_backoff(attempt))
+
+
+_controllers: Dict[str, AdaptiveConcurrencyController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_rate_controller(name: str = "default") -> AdaptiveConcurrencyController:
+    """One controller per provider/endpoint, shared process-wide."""
+    with _controllers_lock:
+        if name not in _controllers:
+            _controllers[name] = AdaptiveConcurrencyController(name=name)
+        return _controllers[name]
+
+
+_budgets: Dict[str, TokenBudget] = {}
+
+
+def get_token_budget(name: str = "default") -> Optional[TokenBudget]:
+    """Shared RPM/TPM budget per endpoint; None when no limits are configured."""
+    if not Config.LLM_RPM_LIMIT and not Config.LLM_TPM_LIMIT:
+        return None
+    with _controllers_lock:
+        if name not in _budgets:
+            _budgets[name] = TokenBudget(name=name, rpm=Config.LLM_RPM_LIMIT, tpm=Config.LLM_TPM_LIMIT)
+        return _budgets[name]
@@ -0,0 +1,127 @@
+# utils/shared_tables.py
+"""
+Publish parsed tables into POSIX shared memory, once per content hash.
+
+A table is pickled with protocol 5. Contiguous column buffers (numeric
+blocks) go out-of-band, so a worker that attaches gets arrays that map
+the shared segment read-only instead of copying it. Object/str columns
+travel in the pickle stream and are materialized once per worker.
+
+Segment layout: <u64 meta length> <meta pickle> <main pickle> <buffers...>,
+buffers aligned to 64 bytes; meta = (main length, [(offset, length), ...]).
+"""
+import pickle
+import struct
+import threading
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from utils.logger import setup_logger
+
+logger = setup_logger("SharedTables")
+
+_ALIGN = 64
+_HEADER = struct.Struct("<Q")
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class SharedTableStore:
+    """Main-process side: content hash -> shared memory segment, LRU-bounded."""
+
+    def __init__(self, max_tables: int = 64):
+        self.max_tables = max_tables
+        self._segments: "OrderedDict[str, shared_memory.SharedMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def publish(self, table_hash: str, df: pd.DataFrame) -> str:
+        """Segment name holding `df`; published on first use."""
+        with self._lock:
+            shm = self._segments.get(table_hash)
+            if shm is not None:
+                self._segments.move_to_end(table_hash)
+                return shm.name
+
+        buffers: List[pickle.PickleBuffer] = []
+        main = pickle.dumps(df, protocol=5, buffer_callback=buffers.append)
+        raws = [b.raw() for b in buffers]
+
+        offsets: List[Tuple[int, int]] = []
+        # Buffer offsets are relative to data_start, the first aligned byte after the main pickle.
+        pos = 0
+        for raw in raws:
+            offsets.append((pos, raw.nbytes))
+            pos = _aligned(pos + raw.nbytes)
+        meta = pickle.dumps((len(main), offsets), protocol=5)
+        data_start = _aligned(_HEADER.size + len(meta) + len(main))
+
+        shm = shared_memory.SharedMemory(create=True, size=max(1, data_start + pos))
+        _HEADER.pack_into(shm.buf, 0, len(meta))
+        shm.buf[_HEADER.size:_HEADER.size + len(meta)] = meta
+        shm.buf[_HEADER.size + len(meta):_HEADER.size + len(meta) + len(main)] = main
+        for raw, (off, length) in zip(raws, offsets):
+            shm.buf[data_start + off:data_start + off + length] = raw.cast("B")
+
+        with self._lock:
+            existing = self._segments.get(table_hash)
+            if existing is not None:  # lost a publish race; keep the first one
+                shm.close()
+                shm.unlink()
+                return existing.name
+            self._segments[table_hash] = shm
+            evicted = []
+            while len(self._segments) > self.max_tables:
+                evicted.append(self._segments.popitem(last=False)[1])
+        for old in evicted:
+            self._release(old)
+        return shm.name
+
+    def forget(self, table_hash: str):
+        with self._lock:
+            shm = self._segments.pop(table_hash, None)
+        if shm is not None:
+            self._release(shm)
+
+    def close(self):
+        with self._lock:
+            segments, self._segments = list(self._segments.values()), OrderedDict()
+        for shm in segments:
+            self._release(shm)
+
+    @staticmethod
+    def _release(shm: shared_memory.SharedMemory):
+        # Workers that attached keep their mapping until they drop the table.
+        try:
+            shm.close()
+            shm.unlink()
+        except (FileNotFoundError, BufferError) as e:
+            logger.debug(f"Releasing {shm.name}: {e}")
+
+
+class AttachedTable:
+    """Worker side: a DataFrame whose column buffers map the shared segment."""
+
+    def __init__(self, name: str):
+        # Forkserver workers share the publisher's resource tracker, so the
+        # registration made here is the publisher's own entry: leave it alone,
+        # the publisher unregisters it on unlink.
+        shm = shared_memory.SharedMemory(name=name)
+        buf = shm.buf
+        (meta_len,) = _HEADER.unpack_from(buf, 0)
+        main_len, offsets = pickle.loads(buf[_HEADER.size:_HEADER.size + meta_len])
+        main_start = _HEADER.size + meta_len
+        data_start = _aligned(main_start + main_len)
+        oob = [buf[data_start + off:data_start + off + length].toreadonly() for off, length in offsets]
+        self.df: Optional[pd.DataFrame] = pickle.loads(buf[main_start:main_start + main_len], buffers=oob)
+        # The arrays now own the mapping (through `buf`); detach it from the
+        # SharedMemory object so closing it only drops the file descriptor.
+        shm._buf = shm._mmap = None
+        shm.close()
+
+    def close(self):
+        self.df = None
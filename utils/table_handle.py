@@ -0,0 +1,155 @@
+# utils/table_handle.py
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+
+import pandas as pd
+
+from utils.cell_index import CellIndex
+from utils.table_retrieval import TableRelevanceIndex, render
+from utils.table_utils import parse_structured_table
+from utils.trigram_index import TrigramIndex
+from utils.typed_view import TypedTableView
+from utils.z3_table import Z3TableEncoding
+
+
+class TableHandle:
+    """
+    A parsed table plus everything derived from it, computed once.
+
+    Verifiers, the pipeline and the refiner all take a handle (or a DataFrame,
+    which they wrap). `content_hash` is stable across processes and runs, so it
+    can key any table-level cache.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._hash: Optional[str] = None
+        self._renderings: Dict[str, str] = {}
+        self._samples: Dict[int, str] = {}
+        self._relevance: Optional[TableRelevanceIndex] = None
+        self._cell_index: Optional[CellIndex] = None
+        self._trigram_index: Optional[TrigramIndex] = None
+        self._typed_view: Optional[TypedTableView] = None
+        self._z3_encoding: Optional[Z3TableEncoding] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def wrap(cls, table: Union["TableHandle", pd.DataFrame]) -> "TableHandle":
+        return table if isinstance(table, TableHandle) else cls(table)
+
+    @classmethod
+    def from_dict(cls, table_dict: dict) -> "TableHandle":
+        """parse_structured_table, memoized on the dict's content."""
+        key = hashlib.sha256(
+            json.dumps(table_dict, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        ).hexdigest()
+        with _parsed_lock:
+            handle = _parsed.get(key)
+            if handle is not None:
+                _parsed.move_to_end(key)
+                return handle
+        handle = cls(parse_structured_table(table_dict))
+        with _parsed_lock:
+            _parsed[key] = handle
+            while len(_parsed) > _PARSED_MAX:
+                _parsed.popitem(last=False)
+        return handle
+
+    @property
+    def content_hash(self) -> str:
+        if self._hash is None:
+            h = hashlib.sha256()
+            h.update(json.dumps([str(c) for c in self.df.columns], ensure_ascii=False).encode("utf-8"))
+            h.update(str(self.df.shape).encode("utf-8"))
+            if len(self.df):
+                h.update(pd.util.hash_pandas_object(self.df, index=False).values.tobytes())
+            self._hash = h.hexdigest()
+        return self._hash
+
+    @property
+    def columns(self) -> list:
+        return self.df.columns.tolist()
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    # ---------- memoized renderings ----------
+
+    def render(self, fmt: str) -> str:
+        """'csv' (pipe-separated, no index), 'string' (to_string) or 'markdown'."""
+        with self._lock:
+            if fmt not in self._renderings:
+                self._renderings[fmt] = self._markdown() if fmt == "markdown" else render(self.df, fmt)
+            return self._renderings[fmt]
+
+    @property
+    def csv(self) -> str:
+        return self.render("csv")
+
+    @property
+    def string(self) -> str:
+        return self.render("string")
+
+    @property
+    def markdown(self) -> str:
+        return self.render("markdown")
+
+    def sample_rows(self, n: int = 3) -> str:
+        """str() of the first n rows as records, as shown in the pandas-check prompt."""
+        with self._lock:
+            if n not in self._samples:
+                self._samples[n] = str(self.df.head(n).to_dict(orient="records"))
+            return self._samples[n]
+
+    @property
+    def relevance(self) -> TableRelevanceIndex:
+        with self._lock:
+            if self._relevance is None:
+                self._relevance = TableRelevanceIndex(self.df, render_full=self.render)
+            return self._relevance
+
+    @property
+    def cell_index(self) -> CellIndex:
+        with self._lock:
+            if self._cell_index is None:
+                self._cell_index = CellIndex(self.df)
+            return self._cell_index
+
+    @property
+    def trigram_index(self) -> TrigramIndex:
+        with self._lock:
+            if self._trigram_index is None:
+                self._trigram_index = TrigramIndex(self.df)
+            return self._trigram_index
+
+    @property
+    def typed_view(self) -> TypedTableView:
+        with self._lock:
+            if self._typed_view is None:
+                self._typed_view = TypedTableView(self.df)
+            return self._typed_view
+
+    @property
+    def z3_encoding(self) -> Z3TableEncoding:
+        typed_view = self.typed_view
+        with self._lock:
+            if self._z3_encoding is None:
+                self._z3_encoding = Z3TableEncoding(typed_view)
+            return self._z3_encoding
+
+    def _markdown(self) -> str:
+        try:
+            return self.df.to_markdown(index=False)
+        except ImportError:  # tabulate not installed
+            lines = ["| " + " | ".join(map(str, self.df.columns)) + " |",
+                     "|" + "---|" * len(self.df.columns)]
+            lines += ["| " + " | ".join(map(str, row)) + " |" for row in self.df.itertuples(index=False)]
+            return "\n".join(lines)
+
+
+_PARSED_MAX = 256
+_parsed: "OrderedDict[str, TableHandle]" = OrderedDict()
+_parsed_lock = threading.Lock()
@@ -0,0 +1,157 @@
+# utils/table_retrieval.py
+import math
+import re
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from configs.config import Config
+from utils.rate_control import estimate_tokens
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*|[^\x00-\x7f]")
+
+# Claims of these kinds are only checkable against the whole column, so rows are never pruned for them.
+_WHOLE_COLUMN_CUES = re.compile(
+    r"\b(highest|lowest|most|least|max|min|maximum|minimum|largest|smallest|greatest|fewest|"
+    r"top|bottom|first|last|rank|ranked|ranking|total|sum|average|mean|median|all|every|each|"
+    r"count|how many|number of|only|unique|more than|less than|fewer than|\d+(st|nd|rd|th))\b"
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word / number tokens; thousands separators are dropped so '660,391' == '660391'."""
+    tokens = _TOKEN_RE.findall(str(text).lower())
+    return [re.sub(r"(?<=\d),(?=\d{3})", "", t) for t in tokens]
+
+
+class TableRelevanceIndex:
+    """
+    BM25 index over a table's rows (cell text) and headers, used to serialize only
+    the part of a table that is relevant to a claim or question.
+
+    Tables whose full rendering already fits the token budget are returned
+    unchanged, so small WTQ tables see exactly the same prompt as before.
+    """
+
+    def __init__(self, table: pd.DataFrame, k1: float = 1.5, b: float = 0.75,
+                 render_full: Optional[Callable[[str], str]] = None):
+        self.table = table
+        self.k1 = k1
+        self.b = b
+        self.columns = list(table.columns)
+
+        cells = table.astype(str).values.tolist()
+        self.row_tokens: List[Counter] = [Counter(tokenize(" ".join(row))) for row in cells]
+        self.row_lengths = [sum(c.values()) for c in self.row_tokens]
+        self.avg_len = (sum(self.row_lengths) / len(self.row_lengths)) if self.row_lengths else 0.0
+
+        df = Counter()
+        for counts in self.row_tokens:
+            df.update(counts.keys())
+        n = len(self.row_tokens)
+        self.idf: Dict[str, float] = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+        self.header_tokens = [set(tokenize(c)) for c in self.columns]
+        self.column_tokens = [set(tokenize(" ".join(str(v) for v in table.iloc[:, j]))) for j in range(len(self.columns))]
+
+        # TableHandle passes its own memoized renderer so the full table is rendered once.
+        self._render_full = render_full
+        self._full: Dict[str, str] = {}
+        self._variants: Dict[tuple, str] = {}
+
+    # ---------- scoring ----------
+
+    def score_rows(self, query: str) -> List[float]:
+        q_tokens = set(tokenize(query))
+        scores = []
+        for counts, length in zip(self.row_tokens, self.row_lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_len) if self.avg_len else self.k1
+            for t in q_tokens:
+                tf = counts.get(t)
+                if tf:
+                    score += self.idf.get(t, 0.0) * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+    def select_columns(self, query: str) -> List[str]:
+        """Columns named in the query or holding query terms; the first (label) column is always kept."""
+        q_tokens = set(tokenize(query))
+        keep = []
+        for j, col in enumerate(self.columns):
+            if j == 0 or (self.header_tokens[j] & q_tokens) or \
+                    any(self.idf.get(t, 0.0) > 1.0 for t in self.column_tokens[j] & q_tokens):
+                keep.append(col)
+        # Only the label column matched: the query gives no column signal, keep everything.
+        return keep if len(keep) > 1 else list(self.columns)
+
+    def select(self, query: str, token_budget: int) -> Tuple[List[int], List[str]]:
+        """Row positions (in table order) and column names to show for `query`."""
+        columns = self.select_columns(query)
+        col_idx = [self.columns.index(c) for c in columns]
+        values = self.table.astype(str).values
+        row_cost = [estimate_tokens("|".join(values[i][j] for j in col_idx)) for i in range(len(values))]
+        budget = token_budget - estimate_tokens("|".join(columns))
+
+        if _WHOLE_COLUMN_CUES.search(str(query).lower()) or sum(row_cost) <= budget:
+            return list(range(len(values))), columns
+
+        scores = self.score_rows(query)
+        ranked = sorted(range(len(values)), key=lambda i: (-scores[i], i))
+        chosen, used = [], 0
+        for i in ranked:
+            if used + row_cost[i] > budget and chosen:
+                break
+            chosen.append(i)
+            used += row_cost[i]
+        return sorted(chosen), columns
+
+    # ---------- rendering ----------
+
+    def _variant(self, fmt: str, row_numbers: bool, exclude: frozenset) -> str:
+        key = (fmt, row_numbers, exclude)
+        if key not in self._variants:
+            keep = [j for j, c in enumerate(self.columns) if c not in exclude]
+            self._variants[key] = render(self.table.iloc[:, keep], fmt, keep_index=row_numbers)
+        return self._variants[key]
+
+    def full(self, fmt: str = "csv") -> str:
+        if self._render_full is not None:
+            return self._render_full(fmt)
+        if fmt not in self._full:
+            self._full[fmt] = render(self.table, fmt)
+        return self._full[fmt]
+
+    def serialize(self, query: str, fmt: str = "csv", token_budget: Optional[int] = None,
+                  row_numbers: bool = False, exclude_columns: Sequence[str] = ()) -> str:
+        """
+        Table rendering for a prompt about `query`. fmt="csv" matches
+        to_csv(sep="|", index=False), fmt="string" matches to_string().
+        `row_numbers` adds the 'row' position column even when nothing is
+        pruned; `exclude_columns` are never shown.
+        """
+        budget = token_budget or Config.PROMPT_TABLE_TOKEN_BUDGET
+        exclude = frozenset(exclude_columns)
+        full = self._variant(fmt, row_numbers, exclude) if (row_numbers or exclude) else self.full(fmt)
+        if not Config.PROMPT_TABLE_PRUNING or estimate_tokens(full) <= budget:
+            return full
+
+        rows, columns = self.select(query, budget)
+        columns = [c for c in columns if c not in exclude]
+        if len(rows) == len(self.table) and len(columns) == len([c for c in self.columns if c not in exclude]):
+            return full
+        sub = self.table.iloc[rows][columns]
+        note = (f"(Showing {len(rows)} of {len(self.table)} rows and {len(columns)} of "
+                f"{len(self.columns)} columns relevant to the claim; 'row' is the original row position.)")
+        return note + "\n" + render(sub, fmt, keep_index=True)
+
+
+def render(table: pd.DataFrame, fmt: str, keep_index: bool = False) -> str:
+    if fmt == "csv":
+        if keep_index:
+            return table.to_csv(sep="|", index=True, index_label="row")
+        return table.to_csv(sep="|", index=False)
+    if fmt == "string":
+        return table.to_string()
+    raise ValueError(f"Unknown table format '{fmt}'")
@@ -1,22 +1,74 @@
+import re
 import pandas as pd
+from configs.config import Config
+
+
+def _string_dtype():
+    """pyarrow-backed strings when configured and available, else plain object columns."""
+    if Config.TABLE_STRING_DTYPE != "pyarrow":
+        return object
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return object
+    return "string[pyarrow]"
+
 
 def parse_structured_table(table_dict: dict) -> pd.DataFrame:
     """
     直接从结构化字典加载表格，100% 避免解析错误。
+
+    Rows are transposed into columns in one pass and each cell is cleaned
+    once (str(), newlines -> spaces, strip), so large tables do not go
+    through per-column DataFrame.apply. Short rows are padded with None
+    (-> "None"); duplicate headers are kept.
     """
     try:
 
         header = table_dict.get("header", [])
         rows = table_dict.get("rows", [])
-        
-
-        df = pd.DataFrame(rows, columns=header)
-        
-        df.columns = [c.replace('\n', ' ').strip() for c in df.columns]
-        
-        df = df.apply(lambda x: x.astype(str).str.replace('\n', ' ').str.strip())
-        
+
+        width = len(header)
+        lengths = {len(r) for r in rows}
+        if lengths and max(lengths) > width:
+            raise ValueError(f"{width} columns passed, a row has more values")
+        if lengths and min(lengths) < width:
+            rows = [list(r) + [None] * (width - len(r)) for r in rows]
+
+        columns = [c.replace('\n', ' ').strip() for c in header]
+        dtype = _string_dtype()
+        # One comprehension per column straight off the row lists (faster than zip(*rows) + apply).
+        data = {j: [str(r[j]).replace('\n', ' ').strip() for r in rows] for j in range(width)}
+        if dtype is not object:
+            data = {j: pd.array(col, dtype=dtype) for j, col in data.items()}
+
+        df = pd.DataFrame(data, index=pd.RangeIndex(len(rows)))
+        df.columns = columns
         return df
     except Exception as e:
         print(f"Structured Table Load Error: {e}")
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame()
+
+_CURRENCY = "$€£¥"
+_THOUSANDS = re.compile(r"^[-+(]?\d{1,3}(,\d{3})+(\.\d+)?\)?$")
+
+
+def normalize_cell(value) -> str:
+    """
+    Canonical form of a cell or claimed value for exact matching:
+    case/whitespace folded, currency symbols, percent signs and thousands
+    separators dropped, and numbers printed canonically ("19.0" -> "19").
+    """
+    text = " ".join(str(value).split()).lower()
+    stripped = text.strip(_CURRENCY + "% ")
+    number = stripped.replace(",", "") if _THOUSANDS.match(stripped) else stripped
+    negative = number.startswith("(") and number.endswith(")")
+    if negative:
+        number = number[1:-1]
+    try:
+        num = float(number)
+    except ValueError:
+        return text
+    if negative:
+        num = -num
+    return str(int(num)) if num.is_integer() else repr(num)
@@ -0,0 +1,88 @@
+# utils/trigram_index.py
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from utils.table_utils import normalize_cell
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of the normalized text, padded so short words still get some."""
+    norm = normalize_cell(text)
+    if not norm:
+        return set()
+    padded = f"  {norm} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Character-trigram index over every cell, for tolerant row lookup
+    ("ausmaid" ~ "Ausmaid ", "Man Utd" ~ "Manchester United" is NOT expected,
+    but spacing, case, punctuation and small typos are).
+
+    Cells are scored with the Dice coefficient between trigram sets; a row
+    scores as its best-matching cell. Queries only touch the posting lists of
+    the mention's own trigrams, never the whole table.
+    """
+
+    def __init__(self, table: pd.DataFrame):
+        self.table = table
+        self.columns = [str(c) for c in table.columns]
+        self._postings: Dict[str, Dict[str, List[int]]] = {}
+        self._sizes: Dict[str, List[int]] = {}
+        for col, series in zip(self.columns, (table.iloc[:, j] for j in range(table.shape[1]))):
+            postings = defaultdict(list)
+            sizes = []
+            for row, value in enumerate(series.astype(str).tolist()):
+                grams = trigrams(value)
+                sizes.append(len(grams))
+                for g in grams:
+                    postings[g].append(row)
+            self._postings[col] = dict(postings)
+            self._sizes[col] = sizes
+
+    def _resolve_column(self, column) -> Optional[str]:
+        if column is None:
+            return None
+        if str(column) in self._postings:
+            return str(column)
+        wanted = normalize_cell(column)
+        for col in self.columns:
+            if normalize_cell(col) == wanted:
+                return col
+        raise KeyError(f"Unknown column '{column}'")
+
+    def score_rows(self, mention: str, column=None) -> Dict[int, float]:
+        """Best cell Dice score per row with at least one shared trigram."""
+        query = trigrams(mention)
+        if not query:
+            return {}
+        col = self._resolve_column(column)
+        best: Dict[int, float] = {}
+        for c in ([col] if col is not None else self.columns):
+            postings, sizes = self._postings[c], self._sizes[c]
+            hits = Counter()
+            for g in query:
+                rows = postings.get(g)
+                if rows:
+                    hits.update(rows)
+            for row, shared in hits.items():
+                score = 2.0 * shared / (len(query) + sizes[row])
+                if score > best.get(row, 0.0):
+                    best[row] = score
+        return best
+
+    def search(self, mention: str, column=None, k: int = 5, min_score: float = 0.3) -> List[Tuple[int, float]]:
+        """Top-k (row position, score) pairs, best first."""
+        scored = [(r, s) for r, s in self.score_rows(mention, column).items() if s >= min_score]
+        scored.sort(key=lambda rs: (-rs[1], rs[0]))
+        return scored[:k]
+
+    def find_rows(self, mention: str, column=None, k: int = 5, min_score: float = 0.3) -> List[int]:
+        """
+        Row positions (use with df.iloc) whose cells best match `mention`,
+        optionally restricted to one column. Exposed to generated verify_fact code.
+        """
+        return [r for r, _ in self.search(mention, column, k, min_score)]
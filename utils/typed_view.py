@@ -0,0 +1,165 @@
+# utils/typed_view.py
+import re
+import warnings
+from collections import Counter
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.logger import setup_logger
+
+logger = setup_logger("TypedTableView")
+
+# Cells that mean "no value" rather than "not a number".
+_MISSING = {"", "-", "–", "—", "n/a", "na", "none", "nan", "null", "--"}
+_NUMBER = re.compile(r"^\s*([-+]?(?:\d+(?:\.\d*)?|\.\d+))\s*([A-Za-z%µ°/][A-Za-z%µ°/\.²³]*)?\s*$")
+_DURATION = re.compile(r"^\d+(?::\d{1,2}){1,3}(?:\.\d+)?$")
+_DATE_HINT = re.compile(r"[a-zA-Z]{3}|\d{4}|\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}")
+
+
+def _missing_mask(s: pd.Series) -> pd.Series:
+    return s.str.lower().isin(_MISSING)
+
+
+def parse_numeric(s: pd.Series):
+    """
+    Vectorized number parsing of a string column.
+    Handles thousands separators, currency symbols, '(1,234)' accounting
+    negatives, '%' and a trailing unit ('12.5 mg', '3 km').
+    Returns (float Series with NaN for unparseable cells, unit or None).
+    """
+    s = s.astype(str).str.strip()
+    negative = s.str.match(r"^\(.*\)$")
+    cleaned = (s.str.replace(r"^\((.*)\)$", r"\1", regex=True)
+                .str.replace(r"[$€£¥,]", "", regex=True)
+                .str.replace("−", "-", regex=False))
+    parts = cleaned.str.extract(_NUMBER)
+    values = pd.to_numeric(parts[0], errors="coerce")
+    values = values.where(~negative, -values)
+    units = parts[1].dropna().str.lower().str.rstrip(".").unique()
+    unit = units[0] if len(units) == 1 else None
+    if len(units) > 1:
+        # Mixed units ('mg' and 'g') are not comparable as plain numbers.
+        values = values.where(parts[1].isna(), np.nan)
+    return values.astype(float), unit
+
+
+def parse_duration(s: pd.Series) -> pd.Series:
+    """'3:06:02:29' (d:h:m:s), '1:02:03' (h:m:s) or '4:05' (m:s) -> Timedelta; NaT otherwise."""
+    s = s.astype(str).str.strip()
+    ok = s.str.match(_DURATION)
+    seconds = pd.Series(np.nan, index=s.index)
+    if ok.any():
+        parts = s[ok].str.split(":", expand=True).apply(pd.to_numeric, errors="coerce")
+        n_parts = parts.notna().sum(axis=1)
+        weights = {2: [60, 1], 3: [3600, 60, 1], 4: [86400, 3600, 60, 1]}
+        for n, w in weights.items():
+            rows = n_parts == n
+            if rows.any():
+                seconds[parts.index[rows]] = (parts.loc[rows, list(range(n))].values * w).sum(axis=1)
+    return pd.to_timedelta(seconds, unit="s")
+
+
+def parse_dates(s: pd.Series) -> pd.Series:
+    s = s.astype(str).str.strip()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            return pd.to_datetime(s, errors="coerce", format="mixed")
+        except (TypeError, ValueError):
+            return pd.to_datetime(s, errors="coerce")
+
+
+def normalize_text(s: pd.Series) -> pd.Series:
+    return s.astype(str).str.replace(r"\s+", " ", regex=True).str.strip().str.lower()
+
+
+class TypedTableView:
+    """
+    Pre-parsed companion of a string-typed table, built once per table.
+
+      tv.num['Points']       float Series ('1,234', '$5', '(12)', '45%', '3 km' parsed; NaN elsewhere)
+      tv.duration['Time']    Timedelta Series for 'd:h:m:s' / 'h:m:s' / 'm:s' cells
+      tv.date['Date']        datetime64 Series
+      tv.text['Team']        lowercased, whitespace-collapsed strings (every column)
+      tv.kinds / tv.units    per-column kind ('number', 'duration', 'date', 'text') and unit
+
+    A column gets a typed form only when at least `min_ratio` of its
+    non-missing cells parse; tv['col'] returns the most specific form.
+    Columns are read by position. A repeated header, or a column that fails
+    to parse, stays text: tv falls back to the raw cells rather than raising.
+    """
+
+    def __init__(self, table: pd.DataFrame, min_ratio: float = 0.8):
+        self.raw = table
+        self.text = table.apply(normalize_text) if len(table.columns) else pd.DataFrame(index=table.index)
+        num, duration, date = {}, {}, {}
+        self.kinds: Dict[str, str] = {}
+        self.units: Dict[str, Optional[str]] = {}
+
+        counts = Counter(table.columns)
+        for j, col in enumerate(table.columns):
+            self.kinds[col] = "text"
+            if counts[col] > 1:
+                continue  # tv['col'] could not say which of the columns it means
+            try:
+                kind, values, unit = self._classify(table.iloc[:, j].astype(str), min_ratio)
+            except Exception as e:
+                logger.warning(f"Column {col!r} left untyped: {e}")
+                continue
+            self.kinds[col] = kind
+            if kind == "number":
+                num[col] = values
+                self.units[col] = unit
+            elif kind == "duration":
+                duration[col] = values
+            elif kind == "date":
+                date[col] = values
+
+        self.num = pd.DataFrame(num, index=table.index)
+        self.duration = pd.DataFrame(duration, index=table.index)
+        self.date = pd.DataFrame(date, index=table.index)
+
+    @staticmethod
+    def _classify(raw: pd.Series, min_ratio: float):
+        """(kind, parsed values or None, unit or None) of one string column."""
+        present = ~_missing_mask(raw.str.strip())
+        n_present = int(present.sum())
+        if n_present == 0:
+            return "text", None, None
+
+        values, unit = parse_numeric(raw)
+        if values[present].notna().sum() >= min_ratio * n_present:
+            return "number", values, unit
+
+        spans = parse_duration(raw)
+        if spans[present].notna().sum() >= min_ratio * n_present:
+            return "duration", spans, None
+
+        if raw[present].str.contains(_DATE_HINT).mean() >= min_ratio:
+            dates = parse_dates(raw)
+            if dates[present].notna().sum() >= min_ratio * n_present:
+                return "date", dates, None
+        return "text", None, None
+
+    def __getitem__(self, col) -> pd.Series:
+        kind = self.kinds.get(col)
+        if kind == "number":
+            return self.num[col]
+        if kind == "duration":
+            return self.duration[col]
+        if kind == "date":
+            return self.date[col]
+        return self.text[col]
+
+    def describe(self) -> str:
+        """
+        The typed columns for prompts, e.g. "Points: number, Weight: number (kg),
+        Time: duration"; currency is stripped before parsing, so it is never a
+        unit. Empty when every column is text.
+        """
+        return ", ".join(
+            f"{col}: {kind}" + (f" ({self.units[col]})" if self.units.get(col) else "")
+            for col, kind in self.kinds.items() if kind != "text"
+        )
@@ -0,0 +1,154 @@
+# utils/verification_cache.py
+import hashlib
+import json
+import marshal
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from types import CodeType
+from typing import Any, Dict, Optional
+
+from configs.config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger("VerificationCache")
+
+# Bytecode is only valid for the interpreter that produced it.
+_PY_TAG = sys.implementation.cache_tag
+
+
+def normalize_claim(text: str) -> str:
+    """Case/whitespace-folded step text without trailing punctuation, so trivial rewordings share a key."""
+    return re.sub(r"\s+", " ", str(text)).strip().lower().rstrip(".!;:, ")
+
+
+@dataclass
+class CachedVerification:
+    code: str
+    compiled: Optional[CodeType]
+    result: Dict[str, Any]  # asdict(VerificationResult)
+
+
+class VerificationCache:
+    """
+    Generated program + compiled bytecode + verdict per
+    (table hash, verifier, verifier version, model, step type, normalized step text, premise, mode).
+
+    In-memory LRU in front of an optional SQLite file (same layout idea as
+    utils/llm_cache.py). A hit lets FactChecker / Z3Auditor skip both the LLM
+    call and the execution.
+    """
+
+    def __init__(self, max_entries: int = 50000, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path or None
+        self._mem: "OrderedDict[str, CachedVerification]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = None
+        if self.path:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS verifications (
+                       key TEXT PRIMARY KEY,
+                       code TEXT,
+                       bytecode BLOB,
+                       py_tag TEXT,
+                       result TEXT,
+                       created_at REAL
+                   )"""
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(table_hash: str, verifier: str, version: str, step_type: str,
+                 text: str, premise: str = "", mode: str = "") -> str:
+        """`mode`: prompt version and settings that change what program a step gets (see BaseVerifier)."""
+        payload = [table_hash, verifier, version, Config.MODEL_NAME, step_type,
+                   normalize_claim(text), normalize_claim(premise), mode]
+        return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: str, count_miss: bool = True) -> Optional[CachedVerification]:
+        """count_miss=False for speculative lookups that are retried later (keeps hit_rate honest)."""
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return entry
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT code, bytecode, py_tag, result FROM verifications WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    code, blob, tag, result = row
+                    compiled = marshal.loads(blob) if blob and tag == _PY_TAG else None
+                    entry = CachedVerification(code, compiled, json.loads(result))
+                    self._remember(key, entry)
+                    self.hits += 1
+                    return entry
+            if count_miss:
+                self.misses += 1
+            return None
+
+    def put(self, key: str, code: str, compiled: Optional[CodeType], result):
+        entry = CachedVerification(code, compiled, asdict(result))
+        with self._lock:
+            self._remember(key, entry)
+            if self._conn is not None:
+                blob = marshal.dumps(compiled) if compiled is not None else None
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO verifications VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, code, blob, _PY_TAG, json.dumps(entry.result, default=str), time.time()),
+                )
+                self._conn.commit()
+
+    def _remember(self, key: str, entry: CachedVerification):
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "in_memory": len(self._mem),
+                "path": self.path,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_shared_cache: Optional[VerificationCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_verification_cache() -> Optional[VerificationCache]:
+    """Process-wide cache built from Config; None when disabled."""
+    global _shared_cache
+    if not Config.VERIFY_CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = VerificationCache(Config.VERIFY_CACHE_MAX_ENTRIES, Config.VERIFY_CACHE_PATH)
+            logger.info(f"Verification cache: {Config.VERIFY_CACHE_PATH or 'memory only'}")
+    return _shared_cache
@@ -0,0 +1,330 @@
+# utils/z3_exec.py
+"""
+Execution of generated `solve_logic()` programs with Z3_TIMEOUT enforced.
+
+Every Solver a program creates gets the timeout, and every check() result
+is recorded, so a program that hit `unknown` (timeout, nonlinear
+arithmetic, ...) is reported as undecided instead of as whatever its
+own code did with the `unknown` (the usual template returns "valid").
+Runs inside the sandbox workers (utils/exec_pool.py), or in-process
+under a lock when sandboxing is off. IncrementalContext keeps one solver
+per trace for Z3_INCREMENTAL. With Z3_FORMAT="smtlib" an audit is an
+SMT-LIB2 script instead (SmtFormula, run_smt2): it is parsed, never executed.
+"""
+import bisect
+import hashlib
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import z3
+
+from configs.config import Config
+
+# z3's default context is not thread-safe; the in-process path serializes on this.
+z3_lock = threading.Lock()
+
+_timeout_applied = False
+
+
+def apply_timeout(timeout_ms: int):
+    """Process-wide default for every solver z3 creates from now on."""
+    global _timeout_applied
+    if not _timeout_applied:
+        z3.set_param("timeout", timeout_ms)
+        _timeout_applied = True
+
+
+class CheckLog:
+    """check() results of the solvers created by one program."""
+
+    def __init__(self):
+        self.results: List[z3.CheckSatResult] = []
+        self.reasons: List[str] = []
+
+    @property
+    def unknown_reason(self) -> Optional[str]:
+        return self.reasons[0] if self.reasons else None
+
+
+def solver_class(timeout_ms: int, log: CheckLog):
+    class AuditSolver(z3.Solver):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.set("timeout", timeout_ms)
+
+        def check(self, *assumptions):
+            result = super().check(*assumptions)
+            log.results.append(result)
+            if result == z3.unknown:
+                log.reasons.append(self.reason_unknown())
+            return result
+
+    return AuditSolver
+
+
+def z3_globals(solver_cls) -> dict:
+    return {
+        "Distinct": z3.Distinct,
+        "Const": z3.Const,
+        "Function": z3.Function,
+        "z3": z3,
+        "Solver": solver_cls,
+        "Int": z3.Int,
+        "Ints": z3.Ints,
+        "String": z3.String,
+        "Real": z3.Real,
+        "Bool": z3.Bool,
+        "Not": z3.Not,
+        "StringVal": z3.StringVal,
+        "And": z3.And,
+        "Or": z3.Or,
+        "Implies": z3.Implies,
+        "If": z3.If,
+        "sat": z3.sat,
+        "unsat": z3.unsat,
+        "Reals": z3.Reals,
+        "Bools": z3.Bools,
+        "IntVal": z3.IntVal,
+        "RealVal": z3.RealVal,
+        "BoolVal": z3.BoolVal,
+    }
+
+
+def run_solve_logic(code, entry: str = "solve_logic", timeout_ms: Optional[int] = None, extra_globals: Optional[dict] = None):
+    """
+    exec a generated Z3 program and call `entry()`.
+
+    Returns (status, is_valid, model, error): status is "ok", "unknown",
+    "no_entry" or "error". Caller holds z3_lock when not in a dedicated process.
+    """
+    timeout_ms = timeout_ms or Config.Z3_TIMEOUT
+    apply_timeout(timeout_ms)
+    log = CheckLog()
+    solver_cls = solver_class(timeout_ms, log)
+    scope = z3_globals(solver_cls)
+    if extra_globals:
+        scope.update(extra_globals)
+
+    # `import z3; z3.Solver()` inside the program should be covered too.
+    original, z3.Solver = z3.Solver, solver_cls
+    try:
+        exec_locals = {}
+        exec(code, scope, exec_locals)
+        if entry not in exec_locals:
+            return "no_entry", False, None, f"LLM did not generate '{entry}' function."
+        is_valid, model = exec_locals[entry]()
+        model = str(model)
+    except Exception as e:
+        # Typically s.model() after an `unknown` check.
+        if log.unknown_reason is not None:
+            return "unknown", False, None, log.unknown_reason
+        return "error", False, None, str(e) or type(e).__name__
+    finally:
+        z3.Solver = original
+    if log.unknown_reason is not None:
+        return "unknown", False, None, log.unknown_reason
+    return "ok", bool(is_valid), model, None
+
+
+class IncrementalContext:
+    """
+    One trace's persistent solver: premises (verified facts) are asserted
+    once and stay; each conclusion is checked inside push()/pop().
+
+    Step programs define `premises() -> list` (new facts, may be empty) and
+    `conclusion() -> BoolRef`. Symbols are shared by name and sort, so a
+    later step's `Int('Brazil_Total')` is the constant an earlier one declared.
+    """
+
+    def __init__(self, timeout_ms: int):
+        self.log = CheckLog()
+        self.solver_cls = solver_class(timeout_ms, self.log)
+        self.solver = self.solver_cls()
+        self.applied = set()
+        self.extra_globals: dict = {}
+
+    def _load(self, code) -> dict:
+        scope = z3_globals(self.solver_cls)
+        scope.update(self.extra_globals)
+        exec_locals = {}
+        exec(code, scope, exec_locals)
+        return exec_locals
+
+    def assert_premises(self, key: str, code) -> Optional[str]:
+        """Assert a step's premises() permanently; an error message if they are rejected."""
+        if key in self.applied:
+            return None
+        program = self._load(code)
+        constraints = list(program["premises"]()) if "premises" in program else []
+        # Facts that contradict what is already asserted would make every conclusion "valid".
+        if constraints and self.solver.check(*constraints) == z3.unsat:
+            return "premises contradict the facts already asserted"
+        self.solver.add(*constraints)
+        self.applied.add(key)
+        return None
+
+    def check(self, step_key: str, code, persistent,
+              extra_globals: Optional[dict] = None) -> Tuple[str, bool, Optional[str], Optional[str], bool]:
+        """
+        Replay `persistent` [(key, code)] not yet applied (a fresh worker rebuilds
+        from scratch), assert this step's premises, then check its conclusion.
+        Returns (status, is_valid, model, error, premises_applied).
+        """
+        self.extra_globals = extra_globals or {}
+        original, z3.Solver = z3.Solver, self.solver_cls
+        premises_applied = False
+        try:
+            for key, premise_code in persistent:
+                error = self.assert_premises(key, premise_code)
+                if error is not None:
+                    return "error", False, None, f"earlier step {key}: {error}", False
+            program = self._load(code)
+            if "conclusion" not in program:
+                return "no_entry", False, None, "LLM did not generate 'conclusion' function.", False
+            error = self.assert_premises(step_key, code)
+            if error is not None:
+                return "error", False, None, error, False
+            premises_applied = True
+
+            self.log.reasons.clear()
+            conclusion = program["conclusion"]()
+            self.solver.push()
+            try:
+                self.solver.add(z3.Not(conclusion))
+                result = self.solver.check()
+                model = str(self.solver.model()) if result == z3.sat else None
+            finally:
+                self.solver.pop()
+        except Exception as e:
+            if self.log.unknown_reason is not None:
+                return "unknown", False, None, self.log.unknown_reason, premises_applied
+            return "error", False, None, str(e) or type(e).__name__, premises_applied
+        finally:
+            z3.Solver = original
+        if result == z3.unknown:
+            return "unknown", False, None, self.log.unknown_reason, premises_applied
+        return "ok", result == z3.unsat, model, None, premises_applied
+
+    def symbols(self) -> List[str]:
+        """"name: Sort" of every constant asserted so far, for the next step's prompt."""
+        return [f"{name}: {sort}" for name, sort in sorted(_constants(self.solver.assertions()).items())]
+
+
+def _constants(exprs) -> Dict[str, str]:
+    """name -> sort of the uninterpreted constants in `exprs`."""
+    seen, stack = {}, list(exprs)
+    while stack:
+        e = stack.pop()
+        if z3.is_const(e) and e.decl().kind() == z3.Z3_OP_UNINTERPRETED:
+            seen[str(e)] = str(e.sort())
+        else:
+            stack.extend(e.children())
+    return seen
+
+
+def looks_like_smtlib(code: str) -> bool:
+    """SMT-LIB2 text (Z3_FORMAT="smtlib") rather than a Python program."""
+    return code.lstrip().startswith(("(", ";"))
+
+
+class SmtFormula:
+    """
+    A parsed SMT-LIB2 audit: every assertion but the last is a premise, the
+    last one is the conclusion. Commands such as (check-sat) are ignored and
+    define-fun bodies are inlined by the parser.
+    """
+
+    def __init__(self, text: str):
+        try:
+            assertions = list(z3.parse_smt2_string(text))
+        except z3.Z3Exception as e:
+            message = e.value.decode(errors="replace") if isinstance(e.value, bytes) else str(e.value)
+            raise ValueError(message.strip()) from None
+        if not assertions:
+            raise ValueError("the SMT-LIB program has no (assert ...)")
+        self.premises, self.conclusion = assertions[:-1], assertions[-1]
+
+    def key(self) -> str:
+        """
+        Canonical hash: declarations and premises in sorted order, then the
+        conclusion, all as parsed s-expressions. Formatting, comments,
+        declaration/premise order and define-fun helpers do not change it.
+        """
+        declared = sorted(_constants(self.premises + [self.conclusion]).items())
+        canonical = [f"{name}:{sort}" for name, sort in declared] + ["|"]
+        canonical += sorted(p.sexpr() for p in self.premises) + ["=>", self.conclusion.sexpr()]
+        return hashlib.sha256("\n".join(canonical).encode("utf-8")).hexdigest()
+
+
+def run_smt2(text: str, timeout_ms: Optional[int] = None, formula: Optional[SmtFormula] = None):
+    """
+    Check an SMT-LIB2 audit by contradiction: premises + Not(conclusion).
+    Returns (status, is_valid, model, error) like run_solve_logic; no Python
+    is executed. `formula` is `text` already parsed by an in-process caller.
+    Caller holds z3_lock when not in a dedicated process.
+    """
+    timeout_ms = timeout_ms or Config.Z3_TIMEOUT
+    apply_timeout(timeout_ms)
+    if formula is None:
+        try:
+            formula = SmtFormula(text)
+        except ValueError as e:
+            return "error", False, None, str(e)
+    solver = z3.Solver()
+    solver.set("timeout", timeout_ms)
+    solver.add(*formula.premises)
+    solver.add(z3.Not(formula.conclusion))
+    result = solver.check()
+    if result == z3.unknown:
+        return "unknown", False, None, solver.reason_unknown()
+    if result == z3.sat:
+        return "ok", False, str(solver.model()), None
+    return "ok", True, None, None
+
+
+class Z3Stats:
+    """Process-wide latency and outcome counts of Z3 audits."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Counter = Counter()
+        self._latencies: List[float] = []  # kept sorted
+        self.formula_cache_hits = 0
+
+    def record(self, status: str, elapsed_s: float):
+        with self._lock:
+            self.counts[status] += 1
+            bisect.insort(self._latencies, elapsed_s)
+
+    def record_cache_hit(self):
+        """An SMT-LIB audit answered by the formula cache; no solver ran, so no latency."""
+        with self._lock:
+            self.formula_cache_hits += 1
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            lat = list(self._latencies)
+            counts = dict(self.counts)
+            cache_hits = self.formula_cache_hits
+
+        def pct(p):
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))], 4) if lat else 0.0
+
+        return {
+            "audits": len(lat),
+            "outcomes": counts,
+            "unknown": counts.get("unknown", 0),
+            "timeouts": counts.get("timeout", 0),
+            "formula_cache_hits": cache_hits,
+            "p50_s": pct(0.5),
+            "p95_s": pct(0.95),
+            "max_s": round(lat[-1], 4) if lat else 0.0,
+        }
+
+
+_z3_stats = Z3Stats()
+
+
+def get_z3_stats() -> Z3Stats:
+    return _z3_stats
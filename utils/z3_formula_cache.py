@@ -0,0 +1,116 @@
+# utils/z3_formula_cache.py
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from configs.config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger("Z3FormulaCache")
+
+
+class FormulaCache:
+    """
+    Verdict per canonical SMT-LIB formula hash (utils/z3_exec.SmtFormula.key):
+    (is_valid, counter-example model). Only decided results are stored.
+
+    In-memory LRU in front of an optional SQLite file (same layout idea as
+    utils/verification_cache.py). The key depends on the formula alone, not
+    on the table, step text or model, so identical formulas across samples,
+    items and reruns skip solving.
+    """
+
+    def __init__(self, max_entries: int = 50000, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path or None
+        self._mem: "OrderedDict[str, Tuple[bool, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = None
+        if self.path:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS formulas (
+                       key TEXT PRIMARY KEY,
+                       is_valid INTEGER,
+                       model TEXT,
+                       created_at REAL
+                   )"""
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[bool, Optional[str]]]:
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return entry
+            if self._conn is not None:
+                row = self._conn.execute("SELECT is_valid, model FROM formulas WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (bool(row[0]), row[1])
+                    self._remember(key, entry)
+                    self.hits += 1
+                    return entry
+            self.misses += 1
+            return None
+
+    def put(self, key: str, is_valid: bool, model: Optional[str]):
+        entry = (bool(is_valid), model)
+        with self._lock:
+            self._remember(key, entry)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO formulas VALUES (?, ?, ?, ?)",
+                    (key, int(entry[0]), model, time.time()),
+                )
+                self._conn.commit()
+
+    def _remember(self, key: str, entry: Tuple[bool, Optional[str]]):
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "in_memory": len(self._mem),
+                "path": self.path,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_shared_cache: Optional[FormulaCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_formula_cache() -> Optional[FormulaCache]:
+    """Process-wide cache built from Config; None when disabled."""
+    global _shared_cache
+    if not Config.Z3_FORMULA_CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = FormulaCache(Config.Z3_FORMULA_CACHE_MAX_ENTRIES, Config.Z3_FORMULA_CACHE_PATH)
+            logger.info(f"Z3 formula cache: {Config.Z3_FORMULA_CACHE_PATH or 'memory only'}")
+    return _shared_cache
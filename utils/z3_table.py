@@ -0,0 +1,91 @@
+# utils/z3_table.py
+"""
+Z3 encoding of a table's numeric columns, built once per table.
+
+Generated Z3 programs get `col(name)` in their globals: `col('Points')[3]`
+is the exact Z3 Real numeral of row position 3, so table values never
+have to be copied into the code.
+"""
+import math
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import z3
+
+from utils.typed_view import TypedTableView
+
+
+class Z3Column:
+    """Positional (0-based) view of one numeric column as Z3 numerals."""
+
+    def __init__(self, name: str, values: np.ndarray, unit: Optional[str] = None):
+        self.name = name
+        self.unit = unit
+        self.values = values
+        self._cells: Dict[int, z3.ArithRef] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, row: int) -> z3.ArithRef:
+        row = int(row)
+        if row < 0:
+            row += len(self.values)
+        if not 0 <= row < len(self.values):
+            raise IndexError(f"row {row} is out of range for column '{self.name}' ({len(self.values)} rows)")
+        cell = self._cells.get(row)
+        if cell is None:
+            value = self.values[row]
+            if math.isnan(value):
+                raise ValueError(f"row {row} of column '{self.name}' has no numeric value")
+            cell = self._cells[row] = numeral(value)
+        return cell
+
+    def __iter__(self) -> Iterator[z3.ArithRef]:
+        """Cells with a value; rows without one are skipped."""
+        for row in range(len(self.values)):
+            if not math.isnan(self.values[row]):
+                yield self[row]
+
+    def rows(self) -> List[int]:
+        return [i for i in range(len(self.values)) if not math.isnan(self.values[i])]
+
+    def max(self) -> z3.ArithRef:
+        return numeral(np.nanmax(self.values))
+
+    def min(self) -> z3.ArithRef:
+        return numeral(np.nanmin(self.values))
+
+    def sum(self) -> z3.ArithRef:
+        return numeral(np.nansum(self.values))
+
+
+def numeral(value: float) -> z3.ArithRef:
+    # Always Real: IntVal / IntVal would be integer division (1500 / 1000 == 1).
+    # repr() is the shortest string that round-trips, so 1.99 becomes 199/100.
+    value = float(value)
+    return z3.RealVal(int(value) if value.is_integer() else repr(value))
+
+
+class Z3TableEncoding:
+    def __init__(self, typed_view: TypedTableView):
+        self.columns: Dict[str, Z3Column] = {
+            str(c): Z3Column(str(c), typed_view.num[c].to_numpy(dtype=float), typed_view.units.get(c))
+            for c in typed_view.num.columns
+        }
+        self._folded = {name.strip().lower(): name for name in self.columns}
+
+    def col(self, name: str) -> Z3Column:
+        column = self.columns.get(name)
+        if column is None:
+            folded = self._folded.get(str(name).strip().lower())
+            if folded is None:
+                raise KeyError(f"'{name}' is not a numeric column; numeric columns: {list(self.columns)}")
+            column = self.columns[folded]
+        return column
+
+    def describe(self) -> str:
+        """One entry per column for prompts, e.g. "Gold (20 rows)", "Weight (kg, 12 rows)"."""
+        return ", ".join(
+            f"{name} ({c.unit + ', ' if c.unit else ''}{len(c)} rows)" for name, c in self.columns.items()
+        )